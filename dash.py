@@ -2,10 +2,12 @@
 # Complete Implementation with 3D Visualizations + Fixed Upload
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.utils
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import json
@@ -13,6 +15,25 @@ import time
 import warnings
 import io
 import math
+import os
+import re
+import sys
+import hashlib
+import threading
+import tracemalloc
+import base64
+import atexit
+import functools
+import gzip
+import tempfile
+import statistics
+import zipfile
+import sqlite3
+import struct
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
 
 # Advanced 3D imports
 try:
@@ -28,17 +49,63 @@ try:
 except ImportError:
     HAS_FOLIUM = False
 
+try:
+    from folium.plugins import VectorGridProtobuf
+    HAS_VECTORGRID = True
+except ImportError:
+    HAS_VECTORGRID = False
+
 try:
     from sklearn.ensemble import RandomForestRegressor, IsolationForest
     from sklearn.preprocessing import StandardScaler
-    from sklearn.model_selection import train_test_split
+    from sklearn.model_selection import train_test_split, GroupKFold, KFold
     from sklearn.metrics import r2_score
     HAS_SKLEARN = True
 except ImportError:
     HAS_SKLEARN = False
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+try:
+    import shapely
+    from shapely.geometry import shape
+    HAS_SHAPELY = True
+except ImportError:
+    HAS_SHAPELY = False
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+from runtime import MAX_WORKERS, LocalHTTPServer, run_heavy_task, run_heavy_tasks
+from geo import SERVICE_REGION, community_keys, haversine_km, local_km, map_center, normalize_names, valid_coordinates
+from geocoder import OfflineGeocoder
+from stats import (CORRELATION_COLUMNS, STATUS_THRESHOLDS, StreamingStats, collection_status,
+                   percentile_status_thresholds)
+from tiles import (TILE_CACHE_DIR, TILE_LAYER, TILE_MAX_FEATURES, TILE_MAX_ZOOM, TILE_MIN_ZOOM, LocalTileServer,
+                   TilesetBuilder, build_tileset)
+from scheduler import (SCHEDULE_DEFAULTS, UNSERVED_COLUMNS, WEEKDAYS, plan_collection_schedule, replan_schedule,
+                       truck_utilization)
+
 warnings.filterwarnings('ignore')
 
+# Fragments rerun only their own body; older Streamlit reruns the whole script
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda fn: fn)
+LAZY_TABS = os.environ.get('WASTE_DASHBOARD_EAGER_TABS', '0') != '1'
+
 # ===== PAGE CONFIGURATION =====
 st.set_page_config(
     page_title="🏙️ Enhanced Smart Waste Management Dashboard",
@@ -53,106 +120,525 @@ def init_session_state():
         st.session_state.theme = 'light'
     if 'data_loaded' not in st.session_state:
         st.session_state.data_loaded = False
-    if 'df' not in st.session_state:
-        st.session_state.df = None
-    if 'ml_model' not in st.session_state:
-        st.session_state.ml_model = None
     if 'auto_refresh' not in st.session_state:
         st.session_state.auto_refresh = False
+    if 'dataset_version' not in st.session_state:
+        st.session_state.dataset_version = None
+    if 'ml_model_version' not in st.session_state:
+        st.session_state.ml_model_version = None
+    if 'ml_model_params' not in st.session_state:
+        st.session_state.ml_model_params = ()
 
-# ===== ENHANCED CSS =====
-def load_custom_css():
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    .main > div {
-        font-family: 'Inter', sans-serif;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        min-height: 100vh;
-    }
-    
-    .glass-card {
-        background: rgba(255, 255, 255, 0.1);
-        backdrop-filter: blur(16px);
-        border-radius: 20px;
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        padding: 2rem;
-        margin: 1rem 0;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-        transition: all 0.3s ease;
-    }
-    
-    .glass-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 16px 48px rgba(0, 0, 0, 0.2);
-    }
-    
-    .metric-card {
-        background: linear-gradient(135deg, #667eea, #764ba2);
-        color: white;
-        padding: 1.5rem;
-        border-radius: 16px;
-        text-align: center;
-        margin: 0.5rem 0;
-        transition: transform 0.3s ease;
-        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
-    }
-    
-    .metric-card:hover {
-        transform: scale(1.05);
-    }
-    
-    .metric-value {
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin: 0.5rem 0;
-        text-shadow: 0 2px 4px rgba(0, 0, 0, 0.3);
-    }
-    
-    .metric-label {
-        font-size: 1rem;
-        opacity: 0.9;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    
-    .status-critical { background-color: #dc3545; }
-    .status-high { background-color: #ffc107; }
-    .status-medium { background-color: #17a2b8; }
-    .status-low { background-color: #28a745; }
-    .status-none { background-color: #6c757d; }
-    
-    .sidebar-header {
-        background: linear-gradient(135deg, #667eea, #764ba2);
-        color: white;
-        padding: 2rem;
-        margin: -1rem -1rem 2rem -1rem;
-        border-radius: 0 0 20px 20px;
-        text-align: center;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.1);
+# ===== SHARED DATASET STORE =====
+SHARED_NUMERIC_COLUMNS = ['Total Households', 'Total Kgs in Jul 2025', 'Latitude', 'Longitude']
+
+def dataset_fingerprint(df):
+    """Content hash used as the version key of a processed dataset"""
+    if df is None or len(df) == 0:
+        return None
+
+    # Colour lists are derived and unhashable, so they are left out
+    hashable = df.drop(columns=['Color'], errors='ignore')
+    row_hashes = pd.util.hash_pandas_object(hashable, index=False).values
+    digest = hashlib.blake2b(row_hashes.tobytes(), digest_size=12)
+    digest.update('|'.join(map(str, hashable.columns)).encode())
+    return digest.hexdigest()
+
+class SharedDatasetStore:
+    """Process-wide registry holding one read-only copy of each dataset"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = {}
+        self._segments = {}
+
+    def put(self, df, version=None):
+        version = version or dataset_fingerprint(df)
+        with self._lock:
+            if version not in self._frames:
+                self._frames[version] = df
+            return version, self._frames[version]
+
+    def get(self, version):
+        with self._lock:
+            return self._frames.get(version)
+
+    def versions(self):
+        with self._lock:
+            return list(self._frames)
+
+    def nbytes(self, version=None):
+        with self._lock:
+            frames = self._frames.values() if version is None else [self._frames.get(version)]
+            return int(sum(f.memory_usage(deep=True).sum() for f in frames if f is not None))
+
+    def export_shared(self, version, columns=None):
+        """Publish numeric columns to shared memory and return an attach spec"""
+        columns = tuple(columns or SHARED_NUMERIC_COLUMNS)
+        key = (version, columns)
+        with self._lock:
+            if key in self._segments:
+                return self._segments[key][1]
+            df = self._frames.get(version)
+            if df is None:
+                return None
+
+            arrays = [np.ascontiguousarray(df[col].to_numpy(dtype='float64')) for col in columns]
+            size = max(1, sum(a.nbytes for a in arrays))
+            segment = shared_memory.SharedMemory(create=True, size=size)
+
+            layout = []
+            offset = 0
+            for col, arr in zip(columns, arrays):
+                view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=segment.buf, offset=offset)
+                view[:] = arr
+                layout.append((col, arr.dtype.str, offset, len(arr)))
+                offset += arr.nbytes
+            view = None
+
+            spec = {'name': segment.name, 'rows': len(df), 'columns': layout, 'version': version}
+            self._segments[key] = (segment, spec)
+            return spec
+
+    def release(self, version):
+        with self._lock:
+            self._frames.pop(version, None)
+            for key in [k for k in self._segments if k[0] == version]:
+                segment, _ = self._segments.pop(key)
+                _close_segment(segment, unlink=True)
+
+def _close_segment(segment, unlink=False):
+    try:
+        segment.close()
+    except BufferError:
+        # Views are still alive; the mapping is released when they are collected
+        pass
+    if unlink:
+        # Unlinking removes the name even while mapped, so released versions never linger in /dev/shm
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+def attach_shared_frame(spec):
+    """Attach to a published dataset and return (DataFrame view, segment)"""
+    segment = shared_memory.SharedMemory(name=spec['name'])
+    columns = {
+        col: np.ndarray((length,), dtype=np.dtype(dtype), buffer=segment.buf, offset=offset)
+        for col, dtype, offset, length in spec['columns']
     }
-    
-    .upload-section {
-        background: rgba(255, 255, 255, 0.1);
-        backdrop-filter: blur(10px);
-        border-radius: 16px;
-        padding: 2rem;
-        margin: 1rem 0;
-        border: 2px dashed rgba(255, 255, 255, 0.3);
+    return pd.DataFrame(columns, copy=False), segment
+
+@st.cache_resource
+def get_shared_store():
+    return SharedDatasetStore()
+
+def activate_dataset(df):
+    """Register a processed dataset in the shared store and point the session at it"""
+    version = dataset_fingerprint(df)
+    previous = st.session_state.get('dataset_version')
+    manager = get_session_manager()
+    shared_df = manager.activate(current_session_id(), df, version)
+    if shared_df is None:
+        st.error(f"❌ This dataset would exceed the per-session memory budget of {SESSION_MEMORY_BUDGET_MB:,.0f} MB.")
+        return None
+    if previous not in (None, version) and not manager.in_use(previous):
+        get_export_manager().invalidate(previous)
+    st.session_state.dataset_version = version
+    st.session_state.data_loaded = True
+    return shared_df
+
+def run_session_load_test(n_sessions=50, n_rows=200_000, reruns=5, shared=True):
+    """Simulate concurrent sessions and report resident memory and rerun latency"""
+    rng = np.random.default_rng(0)
+    base = create_real_sample_data()
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    df['Latitude'] += rng.normal(0, 0.01, n_rows)
+    df['Longitude'] += rng.normal(0, 0.01, n_rows)
+    df = process_data(df)
+
+    store = SharedDatasetStore()
+    version, _ = store.put(df)
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    sessions = [store.get(version) if shared else store.get(version).copy() for _ in range(n_sessions)]
+
+    def session_rerun(frame):
+        latencies = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            frame.groupby('City')['Total Kgs in Jul 2025'].agg(['sum', 'mean', 'max'])
+            frame['Collection_Status'].value_counts()
+            frame[['Total Households', 'Total Kgs in Jul 2025', 'Efficiency_Score']].mean()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        latencies = np.concatenate([np.array(l) for l in pool.map(session_rerun, sessions)])
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'mode': 'shared' if shared else 'per-session copy',
+        'sessions': n_sessions,
+        'rows': n_rows,
+        'dataset_mb': round(store.nbytes(version) / 1e6, 1),
+        'resident_mb': round((current - baseline) / 1e6, 1),
+        'peak_mb': round((peak - baseline) / 1e6, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 1),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 1),
     }
-    
-    .feature-badge {
-        display: inline-block;
-        background: linear-gradient(135deg, #28a745, #20c997);
-        color: white;
-        padding: 0.3rem 0.8rem;
-        border-radius: 20px;
-        font-size: 0.8rem;
-        margin: 0.2rem;
+
+# ===== SESSION RESOURCES =====
+SESSION_IDLE_TTL = float(os.environ.get('WASTE_DASHBOARD_SESSION_TTL', 30 * 60))  # seconds
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get('WASTE_DASHBOARD_SESSION_BUDGET_MB', 1024))
+SESSION_SWEEP_SECONDS = 60
+SESSION_SPILL_DIR = os.path.join(tempfile.gettempdir(), 'waste_dashboard_sessions')
+METRICS_SERVER_HOST = os.environ.get('WASTE_DASHBOARD_METRICS_HOST', '127.0.0.1')
+METRICS_SERVER_PORT = int(os.environ.get('WASTE_DASHBOARD_METRICS_PORT', '8766'))
+
+def object_nbytes(obj):
+    """Approximate resident bytes of a session object"""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (tuple, list)):
+        return sys.getsizeof(obj) + sum(object_nbytes(o) for o in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(object_nbytes(k) + object_nbytes(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+class SessionResourceManager:
+    """Tracks the data each browser session holds and releases it when idle"""
+
+    def __init__(self, store, ttl=SESSION_IDLE_TTL, budget_mb=SESSION_MEMORY_BUDGET_MB, spill_dir=SESSION_SPILL_DIR):
+        self.store = store
+        self.ttl = ttl
+        self.budget_bytes = int(budget_mb * 1e6)
+        self.spill_dir = spill_dir
+        self.evicted_sessions = 0
+        self.released_versions = 0
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._dataset_bytes = {}
+        self._spilled = set()
+        self._release_hooks = []
+
+    def _session(self, session_id):
+        if session_id not in self._sessions:
+            self._sessions[session_id] = {'last_seen': time.time(), 'version': None, 'objects': OrderedDict()}
+        return self._sessions[session_id]
+
+    def touch(self, session_id, version=None):
+        """Mark a session active, optionally pointing it at a dataset version"""
+        with self._lock:
+            session = self._session(session_id)
+            session['last_seen'] = time.time()
+            if version is not None:
+                session['version'] = version
+
+    def dataset_nbytes(self, version):
+        if version not in self._dataset_bytes:
+            self._dataset_bytes[version] = self.store.nbytes(version)
+        return self._dataset_bytes[version]
+
+    def _references(self, version):
+        return sum(1 for s in self._sessions.values() if s['version'] == version)
+
+    def in_use(self, version):
+        with self._lock:
+            return self._references(version) > 0
+
+    def _charge(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return 0, 0
+        private = sum(nbytes for _, nbytes in session['objects'].values())
+        version = session['version']
+        shared = self.dataset_nbytes(version) // max(self._references(version), 1) if version else 0
+        return shared, private
+
+    def activate(self, session_id, df, version):
+        """Store a dataset and point the session at it if it fits the budget; None otherwise"""
+        nbytes = self._dataset_bytes.get(version) or object_nbytes(df)
+        with self._lock:
+            _, private = self._charge(session_id)
+            others = sum(1 for sid, s in self._sessions.items() if s['version'] == version and sid != session_id)
+            if nbytes // (others + 1) + private > self.budget_bytes:
+                return None
+            # Under the lock so the sweeper cannot release the version first
+            _, shared_df = self.store.put(df, version=version)
+            self._dataset_bytes[version] = nbytes
+            session = self._session(session_id)
+            session['last_seen'] = time.time()
+            session['version'] = version
+        return shared_df
+
+    def dataset(self, version):
+        """Stored frame for a version, restored from its spill file after release"""
+        df = self.store.get(version)
+        if df is not None:
+            return df
+        with self._lock:
+            df = self.store.get(version)
+            path = self._spill_path(version)
+            if df is None and os.path.exists(path):
+                _, df = self.store.put(pd.read_pickle(path), version=version)
+                os.remove(path)
+                self._spilled.discard(path)
+        return df
+
+    def get(self, session_id, key, default=None):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or key not in session['objects']:
+                return default
+            session['objects'].move_to_end(key)
+            return session['objects'][key][0]
+
+    def put(self, session_id, key, obj):
+        """Hold a per-session object, dropping least recently used ones to stay within budget"""
+        nbytes = object_nbytes(obj)
+        with self._lock:
+            session = self._session(session_id)
+            session['objects'].pop(key, None)
+            shared, private = self._charge(session_id)
+            while session['objects'] and shared + private + nbytes > self.budget_bytes:
+                _, (_, dropped) = session['objects'].popitem(last=False)
+                private -= dropped
+            # An object that cannot fit is used for this rerun only
+            if shared + private + nbytes <= self.budget_bytes:
+                session['objects'][key] = (obj, nbytes)
+        return obj
+
+    def on_release(self, hook):
+        """Call ``hook(version)`` after a dataset version is released from memory"""
+        self._release_hooks.append(hook)
+
+    def _spill_path(self, version):
+        return os.path.join(self.spill_dir, f"{version}.pkl")
+
+    def sweep(self, now=None):
+        """Evict sessions idle past the TTL and release datasets no live session uses"""
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [sid for sid, s in self._sessions.items() if now - s['last_seen'] > self.ttl]
+            for sid in idle:
+                del self._sessions[sid]
+            self.evicted_sessions += len(idle)
+            stale = set(self.store.versions()) - {s['version'] for s in self._sessions.values()}
+        for version in stale:
+            # Spill outside the lock; release only if still unreferenced
+            path = self._spill_path(version)
+            df = self.store.get(version)
+            if df is not None and not os.path.exists(path):
+                os.makedirs(self.spill_dir, exist_ok=True)
+                df.to_pickle(path + '.tmp')
+                os.replace(path + '.tmp', path)
+                self._spilled.add(path)
+            with self._lock:
+                if self._references(version):
+                    continue
+                self.store.release(version)
+                self._dataset_bytes.pop(version, None)
+                self.released_versions += 1
+            for hook in self._release_hooks:
+                hook(version)
+        return len(idle)
+
+    def cleanup(self):
+        """Release shared memory and delete spill files; registered to run at interpreter exit"""
+        for version in self.store.versions():
+            self.store.release(version)
+        for path in list(self._spilled):
+            if os.path.exists(path):
+                os.remove(path)
+            self._spilled.discard(path)
+
+    def metrics(self):
+        now = time.time()
+        with self._lock:
+            sessions = []
+            for sid, session in self._sessions.items():
+                shared, private = self._charge(sid)
+                sessions.append({'session': session_label(sid), 'idle_seconds': round(now - session['last_seen'], 1),
+                                 'dataset_version': session['version'], 'shared_bytes': shared,
+                                 'private_bytes': private, 'resident_bytes': shared + private,
+                                 'objects': list(session['objects'])})
+        return {
+            'sessions': sessions,
+            'resident_bytes': sum(s['resident_bytes'] for s in sessions),
+            'store_versions': self.store.versions(),
+            'store_bytes': self.store.nbytes(),
+            'budget_bytes': self.budget_bytes,
+            'idle_ttl_seconds': self.ttl,
+            'evicted_sessions': self.evicted_sessions,
+            'released_versions': self.released_versions,
+        }
+
+    def serve_metrics(self, path, query):
+        return 200, {'Content-Type': 'application/json', 'Cache-Control': 'no-store'}, json.dumps(self.metrics()).encode()
+
+    def run_sweeper(self, interval=SESSION_SWEEP_SECONDS):
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.sweep()
+        threading.Thread(target=loop, name='session-sweeper', daemon=True).start()
+
+def session_label(session_id):
+    """Stable, non-reversible label for a session in metrics output"""
+    return hashlib.blake2b(session_id.encode(), digest_size=6).hexdigest()
+
+@st.cache_resource
+def get_metrics_server():
+    return LocalHTTPServer(METRICS_SERVER_HOST, METRICS_SERVER_PORT, name='metrics-server')
+
+def release_version_caches(version, figure_cache):
+    """Drop the results cached for a released dataset version, which would otherwise keep its data alive"""
+    # st.cache_resource cannot drop single keys, so these are cleared whole and refill on the next rerun
+    for cached in (cached_rectangular_bars_data, get_entity_resolution, get_dataset_stats, train_shared_model,
+                   cached_prediction_intervals, cached_cost_scenarios, compute_boundary_assignment,
+                   cached_transfer_points, cached_collection_schedule, cached_density_surface,
+                   cached_group_summary, get_folium_map):
+        cached.clear()
+    figure_cache.invalidate(version)
+
+@st.cache_resource
+def get_session_manager():
+    manager = SessionResourceManager(get_shared_store())
+    # Looked up here: the sweeper thread that runs the hook has no script context
+    figure_cache = get_figure_cache()
+    manager.on_release(lambda version: release_version_caches(version, figure_cache))
+    manager.run_sweeper()
+    atexit.register(manager.cleanup)
+    get_metrics_server().register('metrics', manager.serve_metrics)
+    return manager
+
+def current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+def current_dataset():
+    """The session's active dataset, restored from the store or spill file"""
+    version = st.session_state.dataset_version
+    if not st.session_state.data_loaded or version is None:
+        return None
+    manager = get_session_manager()
+    manager.touch(current_session_id(), version)
+    df = manager.dataset(version)
+    if df is None:
+        # Released with no spill file left: data must be loaded again
+        st.session_state.data_loaded = False
+    return df
+
+def session_object(key, default=None):
+    return get_session_manager().get(current_session_id(), key, default)
+
+def set_session_object(key, obj):
+    return get_session_manager().put(current_session_id(), key, obj)
+
+# ===== ENHANCED CSS =====
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+STYLESHEET = 'dashboard.css'
+STYLESHEET_MIN = 'dashboard.min.css'
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{}:;,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def build_stylesheet():
+    """Write the minified stylesheet next to its source; run after editing static/dashboard.css"""
+    with open(os.path.join(STATIC_DIR, STYLESHEET), encoding='utf-8') as f:
+        css = minify_css(f.read())
+    with open(os.path.join(STATIC_DIR, STYLESHEET_MIN), 'w', encoding='utf-8') as f:
+        f.write(css)
+    return css
+
+@st.cache_resource
+def bundle_static_assets():
+    """URL of the stylesheet to serve, hashed over the file actually served, and the minified CSS"""
+    with open(os.path.join(STATIC_DIR, STYLESHEET), encoding='utf-8') as f:
+        source = f.read()
+    css = minify_css(source)
+    try:
+        with open(os.path.join(STATIC_DIR, STYLESHEET_MIN), encoding='utf-8') as f:
+            built = f.read()
+    except OSError:
+        built = None
+    # A missing or stale build falls back to the source stylesheet
+    name, served = (STYLESHEET_MIN, built) if built == css else (STYLESHEET, source)
+    digest = hashlib.blake2b(served.encode(), digest_size=6).hexdigest()
+    return f"app/static/{name}?v={digest}", css
+
+def load_custom_css():
+    """Point the page's stylesheet link at the bundled CSS once per session, or when its hash changes"""
+    url, css = bundle_static_assets()
+    if st.session_state.get('stylesheet_url') == url:
+        return
+    try:
+        st.html(f"""<script>
+        let link = document.getElementById('dashboard-css');
+        if (!link) {{
+            link = document.createElement('link');
+            link.id = 'dashboard-css';
+            link.rel = 'stylesheet';
+            document.head.appendChild(link);
+        }}
+        if (link.getAttribute('href') !== {json.dumps(url)}) {{
+            link.href = {json.dumps(url)};
+        }}
+        </script>""", unsafe_allow_javascript=True)
+    except TypeError:
+        # No script support in st.html: inline the CSS on every rerun
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+        return
+    st.session_state.stylesheet_url = url
+
+HEADER_HTML = """<div class="glass-card app-header">
+<h1>🏙️ Enhanced Smart Waste Management Dashboard</h1>
+<p>🆕 Next-Generation Analytics with Rectangular 3D Bars</p>
+<div class="badges"><span class="feature-badge">🎮 3D Visualizations</span><span class="feature-badge">🤖 AI Predictions</span><span class="feature-badge">📊 Real-time Analytics</span><span class="feature-badge">🗺️ Interactive Maps</span></div>
+</div>"""
+
+METRIC_CARD_TEMPLATE = ('<div class="metric-card"><div class="metric-icon">{icon}</div>'
+                        '<div class="metric-value">{value}</div><div class="metric-label">{label}</div></div>')
+
+FOOTER_TEMPLATE = """<div class="app-footer">
+<h4>🏙️ Enhanced Smart Waste Management Dashboard</h4>
+<p>🚀 Next-Generation Analytics • 🎮 3D Visualizations • 🤖 AI Predictions • 🗺️ Interactive Maps<br>
+Last updated: {updated} | Records: {records:,} | PyDeck: {pydeck} | AI: {ai}</p>
+</div>"""
+
+def benchmark_first_paint(runs=3):
+    """Offline first-render cost: script time, markup bytes per rerun and blocking external URLs"""
+    from streamlit.testing.v1 import AppTest
+    results = []
+    for _ in range(runs):
+        at = AppTest.from_file(os.path.abspath(__file__), default_timeout=180)
+        start = time.perf_counter()
+        at.run()
+        first = time.perf_counter() - start
+        at.run()
+        bodies = [m.value for m in at.markdown] + [h.proto.body for h in at.get('html')]
+        results.append((first, sum(len(b.encode()) for b in bodies),
+                        sorted({u for b in bodies for u in re.findall(r"https?://[^'\")\s]+", b)})))
+    _, css = bundle_static_assets()
+    return {
+        'first_run_s': round(statistics.median(r[0] for r in results), 2),
+        'rerun_markup_bytes': results[-1][1],
+        'blocking_external_urls': results[-1][2],
+        'stylesheet_bytes': len(css.encode()),
+        'stylesheet_gzip_bytes': len(gzip.compress(css.encode())),
     }
-    </style>
-    """, unsafe_allow_html=True)
 
 # ===== REAL SAMPLE DATA =====
 def create_real_sample_data():
@@ -284,12 +770,19 @@ def create_rectangular_bars_data(df, bar_width_meters=50):
         "features": rectangular_data
     }
 
-def create_rectangular_bars_layer(df, elevation_scale=20, bar_width_meters=50):
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_rectangular_bars_data(version, bar_width_meters, _df):
+    return create_rectangular_bars_data(_df, bar_width_meters)
+
+def create_rectangular_bars_layer(df, elevation_scale=20, bar_width_meters=50, version=None):
     """Create PyDeck GeoJsonLayer with extruded rectangular bars"""
     if len(df) == 0 or not HAS_PYDECK:
         return None
         
-    geojson_data = create_rectangular_bars_data(df, bar_width_meters)
+    if version is None:
+        geojson_data = create_rectangular_bars_data(df, bar_width_meters)
+    else:
+        geojson_data = cached_rectangular_bars_data(version, bar_width_meters, df)
     
     if not geojson_data["features"]:
         return None
@@ -399,9 +892,10 @@ def create_advanced_3d_deck(df, layers, view_state_params=None):
         return None
     
     if view_state_params is None:
+        center_lat, center_lon = map_center(df)
         view_state_params = {
-            'longitude': df['Longitude'].mean(),
-            'latitude': df['Latitude'].mean(),
+            'longitude': center_lon,
+            'latitude': center_lat,
             'zoom': 9,
             'pitch': 50,
             'bearing': 0
@@ -431,14 +925,21 @@ def create_advanced_3d_deck(df, layers, view_state_params=None):
     return deck
 
 # ===== DATA PROCESSING =====
-def process_data(df):
+REQUIRED_COLUMNS = ['City', 'Community', 'Latitude', 'Longitude', 'Total Households', 'Total Kgs in Jul 2025']
+NUMERIC_COLUMNS = ['Latitude', 'Longitude', 'Total Households', 'Total Kgs in Jul 2025']
+CO2_KG_PER_KG = 0.5
+COLLECTION_COST_PER_KG = 5  # ₹ per kg
+PROCESSING_COST_PER_KG = 2  # ₹ per kg
+STATUS_RGBA = {'Critical': [220, 20, 60, 200], 'High': [255, 69, 0, 180], 'Medium': [255, 140, 0, 160],
+               'Low': [50, 205, 50, 140], 'None': [128, 128, 128, 120]}
+
+def process_data(df, quality_checks=True, geocode=True, derive=True):
     """Process and add derived metrics to dataframe"""
     if df is None or len(df) == 0:
         return df
     
     # Ensure required columns exist
-    required_cols = ['City', 'Community', 'Latitude', 'Longitude', 'Total Households', 'Total Kgs in Jul 2025']
-    for col in required_cols:
+    for col in REQUIRED_COLUMNS:
         if col not in df.columns:
             st.error(f"Missing required column: {col}")
             return None
@@ -449,15 +950,24 @@ def process_data(df):
     df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
     df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
     
+    # Quality flags (see QUALITY_FLAGS) on the coordinates as uploaded
+    if quality_checks:
+        df['Quality_Flags'] = run_quality_checks(df)
+    
+    # Fill missing or out-of-region coordinates from the offline geocoder
+    if geocode:
+        get_geocoder().repair(df)
+    
+    if not derive:
+        return df
+    
     # Add derived metrics
     df['Waste_Per_Household'] = df.apply(
         lambda row: row['Total Kgs in Jul 2025'] / row['Total Households'] if row['Total Households'] > 0 else 0,
         axis=1
     )
     
-    df['Collection_Status'] = df['Total Kgs in Jul 2025'].apply(
-        lambda x: 'Critical' if x > 300 else 'High' if x > 100 else 'Medium' if x > 25 else 'Low' if x > 0 else 'None'
-    )
+    df['Collection_Status'] = collection_status(df['Total Kgs in Jul 2025'])
     
     df['Efficiency_Score'] = df.apply(
         lambda row: max(0, min(100, 100 - (row['Total Kgs in Jul 2025'] / max(row['Total Households'], 1) * 15))),
@@ -465,15 +975,12 @@ def process_data(df):
     )
     
     # Color coding for visualizations
-    df['Color'] = df['Total Kgs in Jul 2025'].apply(
-        lambda x: [220, 20, 60, 200] if x > 300 else [255, 69, 0, 180] if x > 100 else
-        [255, 140, 0, 160] if x > 25 else [50, 205, 50, 140] if x > 0 else [128, 128, 128, 120]
-    )
+    df['Color'] = df['Collection_Status'].map(STATUS_RGBA)
     
     # Environmental and cost metrics
-    df['CO2_Impact'] = df['Total Kgs in Jul 2025'] * 0.5
-    df['Collection_Cost'] = df['Total Kgs in Jul 2025'] * 5  # ₹5 per kg
-    df['Processing_Cost'] = df['Total Kgs in Jul 2025'] * 2  # ₹2 per kg
+    df['CO2_Impact'] = df['Total Kgs in Jul 2025'] * CO2_KG_PER_KG
+    df['Collection_Cost'] = df['Total Kgs in Jul 2025'] * COLLECTION_COST_PER_KG
+    df['Processing_Cost'] = df['Total Kgs in Jul 2025'] * PROCESSING_COST_PER_KG
     
     # Community classification
     def classify_community(row):
@@ -490,71 +997,578 @@ def process_data(df):
     
     return df
 
+# ===== DATA QUALITY =====
+QUALITY_FLAGS = {
+    'missing_coordinates': 1,
+    'out_of_region': 2,
+    'duplicate_coordinates': 4,
+    'colliding_coordinates': 8,
+    'household_outlier': 16,
+    'waste_outlier': 32,
+    'duplicate_name': 64,
+    'waste_without_households': 128,
+}
+QUALITY_LABELS = {
+    'missing_coordinates': "Missing or non-numeric coordinates",
+    'out_of_region': "Coordinates outside the service region",
+    'duplicate_coordinates': "Identical coordinates shared with another community",
+    'colliding_coordinates': "Within 10 m of another community",
+    'household_outlier': "Household count outlier",
+    'waste_outlier': "Waste per household outlier",
+    'duplicate_name': "Duplicate community name within city",
+    'waste_without_households': "Waste recorded with zero households",
+}
+COLLISION_RADIUS_M = 10.0
+OUTLIER_Z = 3.5
+
+def _coordinate_keys(lat, lon, decimals):
+    """Pack rounded coordinates into one int64 hash key per row"""
+    scale = 10.0 ** decimals
+    lat_i = np.round((lat + 90) * scale).astype(np.int64)
+    lon_i = np.round((lon + 180) * scale).astype(np.int64)
+    return lat_i * np.int64(round(361 * scale)) + lon_i
+
+def _duplicated_keys(keys):
+    """Rows whose key occurs more than once (hash-table pass, no sort)"""
+    return pd.Series(keys).duplicated(keep=False).to_numpy()
+
+def _near_coordinates(lat, lon, exact_keys, radius_m=COLLISION_RADIUS_M):
+    """Rows with a different coordinate within ``radius_m``, checking each grid cell against its neighbours"""
+    codes, _ = pd.factorize(exact_keys)
+    first = np.zeros(codes.max() + 1, dtype=np.int64)
+    first[codes[::-1]] = np.arange(len(codes))[::-1]
+    xy = local_km(lat[first], lon[first], np.mean(lat)) * 1000
+    cells = np.floor(xy / radius_m).astype(np.int64)
+    cells -= cells.min(axis=0)
+    width = cells[:, 1].max() + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(keys, kind='stable')
+    keys, xy = keys[order], xy[order]
+
+    near = np.zeros(len(keys), dtype=bool)
+    # Points within one cell size share a cell or are neighbours; half the 3x3 block covers each pair once
+    for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        target = keys + (dx * width + dy)
+        lo = np.searchsorted(keys, target, 'left')
+        counts = np.searchsorted(keys, target, 'right') - lo
+        a = np.repeat(np.arange(len(keys)), counts)
+        b = np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        hit = (a != b) & (((xy[a] - xy[b]) ** 2).sum(axis=1) <= radius_m ** 2)
+        near[a[hit]] = True
+        near[b[hit]] = True
+    near[order] = near.copy()
+    return near[codes]
+
+def _robust_outliers(values, z=OUTLIER_Z):
+    """Modified z-score (median/MAD) outliers"""
+    median = np.median(values)
+    mad = np.median(np.abs(values - median))
+    if mad == 0:
+        return np.zeros(len(values), dtype=bool)
+    return np.abs(0.6745 * (values - median) / mad) > z
+
+def run_quality_checks(df):
+    """Vectorized quality pass over an upload, returning a uint16 flag per row"""
+    n = len(df)
+    flags = np.zeros(n, dtype=np.uint16)
+    lat = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype='float64')
+    lon = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype='float64')
+    households = pd.to_numeric(df['Total Households'], errors='coerce').fillna(0).to_numpy(dtype='float64')
+    kg = pd.to_numeric(df['Total Kgs in Jul 2025'], errors='coerce').fillna(0).to_numpy(dtype='float64')
+
+    missing = ~(np.isfinite(lat) & np.isfinite(lon))
+    flags[missing] |= QUALITY_FLAGS['missing_coordinates']
+
+    valid = ~missing
+    outside = valid & ~((lat >= SERVICE_REGION['lat'][0]) & (lat <= SERVICE_REGION['lat'][1]) &
+                        (lon >= SERVICE_REGION['lon'][0]) & (lon <= SERVICE_REGION['lon'][1]))
+    flags[outside] |= QUALITY_FLAGS['out_of_region']
+
+    idx = np.flatnonzero(valid & ~outside)
+    if len(idx):
+        exact_keys = _coordinate_keys(lat[idx], lon[idx], 7)
+        exact = _duplicated_keys(exact_keys)
+        near = _near_coordinates(lat[idx], lon[idx], exact_keys)
+        flags[idx[exact]] |= QUALITY_FLAGS['duplicate_coordinates']
+        flags[idx[near]] |= QUALITY_FLAGS['colliding_coordinates']
+
+    populated = np.flatnonzero(households > 0)
+    if len(populated):
+        flags[populated[_robust_outliers(np.log1p(households[populated]))]] |= QUALITY_FLAGS['household_outlier']
+        per_household = kg[populated] / households[populated]
+        flags[populated[_robust_outliers(np.log1p(per_household))]] |= QUALITY_FLAGS['waste_outlier']
+    flags[(households <= 0) & (kg > 0)] |= QUALITY_FLAGS['waste_without_households']
+
+    flags[_duplicated_keys(community_keys(df['City'], df['Community']))] |= QUALITY_FLAGS['duplicate_name']
+
+    return flags
+
+def quality_report(df):
+    """Per-check counts for a processed dataset"""
+    flags = df['Quality_Flags'].to_numpy() if 'Quality_Flags' in df.columns else run_quality_checks(df)
+    rows = []
+    for name, bit in QUALITY_FLAGS.items():
+        count = int(np.count_nonzero(flags & bit))
+        rows.append({'Check': QUALITY_LABELS[name], 'Rows Flagged': count,
+                     'Share (%)': round(100 * count / max(len(df), 1), 2)})
+    return pd.DataFrame(rows)
+
+def describe_quality_flags(value):
+    return ', '.join(QUALITY_LABELS[name] for name, bit in QUALITY_FLAGS.items() if int(value) & bit)
+
+def render_quality_report(df):
+    """Quality summary with the flagged rows"""
+    if 'Quality_Flags' not in df.columns:
+        return
+    flagged = df[df['Quality_Flags'] > 0]
+    with st.expander(f"🧪 Data Quality Report ({len(flagged)} rows flagged)"):
+        st.dataframe(quality_report(df), hide_index=True, use_container_width=True)
+        if 'Geocode_Source' in df.columns:
+            repaired = df['Geocode_Source'].value_counts()
+            st.caption("📍 Coordinate sources: " + ", ".join(f"{src} {int(n)}" for src, n in repaired.items() if n))
+        if len(flagged) > 0:
+            issues = flagged[['Community', 'City', 'Latitude', 'Longitude']].copy()
+            issues['Issues'] = flagged['Quality_Flags'].map(describe_quality_flags)
+            st.dataframe(issues, use_container_width=True)
+
+def benchmark_quality_checks(n_rows=1_000_000, seed=0):
+    """Quality-check time against parsing the same upload, and the neighbour-cell check against an exact-cell match"""
+    rng = np.random.default_rng(seed)
+    base = create_real_sample_data()
+    raw = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    raw['Latitude'] += rng.normal(0, 0.02, n_rows)
+    raw['Longitude'] += rng.normal(0, 0.02, n_rows)
+    payload = raw.to_csv(index=False).encode()
+
+    start = time.perf_counter()
+    parsed = pd.read_csv(io.BytesIO(payload))
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_quality_checks(parsed)
+    checks = time.perf_counter() - start
+
+    lat, lon = parsed['Latitude'].to_numpy(), parsed['Longitude'].to_numpy()
+    start = time.perf_counter()
+    _duplicated_keys(_coordinate_keys(lat, lon, 4))
+    cell_match = time.perf_counter() - start
+    start = time.perf_counter()
+    _near_coordinates(lat, lon, _coordinate_keys(lat, lon, 7))
+    neighbours = time.perf_counter() - start
+
+    return {
+        'rows': n_rows,
+        'parse_seconds': round(parse, 2),
+        'quality_seconds': round(checks, 2),
+        'overhead_pct': round(100 * checks / parse, 1),
+        'cell_match_seconds': round(cell_match, 2),
+        'neighbour_cells_seconds': round(neighbours, 2),
+    }
+
+# ===== OFFLINE GEOCODER =====
+@st.cache_resource(show_spinner=False)
+def get_geocoder():
+    return OfflineGeocoder.from_bundled(create_real_sample_data())
+
+def benchmark_geocoder(n_rows=2_000_000, missing_share=0.5, seed=0):
+    """Rows per second for bulk coordinate repair on synthetic uploads"""
+    rng = np.random.default_rng(seed)
+    base = create_real_sample_data()
+    df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+    blank = rng.random(n_rows) < missing_share
+    df.loc[blank, ['Latitude', 'Longitude']] = np.nan
+    # Unknown names on half the blanked rows exercise the pincode path
+    renamed = blank & (rng.random(n_rows) < 0.5)
+    df.loc[renamed, 'Community'] = 'Unknown ' + df.loc[renamed, 'Community']
+
+    geocoder = OfflineGeocoder.from_bundled(create_real_sample_data())
+    start = time.perf_counter()
+    geocoder.repair(df)
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': n_rows,
+        'seconds': round(elapsed, 2),
+        'rows_per_sec': int(n_rows / elapsed),
+        'sources': df['Geocode_Source'].value_counts().to_dict(),
+    }
+
+# ===== ENTITY RESOLUTION =====
+ENTITY_STOPWORDS = {'society', 'soc', 'chs', 'co', 'op', 'coop', 'cooperative', 'housing', 'hsg',
+                    'ltd', 'limited', 'the', 'apartment', 'apartments', 'apt', 'bldg', 'building'}
+ENTITY_MATCH_THRESHOLD = 0.8
+ENTITY_MAX_POSTING = 200
+ENTITY_BLOCK_COLUMNS = ('City', 'Pincode')
+
+def canonical_names(names):
+    """Normalized names with generic words like 'society' or 'chs' dropped"""
+    codes, uniques = pd.factorize(names, use_na_sentinel=False)
+    normalized = normalize_names(pd.Series(uniques, dtype=object))
+    canonical = normalized.map(lambda n: ' '.join(w for w in n.split() if w not in ENTITY_STOPWORDS) or n)
+    return canonical.to_numpy(dtype=object)[codes]
+
+def _name_trigrams(names):
+    """(name index, trigram code) for every character trigram of each padded ASCII name"""
+    padded = [f' {n} '.encode('ascii', 'ignore') for n in names]
+    lengths = np.fromiter((len(p) for p in padded), dtype=np.int64, count=len(padded))
+    buf = np.frombuffer(b''.join(padded), dtype=np.uint8).astype(np.int64)
+    if len(buf) < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    codes = (buf[:-2] << 16) | (buf[1:-1] << 8) | buf[2:]
+    starts = np.cumsum(lengths) - lengths
+    counts = np.maximum(lengths - 2, 0)
+    name_idx = np.repeat(np.arange(len(names)), counts)
+    positions = np.repeat(starts, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    return name_idx, codes[positions]
+
+def _candidate_pairs(block_codes, name_idx, gram_codes, max_posting=ENTITY_MAX_POSTING):
+    """Pairs of names in the same block sharing trigrams, with their shared-trigram count"""
+    # Unique (name, trigram) postings keyed by (block, trigram)
+    posting_key = block_codes[name_idx] * np.int64(1 << 24) + gram_codes
+    dedup = pd.DataFrame({'key': posting_key, 'name': name_idx}).drop_duplicates()
+    dedup = dedup.sort_values('key', kind='stable')
+    keys = dedup['key'].to_numpy()
+    names = dedup['name'].to_numpy()
+
+    boundaries = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1], True])
+    sizes = np.diff(boundaries)
+    group_end = np.repeat(boundaries[1:], sizes)
+    # Very common trigrams would make pair generation quadratic
+    usable = np.repeat(sizes <= max_posting, sizes)
+    pos = np.arange(len(keys))
+    partners = np.where(usable, group_end - pos - 1, 0)
+
+    left = np.repeat(pos, partners)
+    right = left + 1 + (np.arange(partners.sum()) - np.repeat(np.cumsum(partners) - partners, partners))
+    a, b = names[left], names[right]
+    a, b = np.minimum(a, b), np.maximum(a, b)
+    pair_key = a * np.int64(len(block_codes)) + b
+    pair_key, shared = np.unique(pair_key, return_counts=True)
+    return pair_key // len(block_codes), pair_key % len(block_codes), shared
+
+def _connected_components(n, a, b):
+    """Component label per node for the undirected edges (a, b)"""
+    parent = np.arange(n)
+
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    for x, y in zip(a.tolist(), b.tolist()):
+        rx, ry = find(x), find(y)
+        if rx != ry:
+            parent[max(rx, ry)] = min(rx, ry)
+    return np.array([find(x) for x in range(n)])
+
+def resolve_entities(df, threshold=ENTITY_MATCH_THRESHOLD, block_on=ENTITY_BLOCK_COLUMNS):
+    """Group spellings of the same community; returns an Entity_ID per row and the matched pairs"""
+    block_cols = [c for c in block_on if c in df.columns]
+    canonical = canonical_names(df['Community'])
+    block_frame = df[block_cols].astype(str).assign(_name=canonical) if block_cols else pd.DataFrame({'_name': canonical})
+    row_codes = block_frame.groupby(list(block_frame.columns), sort=False).ngroup().to_numpy()
+    unique_rows = block_frame.drop_duplicates().reset_index(drop=True)
+    n = len(unique_rows)
+
+    if block_cols:
+        block_codes = unique_rows.groupby(block_cols, sort=False).ngroup().to_numpy().astype(np.int64)
+    else:
+        block_codes = np.zeros(n, dtype=np.int64)
+    name_idx, gram_codes = _name_trigrams(unique_rows['_name'].tolist())
+    gram_counts = np.bincount(pd.DataFrame({'n': name_idx, 'g': gram_codes}).drop_duplicates()['n'], minlength=n)
+
+    a, b, shared = _candidate_pairs(block_codes, name_idx, gram_codes)
+    dice = 2 * shared / np.maximum(gram_counts[a] + gram_counts[b], 1)
+    match = dice >= threshold
+    a, b, dice = a[match], b[match], dice[match]
+
+    try:
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+        graph = coo_matrix((np.ones(len(a)), (a, b)), shape=(n, n))
+        labels = connected_components(graph, directed=False)[1]
+    except ImportError:
+        labels = _connected_components(n, a, b)
+
+    pairs = pd.DataFrame({
+        **{col: unique_rows[col].to_numpy()[a] for col in block_cols},
+        'Name A': unique_rows['_name'].to_numpy()[a],
+        'Name B': unique_rows['_name'].to_numpy()[b],
+        'Similarity': np.round(dice, 3),
+    })
+    return labels[row_codes], pairs
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_entity_resolution(version, _df):
+    return resolve_entities(_df)
+
+def render_entity_panel(df, version):
+    """Communities that look like spellings of the same society"""
+    entity_ids, _ = get_entity_resolution(version, df)
+    counts = np.bincount(entity_ids)
+    duplicated = counts[entity_ids] > 1
+    with st.expander(f"🔗 Possible Duplicate Communities ({len(np.unique(entity_ids[duplicated]))} groups)"):
+        if not duplicated.any():
+            st.success("✅ No duplicate spellings found")
+            return
+        columns = [c for c in ('Community', 'City', 'Pincode', 'Total Households', 'Total Kgs in Jul 2025') if c in df.columns]
+        groups = df.loc[duplicated, columns].copy()
+        groups.insert(0, 'Entity_ID', entity_ids[duplicated])
+        st.dataframe(groups.sort_values('Entity_ID'), hide_index=True, use_container_width=True)
+
+def benchmark_entity_resolution(n_names=500_000, n_blocks=2_000, seed=0):
+    """Time resolution of synthetic society names with spelling variants"""
+    rng = np.random.default_rng(seed)
+    syllables = np.array(['ka', 'ma', 'ra', 'sha', 'vi', 'na', 'pa', 'ti', 'lo', 'de', 'go', 'shi', 'van', 'dir'])
+    suffixes = np.array(['', ' society', ' chs', ' heights', ' park', ' nagar', ' co-op housing'])
+    n_base = n_names // 2
+    base = [''.join(rng.choice(syllables, 4)) + ' ' + ''.join(rng.choice(syllables, 3)) for _ in range(n_base)]
+    picks = rng.integers(0, n_base, n_names)
+    names = pd.Series(np.array(base, dtype=object)[picks])
+    names = names.where(rng.random(n_names) < 0.5, names.str.title()) + suffixes[rng.integers(0, len(suffixes), n_names)]
+    df = pd.DataFrame({
+        'Community': names,
+        'City': 'City ' + pd.Series(picks % n_blocks).astype(str),
+        'Pincode': 400000 + picks % n_blocks,
+    })
+
+    start = time.perf_counter()
+    entity_ids, pairs = resolve_entities(df)
+    elapsed = time.perf_counter() - start
+    return {
+        'names': n_names,
+        'seconds': round(elapsed, 2),
+        'entities': int(len(np.unique(entity_ids))),
+        'matched_pairs': int(len(pairs)),
+    }
+
+# ===== STREAMING STATISTICS =====
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_dataset_stats(version, _df, _stats=None):
+    """Statistics of a dataset version; uploads pass the stats merged from their per-file parse jobs"""
+    return _stats if _stats is not None else StreamingStats.from_frame(_df)
+
 # ===== FILE UPLOAD HANDLER =====
+UPLOAD_TYPES = ["csv", "zip"]
+
+def expand_uploads(files):
+    """(name, bytes) for every CSV among the uploads, including CSVs inside ZIP archives"""
+    sources = []
+    for file in files:
+        payload = file.getvalue()
+        if file.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(io.BytesIO(payload)) as archive:
+                for member in archive.infolist():
+                    base = os.path.basename(member.filename)
+                    if member.is_dir() or base.startswith('.') or '__MACOSX' in member.filename:
+                        continue
+                    if base.lower().endswith('.csv'):
+                        sources.append((f"{file.name}/{member.filename}", archive.read(member)))
+        else:
+            sources.append((file.name, payload))
+    return sources
+
+def _canonical_columns(columns):
+    """Map headers onto REQUIRED_COLUMNS ignoring case and surrounding whitespace"""
+    canonical = {c.lower(): c for c in REQUIRED_COLUMNS + ['Pincode']}
+    return [canonical.get(str(c).strip().lower(), str(c).strip()) for c in columns]
+
+def _parse_upload(payload):
+    """Read and validate one CSV; returns (frame or None, rows read, issues)"""
+    try:
+        df = pd.read_csv(io.BytesIO(payload))
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, ValueError) as e:
+        return None, 0, [str(e)]
+    
+    issues = []
+    df.columns = _canonical_columns(df.columns)
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        return None, len(df), [f"missing columns: {', '.join(missing)}"]
+    if df.columns.duplicated().any():
+        issues.append(f"duplicate columns dropped: {', '.join(df.columns[df.columns.duplicated()])}")
+        df = df.loc[:, ~df.columns.duplicated()]
+    
+    for col in NUMERIC_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce')
+        bad = int((values.isna() & df[col].notna()).sum())
+        if bad:
+            issues.append(f"{bad} non-numeric {col}")
+        df[col] = values
+    return df, len(df), issues
+
+def _parse_upload_job(name, payload):
+    """Parse one upload on a worker; any failure is reported against the file instead of escaping"""
+    start = time.perf_counter()
+    df, stats, rows, issues = None, None, 0, []
+    try:
+        df, rows, issues = _parse_upload(payload)
+        if df is not None:
+            df['Source_File'] = name
+            # Derived columns are row-wise, so they are built per file
+            df = process_data(df, quality_checks=False, geocode=False)
+            stats = StreamingStats.from_frame(df)
+    except Exception as e:
+        df, stats, issues = None, None, issues + [f"{type(e).__name__}: {e}"]
+    return {'name': name, 'frame': df, 'stats': stats, 'rows': rows,
+            'seconds': time.perf_counter() - start, 'issues': issues}
+
+def parse_uploads(sources):
+    """Parse every source on the worker pool; returns the per-file results in upload order"""
+    return run_heavy_tasks(_parse_upload_job, sources)
+
+def merge_uploads(results):
+    """Concatenate valid files and their stats, and build the per-file report"""
+    frames = [r['frame'] for r in results if r['frame'] is not None]
+    report = pd.DataFrame({
+        'File': [r['name'] for r in results],
+        'Rows': [r['rows'] for r in results],
+        'Parse (ms)': [round(1000 * r['seconds'], 1) for r in results],
+        'Status': ['✅ Loaded' if r['frame'] is not None else '❌ Rejected' for r in results],
+        'Issues': ['; '.join(r['issues']) for r in results],
+    })
+    if not frames:
+        return None, None, report
+    
+    merged = pd.concat(frames, ignore_index=True, sort=False)
+    merged['Source_File'] = merged['Source_File'].astype('category')
+    if len(frames) > 1:
+        common = set.intersection(*(set(f.columns) for f in frames))
+        extra = sorted(set(merged.columns) - common)
+        if extra:
+            report.attrs['partial_columns'] = extra
+    stats = StreamingStats()
+    for r in results:
+        if r['stats'] is not None:
+            stats.merge(r['stats'])
+    return merged, stats, report
+
+def render_upload_report(report):
+    """Per-file rows, parse time and validation issues"""
+    rejected = (report['Status'] != '✅ Loaded').any()
+    with st.expander(f"📄 Upload Report ({len(report)} files)", expanded=bool(rejected)):
+        st.dataframe(report, hide_index=True, use_container_width=True)
+        if report.attrs.get('partial_columns'):
+            st.caption(f"Columns missing from some files (left blank): {', '.join(report.attrs['partial_columns'])}")
+
 def handle_file_upload():
-    """Enhanced file upload with immediate processing"""
+    """Upload one or more CSV files or ZIP archives, parse them in parallel and merge"""
     st.markdown("### 📤 Upload Your Waste Management Data")
     
-    uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
-    if uploaded_file is not None:
-        try:
-            # Read file
-            df = pd.read_csv(uploaded_file)
-            st.success(f"✅ File uploaded successfully! {len(df)} records found.")
-            
-            # Show preview
-            with st.expander("📊 Data Preview"):
-                st.dataframe(df.head(), use_container_width=True)
-                st.write(f"**Columns:** {list(df.columns)}")
-            
-            # Process data
-            with st.spinner("🔄 Processing data and calculating metrics..."):
-                processed_df = process_data(df)
-            
-            if processed_df is not None:
-                st.session_state.df = processed_df
-                st.session_state.data_loaded = True
-                st.success("✅ Data processed successfully! All metrics calculated.")
-                
-                # Show quick stats
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Communities", len(processed_df))
-                with col2:
-                    st.metric("Cities", processed_df['City'].nunique())
-                with col3:
-                    st.metric("Total Waste", f"{processed_df['Total Kgs in Jul 2025'].sum():,.0f} kg")
-                with col4:
-                    st.metric("Avg Efficiency", f"{processed_df['Efficiency_Score'].mean():.1f}%")
-                
-                return processed_df
-            else:
-                st.error("❌ Failed to process data. Please check your file format.")
-                return None
-                
-        except Exception as e:
-            st.error(f"❌ Error reading file: {str(e)}")
-            return None
+    uploaded_files = st.file_uploader("Upload CSV files or a ZIP archive", type=UPLOAD_TYPES, accept_multiple_files=True)
+    if not uploaded_files:
+        return None
     
-    return None
+    # Only a new upload selection is ingested again
+    signature = tuple((f.name, f.size, getattr(f, 'file_id', None)) for f in uploaded_files)
+    if st.session_state.get('upload_signature') == signature:
+        render_upload_report(st.session_state.upload_report)
+        return None
+    
+    try:
+        return _ingest_uploads(uploaded_files, signature)
+    except Exception as e:
+        st.error(f"❌ Error processing upload: {str(e)}")
+        return None
+
+def _ingest_uploads(uploaded_files, signature):
+    """Parse, merge, process and activate a new upload selection"""
+    try:
+        sources = expand_uploads(uploaded_files)
+    except zipfile.BadZipFile as e:
+        st.error(f"❌ Error reading archive: {str(e)}")
+        return None
+    if not sources:
+        st.error("❌ No CSV files found in the upload.")
+        return None
+    
+    start = time.perf_counter()
+    with st.spinner(f"📥 Parsing {len(sources)} file(s)..."):
+        merged, stats, report = merge_uploads(parse_uploads(sources))
+    parse_seconds = time.perf_counter() - start
+    
+    render_upload_report(report)
+    if merged is None:
+        st.error("❌ None of the files could be loaded. Please check the file format.")
+        return None
+    
+    loaded = int((report['Status'] == '✅ Loaded').sum())
+    st.success(f"✅ {len(merged)} records from {loaded} of {len(sources)} files parsed in {parse_seconds:.2f}s.")
+    with st.expander("📊 Data Preview"):
+        st.dataframe(merged.head(), use_container_width=True)
+        st.write(f"**Columns:** {list(merged.columns)}")
+    
+    # Metrics were derived per file; checks and geocoding need all rows
+    with st.spinner("🔄 Processing data and calculating metrics..."):
+        start = time.perf_counter()
+        processed_df = process_data(merged, derive=False)
+        process_seconds = time.perf_counter() - start
+    
+    if processed_df is None:
+        st.error("❌ Failed to process data. Please check your file format.")
+        return None
+    
+    processed_df = activate_dataset(processed_df)
+    if processed_df is None:
+        return None
+    get_dataset_stats(st.session_state.dataset_version, processed_df, stats)
+    st.session_state.upload_signature = signature
+    st.session_state.upload_report = report
+    st.success(f"✅ Data processed in {process_seconds:.2f}s! All metrics calculated.")
+    render_quality_report(processed_df)
+    
+    # Show quick stats
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Communities", len(processed_df))
+    with col2:
+        st.metric("Cities", processed_df['City'].nunique())
+    with col3:
+        st.metric("Total Waste", f"{processed_df['Total Kgs in Jul 2025'].sum():,.0f} kg")
+    with col4:
+        st.metric("Avg Efficiency", f"{processed_df['Efficiency_Score'].mean():.1f}%")
+    
+    return processed_df
+
 # ===== ML MODEL =====
+PREDICTION_INTERVAL = (0.05, 0.95)
+IMPORTANCE_SAMPLE_ROWS = 5_000
+IMPORTANCE_HOLDOUT_FRACTION = 0.2
+IMPORTANCE_REPEATS = 5
+
+MODEL_DEFAULT_PARAMS = {'n_estimators': 50, 'random_state': 42}
+
+def training_rows(df, features):
+    """Mask of rows usable for training: complete features and target, non-empty communities"""
+    target = df['Total Kgs in Jul 2025']
+    return (~(df[features].isna().any(axis=1) | target.isna() | (df['Total Households'] == 0))).to_numpy()
+
 class WastePredictionModel:
-    def __init__(self):
+    FEATURES = ['Total Households', 'Latitude', 'Longitude']
+
+    def __init__(self, params=None):
         self.is_trained = False
         self.model = None
         self.scaler = None
+        self.params = {**MODEL_DEFAULT_PARAMS, **(params or {})}
+        self.leaf_values = None
+        self.importance = None
+        self.holdout_rows = None
         
     def train(self, df):
         if not HAS_SKLEARN or len(df) < 10:
             return False
             
         try:
-            features = df[['Total Households', 'Latitude', 'Longitude']].copy()
-            target = df['Total Kgs in Jul 2025'].values
-            
-            mask = ~(features.isna().any(axis=1) | pd.isna(target) | (features['Total Households'] == 0))
-            features = features[mask]
-            target = target[mask]
+            usable = np.flatnonzero(training_rows(df, self.FEATURES))
+            # Rows kept out of the fit so permutation importance is scored on unseen data
+            n_holdout = min(IMPORTANCE_SAMPLE_ROWS, int(len(usable) * IMPORTANCE_HOLDOUT_FRACTION))
+            holdout = np.sort(np.random.default_rng(42).choice(usable, n_holdout, replace=False))
+            fit_rows = np.setdiff1d(usable, holdout)
+            features = df[self.FEATURES].iloc[fit_rows]
+            target = df['Total Kgs in Jul 2025'].to_numpy()[fit_rows]
             
             if len(features) < 5:
                 return False
@@ -562,37 +1576,281 @@ class WastePredictionModel:
             self.scaler = StandardScaler()
             features_scaled = self.scaler.fit_transform(features)
             
-            self.model = RandomForestRegressor(n_estimators=50, random_state=42)
+            self.model = RandomForestRegressor(**self.params)
             self.model.fit(features_scaled, target)
-            
+            self.leaf_values = self._leaf_value_table()
+            self.holdout_rows = holdout
             self.is_trained = True
             return True
             
         except Exception as e:
             return False
     
+    def _leaf_value_table(self):
+        """(n_trees, max_nodes) node values, so per-tree predictions are one gather over ``apply``"""
+        trees = [est.tree_ for est in self.model.estimators_]
+        table = np.zeros((len(trees), max(t.node_count for t in trees)))
+        for i, tree in enumerate(trees):
+            table[i, :tree.node_count] = tree.value[:, 0, 0]
+        return table
+    
     def predict(self, df):
         if not self.is_trained or not HAS_SKLEARN:
             return np.array([])
             
         try:
-            features = df[['Total Households', 'Latitude', 'Longitude']].copy()
+            features = df[self.FEATURES].copy()
             features_scaled = self.scaler.transform(features)
             predictions = self.model.predict(features_scaled)
             return predictions
         except:
             return np.array([])
+    
+    def predict_interval(self, df, quantiles=PREDICTION_INTERVAL):
+        """(mean, lower, upper) from the spread of per-tree predictions"""
+        empty = np.array([])
+        if not self.is_trained or not HAS_SKLEARN or len(df) == 0:
+            return empty, empty, empty
+        try:
+            features_scaled = self.scaler.transform(df[self.FEATURES])
+            leaves = self.model.apply(features_scaled)
+            per_tree = self.leaf_values[np.arange(leaves.shape[1])[None, :], leaves]
+            mean = per_tree.mean(axis=1)
+            # Linear interpolation between order statistics, as np.quantile
+            per_tree.sort(axis=1)
+            position = np.asarray(quantiles) * (per_tree.shape[1] - 1)
+            below = np.floor(position).astype(int)
+            above = np.minimum(below + 1, per_tree.shape[1] - 1)
+            frac = position - below
+            lower, upper = (per_tree[:, below] * (1 - frac) + per_tree[:, above] * frac).T
+            return mean, lower, upper
+        except ValueError:
+            return empty, empty, empty
+
+def _train_model_job(spec, params=None):
+    frame, segment = attach_shared_frame(spec)
+    model = WastePredictionModel(params)
+    model.train(frame)
+    del frame
+    _close_segment(segment)
+    return model
+
+def _importance_job(spec, model, rows, feature, repeats=IMPORTANCE_REPEATS, seed=42):
+    """Mean and std drop in held-out R² when one feature is shuffled"""
+    frame, segment = attach_shared_frame(spec)
+    features = model.scaler.transform(frame[model.FEATURES].iloc[rows])
+    target = frame['Total Kgs in Jul 2025'].to_numpy()[rows]
+    del frame
+    _close_segment(segment)
+    baseline = r2_score(target, model.model.predict(features))
+    rng = np.random.default_rng([seed, feature])
+    drops = []
+    for _ in range(repeats):
+        shuffled = features.copy()
+        shuffled[:, feature] = rng.permutation(shuffled[:, feature])
+        drops.append(baseline - r2_score(target, model.model.predict(shuffled)))
+    return float(np.mean(drops)), float(np.std(drops))
+
+def compute_permutation_importance(spec, model, repeats=IMPORTANCE_REPEATS):
+    """Permutation importance on the model's held-out rows, one worker-pool job per feature"""
+    if model.holdout_rows is None or len(model.holdout_rows) < 2:
+        return None
+    jobs = [(spec, model, model.holdout_rows, i, repeats) for i in range(len(model.FEATURES))]
+    importance, std = zip(*run_heavy_tasks(_importance_job, jobs))
+    return pd.DataFrame({
+        'Feature': model.FEATURES,
+        'Importance': importance,
+        'Std': std,
+    }).sort_values('Importance', ascending=False, ignore_index=True)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def train_shared_model(version, params=()):
+    """Train one model per dataset version and parameter set on the worker pool"""
+    spec = get_shared_store().export_shared(version)
+    if spec is None:
+        return None
+    model = run_heavy_task(_train_model_job, spec, dict(params))
+    if not model.is_trained:
+        return None
+    # A failed importance leaves the fitted model usable
+    try:
+        model.importance = compute_permutation_importance(spec, model)
+    except Exception:
+        model.importance = None
+    return model
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def cached_prediction_intervals(version, params, _df):
+    """Per-row (mean, lower, upper) predictions for a dataset version's shared model"""
+    model = train_shared_model(version, params)
+    if model is None:
+        return None
+    return model.predict_interval(_df)
+
+# ===== MODEL SELECTION =====
+MODEL_SEARCH_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [None, 12, 6],
+    'min_samples_leaf': [1, 5, 20],
+}
+MODEL_SEARCH_ETA = 3
+MODEL_SEARCH_FOLDS = 5
+MODEL_SEARCH_MIN_ROWS = 200
+MODEL_SEARCH_GROUPS = ('City', 'Pincode')
+MODEL_SEARCH_DIR = os.path.join(tempfile.gettempdir(), 'waste_dashboard_model_search')
+
+def search_grid_configs(grid=None):
+    """Every combination of the grid as a list of parameter dicts"""
+    grid = grid or MODEL_SEARCH_GRID
+    keys = list(grid)
+    combos = np.array(np.meshgrid(*[np.arange(len(grid[k])) for k in keys], indexing='ij')).reshape(len(keys), -1).T
+    return [{k: grid[k][i] for k, i in zip(keys, combo)} for combo in combos]
+
+def _cv_job(spec, rows, groups, params, n_splits, seed):
+    """Grouped k-fold R² and timing for one configuration on the given rows"""
+    frame, segment = attach_shared_frame(spec)
+    X = frame[WastePredictionModel.FEATURES].to_numpy()[rows]
+    y = frame['Total Kgs in Jul 2025'].to_numpy()[rows]
+    del frame
+    _close_segment(segment)
+
+    n_groups = len(np.unique(groups))
+    blocked = n_groups >= 2
+    splitter = GroupKFold(n_splits=min(n_splits, n_groups)) if blocked else KFold(min(n_splits, len(rows)), shuffle=True, random_state=seed)
+    scores, fit_seconds, predict_seconds = [], 0.0, 0.0
+    for train, test in splitter.split(X, y, groups):
+        scaler = StandardScaler().fit(X[train])
+        model = RandomForestRegressor(**{**MODEL_DEFAULT_PARAMS, **params, 'random_state': seed})
+        start = time.perf_counter()
+        model.fit(scaler.transform(X[train]), y[train])
+        fit_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = model.predict(scaler.transform(X[test]))
+        predict_seconds += time.perf_counter() - start
+        scores.append(r2_score(y[test], predicted) if len(test) > 1 else np.nan)
+    folds = max(len(scores), 1)
+    return {
+        'R2': float(np.nanmean(scores)) if np.isfinite(scores).any() else float('nan'),
+        'R2_Std': float(np.nanstd(scores)) if np.isfinite(scores).any() else float('nan'),
+        'Fit_s': fit_seconds / folds,
+        'Predict_ms_per_1k': 1e6 * predict_seconds / max(len(rows), 1),
+        'Folds': len(scores),
+        'Blocked': blocked,
+    }
+
+def successive_halving_search(df, spec, group_by='City', grid=None, eta=MODEL_SEARCH_ETA,
+                              n_splits=MODEL_SEARCH_FOLDS, min_rows=MODEL_SEARCH_MIN_ROWS, seed=0):
+    """Grouped-CV hyperparameter search that drops the worst configurations early"""
+    if group_by not in df.columns:
+        raise ValueError(f"Cannot group folds by missing column: {group_by}")
+    configs = search_grid_configs(grid)
+    valid = np.flatnonzero(training_rows(df, WastePredictionModel.FEATURES))
+    order = np.random.default_rng(seed).permutation(valid)
+    group_codes = pd.factorize(df[group_by].astype(str))[0]
+    n_rungs = max(1, int(np.log(len(configs)) / np.log(eta)))
+
+    results = {}
+    alive = list(range(len(configs)))
+    previous_rows = 0
+    for rung in range(n_rungs + 1):
+        n_rows = len(order) if rung == n_rungs else min(len(order), max(min_rows, int(len(order) * eta ** (rung - n_rungs))))
+        if n_rows == previous_rows:
+            # Small datasets reach the full sample early; survivors keep their scores
+            for i in alive:
+                results[i]['Rung'] = rung
+        else:
+            rows = np.sort(order[:n_rows])
+            jobs = [(spec, rows, group_codes[rows], configs[i], n_splits, seed) for i in alive]
+            for i, score in zip(alive, run_heavy_tasks(_cv_job, jobs)):
+                results[i] = {**{k: ('None' if v is None else v) for k, v in configs[i].items()},
+                              **score, 'Rows': n_rows, 'Rung': rung}
+        previous_rows = n_rows
+        if rung == n_rungs or len(alive) == 1:
+            break
+        ranked = sorted(alive, key=lambda i: -np.nan_to_num(results[i]['R2'], nan=-np.inf))
+        alive = ranked[:max(1, int(np.ceil(len(alive) / eta)))]
+
+    board = pd.DataFrame(results.values())
+    return board.sort_values(['Rung', 'R2'], ascending=[False, False], na_position='last', ignore_index=True)
+
+def leaderboard_path(version, group_by):
+    return os.path.join(MODEL_SEARCH_DIR, f"{version}_{group_by}.json")
+
+def load_leaderboard(version, group_by):
+    """Persisted leaderboard for a dataset fingerprint, or None"""
+    path = leaderboard_path(version, group_by)
+    if not os.path.exists(path):
+        return None
+    return pd.read_json(path, orient='records')
+
+def run_model_search(df, version, group_by='City'):
+    """Run the search and persist the leaderboard under the dataset fingerprint"""
+    spec = get_shared_store().export_shared(version)
+    if spec is None:
+        return None
+    board = successive_halving_search(df, spec, group_by)
+    os.makedirs(MODEL_SEARCH_DIR, exist_ok=True)
+    board.to_json(leaderboard_path(version, group_by), orient='records')
+    return board
+
+def leaderboard_params(row):
+    """Model parameters of a leaderboard row as a sorted, hashable tuple"""
+    params = {}
+    for key in MODEL_SEARCH_GRID:
+        value = row[key]
+        params[key] = None if value in ('None', None) or (isinstance(value, float) and np.isnan(value)) else int(value)
+    return tuple(sorted(params.items()))
+
+def render_model_selection_panel(df, version):
+    """Leaderboard of the grouped-CV search with an option to adopt the best configuration"""
+    with st.expander("🏁 Model Selection (grouped cross-validation)"):
+        groups = [g for g in MODEL_SEARCH_GROUPS if g in df.columns]
+        if not groups:
+            st.caption(f"Grouped cross-validation needs one of: {', '.join(MODEL_SEARCH_GROUPS)}")
+            return
+        group_by = st.radio("Hold Out By", groups, horizontal=True,
+                            help="Folds never split a city/pincode, so R² is measured on unseen areas")
+        board = load_leaderboard(version, group_by)
+        if st.button("🔎 Run Hyperparameter Search" if board is None else "🔁 Re-run Search"):
+            with st.spinner(f"🔎 Searching {len(search_grid_configs())} configurations..."):
+                board = run_model_search(df, version, group_by)
+        if board is None or len(board) == 0:
+            st.caption(f"{len(search_grid_configs())} configurations over {', '.join(MODEL_SEARCH_GRID)}; "
+                       "results are kept per dataset")
+            return
+        
+        finalists = board[board['Rung'] == board['Rung'].max()]
+        fig = px.scatter(board, x='Fit_s', y='R2', color='Rung', hover_data=list(MODEL_SEARCH_GRID) + ['Rows'],
+                         title="Held-out R² vs Fit Time", labels={'Fit_s': 'Fit time per fold (s)', 'R2': 'Held-out R²'})
+        fig.update_layout(height=350)
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(board.round({'R2': 3, 'R2_Std': 3, 'Fit_s': 3, 'Predict_ms_per_1k': 2}),
+                     hide_index=True, use_container_width=True)
+        if not board['Blocked'].all():
+            st.caption(f"⚠️ Fewer than two {group_by} values in some samples; those folds were not grouped")
+        
+        best = finalists.iloc[0]
+        st.markdown(f"**Best:** {dict(leaderboard_params(best))} — held-out R² {best['R2']:.3f}, "
+                    f"{best['Fit_s']:.2f}s per fit")
+        if st.button("✅ Use Best Configuration"):
+            st.session_state.ml_model_params = leaderboard_params(best)
+            st.rerun()
 
 # ===== VISUALIZATION FUNCTIONS =====
-def create_metrics_cards(df):
-    """Create enhanced metrics cards"""
-    total_waste = df['Total Kgs in Jul 2025'].sum()
-    total_communities = len(df)
-    avg_efficiency = df['Efficiency_Score'].mean()
-    critical_count = len(df[df['Collection_Status'] == 'Critical'])
-    total_cost = df['Collection_Cost'].sum() + df['Processing_Cost'].sum()
-    
-    col1, col2, col3, col4, col5 = st.columns(5)
+def create_metrics_cards(df, stats=None):
+    """Create enhanced metrics cards, from streaming statistics when available"""
+    if stats is not None:
+        total_waste = stats.sum('Total Kgs in Jul 2025')
+        total_communities = stats.rows
+        avg_efficiency = stats.mean('Efficiency_Score')
+        critical_count = stats.status_counts.get('Critical', 0)
+        total_cost = stats.sum('Collection_Cost') + stats.sum('Processing_Cost')
+    else:
+        total_waste = df['Total Kgs in Jul 2025'].sum()
+        total_communities = len(df)
+        avg_efficiency = df['Efficiency_Score'].mean()
+        critical_count = len(df[df['Collection_Status'] == 'Critical'])
+        total_cost = df['Collection_Cost'].sum() + df['Processing_Cost'].sum()
     
     metrics = [
         (f"{total_waste:,.0f}", "Total Waste (kg)", "🗑️"),
@@ -602,15 +1860,9 @@ def create_metrics_cards(df):
         (f"₹{total_cost:,.0f}", "Total Cost", "💰")
     ]
     
-    for i, (value, label, icon) in enumerate(metrics):
-        with [col1, col2, col3, col4, col5][i]:
-            st.markdown(f"""
-            <div class="metric-card">
-                <div style="font-size: 1.5rem; margin-bottom: 0.5rem;">{icon}</div>
-                <div class="metric-value">{value}</div>
-                <div class="metric-label">{label}</div>
-            </div>
-            """, unsafe_allow_html=True)
+    # Styling lives in the stylesheet
+    cards = ''.join(METRIC_CARD_TEMPLATE.format(value=value, label=label, icon=icon) for value, label, icon in metrics)
+    st.markdown(f'<div class="metric-row">{cards}</div>', unsafe_allow_html=True)
 
 def create_status_pie_chart(df):
     """Create status distribution pie chart"""
@@ -662,24 +1914,14 @@ def create_city_bar_chart(df):
     
     return fig
 
-def create_trend_chart(df):
-    """Create trend analysis chart"""
-    dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
-    base_total = df['Total Kgs in Jul 2025'].sum()
-    
-    trend_data = []
-    for i, date in enumerate(dates):
-        weekly_factor = 1 + 0.1 * np.sin(2 * np.pi * i / 7)
-        random_factor = 1 + np.random.normal(0, 0.05)
-        daily_total = base_total * weekly_factor * random_factor
-        
-        trend_data.append({
-            'Date': date,
-            'Total_Waste': daily_total,
-            'Efficiency': 85 + np.random.normal(0, 5)
-        })
-    
-    trend_df = pd.DataFrame(trend_data)
+def create_trend_chart(df, horizon_days=30, breakdown=None):
+    """Create trend analysis chart with scenario confidence bands"""
+    end = dataset_reference_date(df)
+    trend_df = build_trend_frame(df, horizon_days=horizon_days, breakdown=breakdown, end=end)
+    if breakdown == 'Community':
+        # Every community is simulated; only the largest ones are drawn
+        top = trend_df.groupby('Series', sort=False)['Total_Waste'].sum().nlargest(TREND_MAX_SERIES).index
+        trend_df = trend_df[trend_df['Series'].isin(top)]
     
     fig = make_subplots(
         rows=2, cols=1,
@@ -687,31 +1929,1487 @@ def create_trend_chart(df):
         vertical_spacing=0.1
     )
     
+    palette = px.colors.qualitative.Plotly
+    for i, (series, series_df) in enumerate(trend_df.groupby('Series', sort=False)):
+        color = '#667eea' if series == 'All' else palette[i % len(palette)]
+        add_confidence_band(fig, series_df['Date'], series_df['Lower'], series_df['Upper'], color, row=1, col=1)
+        fig.add_trace(
+            go.Scatter(x=series_df['Date'], y=series_df['Total_Waste'],
+                      mode='lines+markers', name='Daily Waste' if series == 'All' else series,
+                      line=dict(color=color, width=2)),
+            row=1, col=1
+        )
+    
+    efficiency_df = build_efficiency_trend_frame(horizon_days=horizon_days, end=end)
+    add_confidence_band(fig, efficiency_df['Date'], efficiency_df['Lower'], efficiency_df['Upper'], '#28a745', row=2, col=1)
     fig.add_trace(
-        go.Scatter(x=trend_df['Date'], y=trend_df['Total_Waste'],
-                  mode='lines+markers', name='Daily Waste',
-                  line=dict(color='#667eea', width=2)),
-        row=1, col=1
-    )
-    
-    fig.add_trace(
-        go.Scatter(x=trend_df['Date'], y=trend_df['Efficiency'],
+        go.Scatter(x=efficiency_df['Date'], y=efficiency_df['Efficiency'],
                   mode='lines+markers', name='Efficiency %',
                   line=dict(color='#28a745', width=2)),
         row=2, col=1
     )
     
-    fig.update_layout(title="30-Day Analytics Trends", height=600)
+    fig.update_layout(title=f"{horizon_days}-Day Analytics Trends", height=600)
     
     return fig
 
+def add_confidence_band(fig, dates, lower, upper, color, row, col):
+    """Add a shaded lower/upper band behind a trend line"""
+    r, g, b = (int(color.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4))
+    fig.add_trace(
+        go.Scatter(x=dates, y=upper, mode='lines', line=dict(width=0),
+                   showlegend=False, hoverinfo='skip'),
+        row=row, col=col
+    )
+    fig.add_trace(
+        go.Scatter(x=dates, y=lower, mode='lines', line=dict(width=0), fill='tonexty',
+                   fillcolor=f'rgba({r}, {g}, {b}, 0.15)', showlegend=False, hoverinfo='skip'),
+        row=row, col=col
+    )
+
+def create_correlation_heatmap(df, stats=None):
+    """Create correlation matrix heatmap of key metrics"""
+    if stats is not None:
+        corr_matrix = stats.corr(CORRELATION_COLUMNS)
+    else:
+        corr_matrix = df[CORRELATION_COLUMNS].corr()
+    
+    fig = px.imshow(
+        corr_matrix,
+        text_auto=True,
+        aspect="auto",
+        title="Correlation Matrix of Key Metrics",
+        color_continuous_scale="RdBu"
+    )
+    
+    return fig
+
+# ===== TREND SCENARIOS =====
+TREND_SEED = 2025
+TREND_SCENARIOS = 200
+TREND_BAND = (0.05, 0.95)
+TREND_MAX_SERIES = 10
+TREND_BREAKDOWNS = {'City': ['City'], 'Community': ['City', 'Community']}
+
+def dataset_reference_date(df):
+    """Last day of the period the dataset covers, from its dates or its monthly total column"""
+    if 'Date' in df.columns:
+        dates = pd.to_datetime(df['Date'], errors='coerce').dropna()
+        if len(dates):
+            return dates.max().normalize()
+    for column in df.columns:
+        if str(column).startswith('Total Kgs in '):
+            month = pd.to_datetime(str(column)[len('Total Kgs in '):], format='%b %Y', errors='coerce')
+            if not pd.isna(month):
+                return month + pd.offsets.MonthEnd(0)
+    return None
+
+def trend_dates(horizon_days, end=None):
+    """Daily dates for the window ending at ``end`` (today when the data has no reference date)"""
+    end = pd.Timestamp(end if end is not None else datetime.now()).normalize()
+    return pd.date_range(end=end, periods=horizon_days, freq='D')
+
+def seasonal_profile(dates, weekly_amplitude=0.1, annual_amplitude=0.0):
+    """Multiplicative weekly and annual seasonality for each date"""
+    day = np.arange(len(dates))
+    weekly = 1 + weekly_amplitude * np.sin(2 * np.pi * day / 7)
+    annual = 1 + annual_amplitude * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 80) / 365.25)
+    return weekly * annual
+
+def generate_trend_scenarios(base_totals, dates, n_scenarios=TREND_SCENARIOS, noise=0.05,
+                             weekly_amplitude=0.1, annual_amplitude=0.0, seed=TREND_SEED):
+    """Generate seeded seasonal scenarios for any number of series in one array operation"""
+    base = np.asarray(base_totals, dtype='float64').reshape(-1)
+    profile = seasonal_profile(dates, weekly_amplitude, annual_amplitude)
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(1.0, noise, size=(n_scenarios, base.size, len(dates)))
+    return base[None, :, None] * profile[None, None, :] * shocks
+
+def summarize_scenarios(scenarios, band=TREND_BAND):
+    """Median and confidence band across scenarios, each shaped (n_series, n_dates)"""
+    lower, median, upper = np.quantile(scenarios, [band[0], 0.5, band[1]], axis=0)
+    return median, lower, upper
+
+def build_trend_frame(df, horizon_days=30, breakdown=None, end=None, seed=TREND_SEED):
+    """Long-format trend table with one row per (series, date); ``breakdown`` is None, 'City' or 'Community'"""
+    dates = trend_dates(horizon_days, end)
+    if breakdown == 'Community':
+        totals = df.groupby(TREND_BREAKDOWNS[breakdown], sort=True)['Total Kgs in Jul 2025'].sum()
+        totals.index = [f'{community} ({city})' for city, community in totals.index]
+    elif breakdown:
+        totals = df.groupby(TREND_BREAKDOWNS[breakdown], sort=True)['Total Kgs in Jul 2025'].sum()
+        totals.index = totals.index.get_level_values(0)
+    else:
+        totals = pd.Series([df['Total Kgs in Jul 2025'].sum()], index=['All'])
+
+    median, lower, upper = summarize_scenarios(generate_trend_scenarios(totals.values, dates, seed=seed))
+    n_dates = len(dates)
+    return pd.DataFrame({
+        'Series': np.repeat(totals.index.astype(str).to_numpy(), n_dates),
+        'Date': np.tile(dates.to_numpy(), len(totals)),
+        'Total_Waste': median.ravel(),
+        'Lower': lower.ravel(),
+        'Upper': upper.ravel(),
+    })
+
+def build_efficiency_trend_frame(horizon_days=30, baseline=85, spread=5, end=None, seed=TREND_SEED + 1):
+    """System efficiency trend with its confidence band"""
+    dates = trend_dates(horizon_days, end)
+    rng = np.random.default_rng(seed)
+    scenarios = baseline + rng.normal(0, spread, size=(TREND_SCENARIOS, len(dates)))
+    lower, median, upper = np.quantile(scenarios, [TREND_BAND[0], 0.5, TREND_BAND[1]], axis=0)
+    return pd.DataFrame({'Date': dates, 'Efficiency': median, 'Lower': lower, 'Upper': upper})
+
+# ===== COST SCENARIOS =====
+SCENARIO_GROUPS = ('City', 'Community_Type')
+SCENARIO_PERCENTILES = (5, 50, 95)
+SCENARIO_DEFAULTS = {
+    'growth': 0.0,               # mean tonnage growth (fraction)
+    'growth_sd': 0.10,           # per-community spread of growth
+    'participation': 0.8,        # median share of households segregating
+    'baseline_participation': 0.8,
+    'participation_sd': 0.5,     # logit-scale spread per community
+    'rate_sd': 0.15,             # log-scale spread of ₹/kg and CO2/kg rates
+}
+SCENARIO_CHUNK_CELLS = 4_000_000
+SCENARIO_BLOCK_ROWS = 250_000
+
+def sample_scenario_rates(n_draws, rate_sd, seed):
+    """(n_draws, 3) collection, processing and CO2 rates; lognormal around the point values"""
+    rng = np.random.default_rng([seed, 0])
+    base = np.array([COLLECTION_COST_PER_KG, PROCESSING_COST_PER_KG, CO2_KG_PER_KG], dtype='float64')
+    # Mean-preserving lognormal: E[exp(sd·z - sd²/2)] = 1
+    return base * np.exp(rate_sd * rng.standard_normal((n_draws, 3)) - rate_sd ** 2 / 2)
+
+SCENARIO_TABLE_BITS = 16
+
+def _normal_quantiles(n):
+    """Standard normal quantiles at the midpoints of ``n`` equal-probability strata"""
+    u = (np.arange(n) + 0.5) / n
+    if HAS_SCIPY:
+        from scipy.special import ndtri
+        return ndtri(u)
+    return np.array([statistics.NormalDist().inv_cdf(v) for v in u])
+
+def scenario_factor_tables(params):
+    """Lookup tables of growth and participation multipliers, one entry per quantile stratum"""
+    z = _normal_quantiles(2 ** SCENARIO_TABLE_BITS)
+    growth = np.exp(np.log1p(params['growth']) - params['growth_sd'] ** 2 / 2 + params['growth_sd'] * z)
+    p = np.clip(params['participation'], 1e-3, 1 - 1e-3)
+    participation = 1 / (1 + np.exp(-(np.log(p / (1 - p)) + params['participation_sd'] * z)))
+    return growth.astype('float32'), (participation / params['baseline_participation']).astype('float32')
+
+def _simulate_block(kg, group_codes, n_groups, n_draws, tables, seed, block):
+    """Per-group simulated tonnage for one block of communities: (n_groups, n_draws)"""
+    rng = np.random.default_rng([seed, 1, block])
+    growth_table, participation_table = tables
+    indicator = np.zeros((n_groups, len(kg)), dtype='float32')
+    for codes in group_codes:
+        indicator[codes, np.arange(len(kg))] = 1
+    kg = kg.astype('float32')[:, None]
+
+    totals = np.empty((n_groups, n_draws))
+    step = max(1, SCENARIO_CHUNK_CELLS // max(len(kg), 1))
+    for start in range(0, n_draws, step):
+        width = min(step, n_draws - start)
+        idx = rng.integers(0, 2 ** SCENARIO_TABLE_BITS, (2, len(kg), width), dtype='uint16')
+        tonnage = growth_table[idx[0]]
+        tonnage *= participation_table[idx[1]]
+        tonnage *= kg
+        totals[:, start:start + width] = indicator @ tonnage
+    return totals
+
+def simulate_cost_scenarios(df, n_draws=2_000, params=None, seed=0, block_rows=SCENARIO_BLOCK_ROWS):
+    """Monte Carlo distribution of cost and CO2 per City and Community_Type"""
+    params = {**SCENARIO_DEFAULTS, **(params or {})}
+    kg = df['Total Kgs in Jul 2025'].to_numpy(dtype='float64')
+    levels, codes, offset = [], [], 0
+    for column in SCENARIO_GROUPS:
+        code, names = pd.factorize(df[column], sort=True)
+        levels += [(column, name) for name in names]
+        codes.append(code + offset)
+        offset += len(names)
+
+    tables = scenario_factor_tables(params)
+    jobs = [(kg[start:start + block_rows], [c[start:start + block_rows] for c in codes], offset, n_draws,
+             tables, seed, block) for block, start in enumerate(range(0, len(kg), block_rows))]
+    tonnage = sum(run_heavy_tasks(_simulate_block, jobs)) if jobs else np.zeros((offset, n_draws))
+    rates = sample_scenario_rates(n_draws, params['rate_sd'], seed)
+
+    # The first grouping covers every community exactly once
+    n_first = int(codes[0].max()) + 1 if len(kg) else 0
+    tonnage = np.vstack([tonnage, tonnage[:n_first].sum(axis=0, keepdims=True)])
+    levels.append(('All', 'All Communities'))
+    baseline_kg = np.append(np.bincount(np.concatenate(codes), weights=np.tile(kg, len(codes)), minlength=offset),
+                            kg.sum())
+    metrics = {
+        'Total Cost (₹)': (tonnage * (rates[:, 0] + rates[:, 1]), baseline_kg * (COLLECTION_COST_PER_KG + PROCESSING_COST_PER_KG)),
+        'CO2 (kg)': (tonnage * rates[:, 2], baseline_kg * CO2_KG_PER_KG),
+    }
+    rows = []
+    for metric, (values, baseline) in metrics.items():
+        quantiles = np.percentile(values, SCENARIO_PERCENTILES, axis=1)
+        means = values.mean(axis=1)
+        for i, (column, name) in enumerate(levels):
+            rows.append({'Group By': column, 'Group': name, 'Metric': metric, 'Baseline': baseline[i],
+                         'Mean': means[i], **{f'P{q}': quantiles[j, i] for j, q in enumerate(SCENARIO_PERCENTILES)}})
+    return pd.DataFrame(rows)
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_cost_scenarios(version, n_draws, params, seed, _df):
+    """Scenario percentiles per dataset version and parameter set; ``params`` is a sorted item tuple"""
+    return simulate_cost_scenarios(_df, n_draws, dict(params), seed)
+
+def create_scenario_chart(results, metric, group_by):
+    """Median per group with P5–P95 whiskers against the point estimate"""
+    rows = results[(results['Metric'] == metric) & (results['Group By'] == group_by)]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=rows['Group'], y=rows['P50'], name='Median (P50)', marker_color='#4ecdc4',
+        error_y=dict(type='data', symmetric=False, array=rows['P95'] - rows['P50'],
+                     arrayminus=rows['P50'] - rows['P5'])
+    ))
+    fig.add_trace(go.Scatter(x=rows['Group'], y=rows['Baseline'], mode='markers', name='Point estimate',
+                             marker=dict(symbol='diamond', size=10, color='#ff6b6b')))
+    fig.update_layout(title=f"{metric} by {group_by.replace('_', ' ')} (P5–P95)", height=400)
+    return fig
+
+def benchmark_cost_scenarios(n_communities=1_000_000, n_draws=1_000, seed=0):
+    """Throughput of the scenario simulator on synthetic communities"""
+    rng = np.random.default_rng(seed)
+    base = create_real_sample_data()
+    df = base.iloc[rng.integers(0, len(base), n_communities)].reset_index(drop=True)
+    df['Community_Type'] = np.array(['Large Residential', 'Medium Residential', 'Small Residential',
+                                     'Community Housing'])[rng.integers(0, 4, n_communities)]
+    start = time.perf_counter()
+    simulate_cost_scenarios(df, n_draws, seed=seed)
+    elapsed = time.perf_counter() - start
+    return {
+        'communities': n_communities,
+        'draws': n_draws,
+        'workers': MAX_WORKERS,
+        'seconds': round(elapsed, 2),
+        'ns_per_cell': round(elapsed / (n_communities * n_draws) * 1e9, 2),
+    }
+
+# ===== FIGURE CACHE =====
+TYPED_ARRAY_MIN_LENGTH = 256
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+_TYPED_ARRAY_CODES = {'float64': 'f8', 'float32': 'f4', 'int32': 'i4', 'uint32': 'u4',
+                      'int16': 'i2', 'uint16': 'u2', 'int8': 'i1', 'uint8': 'u1'}
+
+def _encode_typed_arrays(node):
+    """Replace long numeric arrays with plotly.js typed-array (base64) specs"""
+    if isinstance(node, dict):
+        return {k: _encode_typed_arrays(v) for k, v in node.items()}
+    if isinstance(node, (list, tuple, np.ndarray)):
+        if len(node) >= TYPED_ARRAY_MIN_LENGTH:
+            arr = np.asarray(node)
+            if arr.ndim == 1 and arr.dtype.kind in 'iuf':
+                if arr.dtype.name not in _TYPED_ARRAY_CODES:
+                    arr = arr.astype('float64')
+                return {'dtype': _TYPED_ARRAY_CODES[arr.dtype.name],
+                        'bdata': base64.b64encode(np.ascontiguousarray(arr).tobytes()).decode('ascii')}
+        return [_encode_typed_arrays(v) for v in node]
+    return node
+
+def serialize_figure(fig):
+    """Serialize a figure to compact JSON with binary-encoded large traces"""
+    fig_dict = fig.to_plotly_json()
+    fig_dict['data'] = [_encode_typed_arrays(trace) for trace in fig_dict['data']]
+    return json.dumps(fig_dict, cls=plotly.utils.PlotlyJSONEncoder, separators=(',', ':'))
+
+class FigureCache:
+    """LRU cache of built figures bounded by their serialized size"""
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, fig, nbytes):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (fig, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def invalidate(self, version):
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == version]:
+                self._bytes -= self._entries.pop(key)[1]
+
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache()
+
+def get_cached_figure(chart_id, version, builder, *args, filter_state=None):
+    """Return the figure for (chart id, dataset version, filter state), building it only on a miss"""
+    cache = get_figure_cache()
+    key = (chart_id, version, json.dumps(filter_state, sort_keys=True, default=str))
+    fig = cache.get(key)
+    if fig is None:
+        fig = builder(*args)
+        # Hits hand back the built figure; the compact payload only sizes the entry
+        cache.put(key, fig, len(serialize_figure(fig)))
+    return fig
+
+# ===== BOUNDARY LAYERS =====
+BOUNDARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'boundaries')
+WARD_NAME_PROPERTIES = ('ward', 'Ward', 'WARD', 'ward_name', 'name', 'Name', 'NAME')
+PINCODE_PROPERTIES = ('pincode', 'Pincode', 'PINCODE', 'pin_code', 'PIN', 'pin')
+PIP_MAX_CELLS = 4_000_000
+
+def _first_property(properties, candidates):
+    for key in candidates:
+        if properties.get(key) not in (None, ''):
+            return properties[key]
+    return None
+
+def _polygon_parts(geometry):
+    """Polygon/MultiPolygon geometry as a list of parts, each a list of (m, 2) rings"""
+    if geometry is None:
+        return []
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return []
+    return [[np.asarray(ring, dtype='float64')[:, :2] for ring in polygon] for polygon in polygons if polygon]
+
+def points_in_ring(x, y, ring):
+    """Vectorized even-odd ray casting of points against one closed ring"""
+    x0, y0 = ring[:-1, 0], ring[:-1, 1]
+    x1, y1 = ring[1:, 0], ring[1:, 1]
+    inside = np.zeros(len(x), dtype=bool)
+    step = max(1, PIP_MAX_CELLS // max(len(x0), 1))
+    for start in range(0, len(x), step):
+        px = x[start:start + step, None]
+        py = y[start:start + step, None]
+        crosses = (y0 > py) != (y1 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        inside[start:start + step] = np.count_nonzero(crosses & (px < x_cross), axis=1) % 2 == 1
+    return inside
+
+def points_in_polygon(x, y, parts):
+    inside = np.zeros(len(x), dtype=bool)
+    for rings in parts:
+        in_part = points_in_ring(x, y, rings[0])
+        for hole in rings[1:]:
+            in_part &= ~points_in_ring(x, y, hole)
+        inside |= in_part
+    return inside
+
+class BoundaryLayer:
+    """Polygon layer (wards, pincodes) with a spatial index for point assignment"""
+
+    def __init__(self, name, features):
+        self.name = name
+        self.features = [f for f in features if _polygon_parts(f.get('geometry'))]
+        self.properties = [f.get('properties') or {} for f in self.features]
+        self.labels = np.array([
+            str(_first_property(p, WARD_NAME_PROPERTIES) or _first_property(p, PINCODE_PROPERTIES) or i)
+            for i, p in enumerate(self.properties)
+        ], dtype=object)
+        self.pincodes = pd.to_numeric(
+            pd.Series([_first_property(p, PINCODE_PROPERTIES) for p in self.properties], dtype=object),
+            errors='coerce'
+        ).to_numpy()
+        self.parts = [_polygon_parts(f['geometry']) for f in self.features]
+        self.bounds = np.array([
+            [min(r[:, 0].min() for part in parts for r in part[:1]),
+             min(r[:, 1].min() for part in parts for r in part[:1]),
+             max(r[:, 0].max() for part in parts for r in part[:1]),
+             max(r[:, 1].max() for part in parts for r in part[:1])]
+            for parts in self.parts
+        ]).reshape(-1, 4)
+        self._tree = None
+        self._geoms = None
+        self._grid = None
+
+    @classmethod
+    def from_geojson(cls, path):
+        with open(path, encoding='utf-8') as fh:
+            collection = json.load(fh)
+        name = os.path.splitext(os.path.basename(path))[0]
+        return cls(name, collection.get('features', []))
+
+    @property
+    def has_pincodes(self):
+        return bool(np.isfinite(self.pincodes).any())
+
+    def _build_grid(self):
+        n = len(self.bounds)
+        xmin, ymin = self.bounds[:, 0].min(), self.bounds[:, 1].min()
+        xmax, ymax = self.bounds[:, 2].max(), self.bounds[:, 3].max()
+        cells = max(1, int(np.sqrt(n)) * 2)
+        cw = max((xmax - xmin) / cells, 1e-12)
+        ch = max((ymax - ymin) / cells, 1e-12)
+
+        cx0 = np.clip(((self.bounds[:, 0] - xmin) / cw).astype(int), 0, cells - 1)
+        cx1 = np.clip(((self.bounds[:, 2] - xmin) / cw).astype(int), 0, cells - 1)
+        cy0 = np.clip(((self.bounds[:, 1] - ymin) / ch).astype(int), 0, cells - 1)
+        cy1 = np.clip(((self.bounds[:, 3] - ymin) / ch).astype(int), 0, cells - 1)
+
+        poly_ids, cell_ids = [], []
+        for pid in range(n):
+            gx, gy = np.meshgrid(np.arange(cx0[pid], cx1[pid] + 1), np.arange(cy0[pid], cy1[pid] + 1))
+            cell_ids.append((gy * cells + gx).ravel())
+            poly_ids.append(np.full(gx.size, pid))
+        cell_ids = np.concatenate(cell_ids)
+        poly_ids = np.concatenate(poly_ids)
+        order = np.argsort(cell_ids, kind='stable')
+        offsets = np.searchsorted(cell_ids[order], np.arange(cells * cells + 1))
+        self._grid = (xmin, ymin, cw, ch, cells, offsets, poly_ids[order])
+
+    def _locate_grid(self, x, y):
+        if self._grid is None:
+            self._build_grid()
+        xmin, ymin, cw, ch, cells, offsets, members = self._grid
+        result = np.full(len(x), -1, dtype=np.int64)
+
+        gx = np.floor((x - xmin) / cw)
+        gy = np.floor((y - ymin) / ch)
+        ok = (gx >= 0) & (gx < cells) & (gy >= 0) & (gy < cells)
+        point_idx = np.flatnonzero(ok)
+        cell = (gy[ok] * cells + gx[ok]).astype(np.int64)
+        counts = offsets[cell + 1] - offsets[cell]
+
+        # Expand to (point, candidate polygon) pairs, then exact bbox filter
+        pair_point = np.repeat(point_idx, counts)
+        starts = np.repeat(offsets[cell], counts)
+        within = np.arange(len(pair_point)) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_poly = members[starts + within]
+        b = self.bounds[pair_poly]
+        px, py = x[pair_point], y[pair_point]
+        keep = (px >= b[:, 0]) & (px <= b[:, 2]) & (py >= b[:, 1]) & (py <= b[:, 3])
+        pair_point, pair_poly = pair_point[keep], pair_poly[keep]
+
+        order = np.argsort(pair_poly, kind='stable')
+        pair_point, pair_poly = pair_point[order], pair_poly[order]
+        splits = np.flatnonzero(np.diff(pair_poly)) + 1
+        for pts, polys in zip(np.split(pair_point, splits), np.split(pair_poly, splits)):
+            if len(pts) == 0:
+                continue
+            pts = pts[result[pts] < 0]
+            hit = points_in_polygon(x[pts], y[pts], self.parts[polys[0]])
+            result[pts[hit]] = polys[0]
+        return result
+
+    def _locate_shapely(self, x, y):
+        if self._tree is None:
+            self._geoms = np.array([shape(f['geometry']) for f in self.features], dtype=object)
+            shapely.prepare(self._geoms)
+            self._tree = shapely.STRtree(self._geoms)
+        result = np.full(len(x), -1, dtype=np.int64)
+        point_idx, poly_idx = self._tree.query(shapely.points(x, y), predicate='intersects')
+        result[point_idx[::-1]] = poly_idx[::-1]
+        return result
+
+    def locate(self, lon, lat, backend=None):
+        """Index of the polygon containing each point, -1 when outside every polygon"""
+        lon = np.asarray(lon, dtype='float64')
+        lat = np.asarray(lat, dtype='float64')
+        result = np.full(len(lon), -1, dtype=np.int64)
+        valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+        if len(valid) == 0 or len(self.features) == 0:
+            return result
+        backend = backend or ('shapely' if HAS_SHAPELY else 'grid')
+        locate = self._locate_shapely if backend == 'shapely' else self._locate_grid
+        result[valid] = locate(lon[valid], lat[valid])
+        return result
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_boundary_layers(boundary_dir=BOUNDARY_DIR, mtimes=None):
+    """All GeoJSON polygon layers in ``boundary_dir``, keyed by file name; ``mtimes`` keys the cache to file edits"""
+    layers = {}
+    if not os.path.isdir(boundary_dir):
+        return layers
+    for name in sorted(os.listdir(boundary_dir)):
+        if name.lower().endswith(('.geojson', '.json')):
+            layer = BoundaryLayer.from_geojson(os.path.join(boundary_dir, name))
+            if layer.features:
+                layers[layer.name] = layer
+    return layers
+
+def boundary_layers_signature(boundary_dir=BOUNDARY_DIR):
+    if not os.path.isdir(boundary_dir):
+        return ()
+    return tuple(sorted(
+        (name, os.path.getmtime(os.path.join(boundary_dir, name))) for name in os.listdir(boundary_dir)
+    ))
+
+def assign_boundaries(df, layers):
+    """Per-community boundary labels for each layer plus pincode mismatch flags"""
+    lon = df['Longitude'].to_numpy(dtype='float64')
+    lat = df['Latitude'].to_numpy(dtype='float64')
+    result = pd.DataFrame(index=df.index)
+    mismatch = None
+    for name, layer in layers.items():
+        idx = layer.locate(lon, lat)
+        found = idx >= 0
+        labels = np.where(found, layer.labels[np.maximum(idx, 0)], None)
+        result[f'{name}_Index'] = idx
+        result[name] = labels
+        if layer.has_pincodes and 'Pincode' in df.columns:
+            boundary_pin = np.where(found, layer.pincodes[np.maximum(idx, 0)], np.nan)
+            declared = pd.to_numeric(df['Pincode'], errors='coerce').to_numpy(dtype='float64')
+            result[f'{name}_Pincode'] = boundary_pin
+            # Blank declared pincodes are unknown; any disagreeing layer flags
+            layer_mismatch = np.isfinite(boundary_pin) & np.isfinite(declared) & (boundary_pin != declared)
+            mismatch = layer_mismatch if mismatch is None else mismatch | layer_mismatch
+    if mismatch is not None:
+        result['Pincode_Mismatch'] = mismatch
+    return result
+
+# A None result (dataset released, no layers) is recomputed on the next call instead of being reused
+@st.cache_resource(max_entries=8, show_spinner=False, validate=lambda assignment: assignment is not None)
+def compute_boundary_assignment(version, signature):
+    df = get_session_manager().dataset(version)
+    layers = load_boundary_layers(mtimes=signature)
+    if df is None or not layers:
+        return None
+    return assign_boundaries(df, layers)
+
+def create_boundary_choropleth_layer(df, layer, assignment):
+    """PyDeck GeoJsonLayer of boundary polygons shaded by total waste"""
+    if not HAS_PYDECK:
+        return None
+    idx = assignment[f'{layer.name}_Index'].to_numpy()
+    kg = df['Total Kgs in Jul 2025'].to_numpy(dtype='float64')
+    households = df['Total Households'].to_numpy(dtype='float64')
+    inside = idx >= 0
+    n = len(layer.features)
+    kg_sum = np.bincount(idx[inside], weights=kg[inside], minlength=n)
+    hh_sum = np.bincount(idx[inside], weights=households[inside], minlength=n)
+    counts = np.bincount(idx[inside], minlength=n)
+    scale = kg_sum / kg_sum.max() if kg_sum.max() > 0 else kg_sum
+
+    features = []
+    for i, feature in enumerate(layer.features):
+        features.append({
+            'type': 'Feature',
+            'geometry': feature['geometry'],
+            'properties': {
+                'Community': layer.labels[i],
+                'City': f"{layer.name} ({int(counts[i])} communities)",
+                'Total_Kgs': round(float(kg_sum[i]), 1),
+                'Total_Households': int(hh_sum[i]),
+                'Collection_Status': '-',
+                'Color': [int(255 * scale[i]), int(120 * (1 - scale[i])), 80, 60 + int(140 * scale[i])],
+            }
+        })
+
+    return pdk.Layer(
+        'GeoJsonLayer',
+        data={'type': 'FeatureCollection', 'features': features},
+        get_fill_color='properties.Color',
+        get_line_color=[255, 255, 255, 180],
+        line_width_min_pixels=1,
+        filled=True,
+        stroked=True,
+        pickable=True,
+        auto_highlight=True
+    )
+
+def _synthetic_boundaries(n_polygons, bounds=(72.7, 18.0, 73.5, 19.3), vertices=12, seed=0):
+    """Grid of jittered convex polygons used by the spatial join benchmark"""
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n_polygons)))
+    cw = (bounds[2] - bounds[0]) / side
+    ch = (bounds[3] - bounds[1]) / side
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    features = []
+    for i in range(n_polygons):
+        cx = bounds[0] + (i % side + 0.5) * cw
+        cy = bounds[1] + (i // side + 0.5) * ch
+        r = 0.5 * rng.uniform(0.85, 1.0, vertices)
+        ring = np.column_stack([cx + r * cw * np.cos(angles), cy + r * ch * np.sin(angles)])
+        ring = np.vstack([ring, ring[:1]])
+        features.append({'type': 'Feature', 'properties': {'ward': f'W{i}', 'pincode': 400000 + i},
+                         'geometry': {'type': 'Polygon', 'coordinates': [ring.tolist()]}})
+    return features
+
+def benchmark_spatial_join(n_points=1_000_000, n_polygons=10_000, backends=None, seed=0):
+    """Time point-in-polygon assignment of ``n_points`` against ``n_polygons``"""
+    rng = np.random.default_rng(seed)
+    layer = BoundaryLayer('bench', _synthetic_boundaries(n_polygons, seed=seed))
+    lon = rng.uniform(72.7, 73.5, n_points)
+    lat = rng.uniform(18.0, 19.3, n_points)
+    results = []
+    for backend in backends or (['shapely', 'grid'] if HAS_SHAPELY else ['grid']):
+        start = time.perf_counter()
+        idx = layer.locate(lon, lat, backend=backend)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'backend': backend,
+            'points': n_points,
+            'polygons': n_polygons,
+            'seconds': round(elapsed, 2),
+            'points_per_sec': int(n_points / elapsed),
+            'assigned': int((idx >= 0).sum()),
+        })
+    return results
+
+def render_boundary_panel(df, version):
+    """Ward/pincode assignment, mismatch report and choropleth"""
+    st.markdown("### 🧭 Ward & Pincode Boundaries")
+    signature = boundary_layers_signature()
+    layers = load_boundary_layers(mtimes=signature)
+    if not layers:
+        st.info(f"📂 Add ward or pincode GeoJSON files to `{BOUNDARY_DIR}` to enable boundary analysis")
+        return
+    
+    with st.spinner("🧭 Assigning communities to boundaries..."):
+        assignment = compute_boundary_assignment(version, signature)
+    if assignment is None:
+        st.warning("⚠️ The dataset is no longer loaded; load it again to assign boundaries")
+        return
+    
+    layer_name = st.selectbox("Boundary Layer", list(layers))
+    layer = layers[layer_name]
+    assigned = assignment[layer_name].notna()
+    st.caption(f"{int(assigned.sum())} of {len(df)} communities fall inside a `{layer_name}` polygon")
+    
+    if HAS_PYDECK:
+        center_lat, center_lon = map_center(df)
+        deck = create_advanced_3d_deck(df, [create_boundary_choropleth_layer(df, layer, assignment)], {
+            'longitude': center_lon,
+            'latitude': center_lat,
+            'zoom': 10,
+            'pitch': 0,
+            'bearing': 0
+        })
+        st.pydeck_chart(deck)
+    
+    if 'Pincode_Mismatch' in assignment.columns:
+        mismatches = assignment['Pincode_Mismatch']
+        if mismatches.any():
+            st.warning(f"⚠️ {int(mismatches.sum())} communities have a Pincode that disagrees with their boundary polygon")
+            pin_cols = [c for c in assignment.columns if c.endswith('_Pincode')]
+            report = df.loc[mismatches, ['Community', 'City', 'Pincode']].join(assignment.loc[mismatches, pin_cols])
+            st.dataframe(report, use_container_width=True)
+        else:
+            st.success("✅ All declared pincodes match their boundary polygons")
+
+# ===== TRANSFER POINT PLANNING =====
+SITE_COLORS = [[31, 119, 180], [255, 127, 14], [44, 160, 44], [214, 39, 40], [148, 103, 189],
+               [140, 86, 75], [227, 119, 194], [127, 127, 127], [188, 189, 34], [23, 190, 207]]
+
+def _to_unit_xyz(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def _to_lat_lon(xyz):
+    xyz = xyz / np.linalg.norm(xyz, axis=1, keepdims=True)
+    return np.degrees(np.arcsin(np.clip(xyz[:, 2], -1, 1))), np.degrees(np.arctan2(xyz[:, 1], xyz[:, 0]))
+
+def _sq_distances(points, centers):
+    return (np.einsum('ij,ij->i', points, points)[:, None] - 2 * points @ centers.T
+            + np.einsum('ij,ij->i', centers, centers)[None, :])
+
+def _kmeans_plus_plus(points, weights, k, rng):
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    closest = _sq_distances(points, np.array(centers))[:, 0]
+    for _ in range(1, k):
+        prob = np.maximum(closest, 0) * weights
+        idx = rng.choice(len(points), p=prob / prob.sum()) if prob.sum() > 0 else rng.integers(len(points))
+        centers.append(points[idx])
+        closest = np.minimum(closest, _sq_distances(points, points[idx][None, :])[:, 0])
+    return np.array(centers)
+
+def weighted_minibatch_kmeans(points, weights, k, batch_size=4096, iterations=100, seed=0):
+    """Weighted mini-batch k-means; returns (centers, weighted squared-distance cost)"""
+    rng = np.random.default_rng(seed)
+    if len(points) > batch_size:
+        # Seed from a weighted sample; k-means++ on all points is O(n k)
+        sample = rng.choice(len(points), size=batch_size, p=weights / weights.sum())
+        centers = _kmeans_plus_plus(points[sample], np.ones(batch_size), k, rng)
+    else:
+        centers = _kmeans_plus_plus(points, weights, k, rng)
+    if len(points) <= batch_size:
+        # Small inputs: plain weighted Lloyd iterations on all points
+        for _ in range(iterations):
+            labels = _sq_distances(points, centers).argmin(axis=1)
+            mass = np.bincount(labels, weights=weights, minlength=k)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, points * weights[:, None])
+            moved = mass > 0
+            new_centers = centers.copy()
+            new_centers[moved] = sums[moved] / mass[moved, None]
+            if np.allclose(new_centers, centers):
+                break
+            centers = new_centers
+    else:
+        mass = np.zeros(k)
+        cdf = np.cumsum(weights)
+        for _ in range(iterations):
+            batch = np.minimum(np.searchsorted(cdf, rng.random(batch_size) * cdf[-1]), len(points) - 1)
+            labels = _sq_distances(points[batch], centers).argmin(axis=1)
+            # Batch is drawn proportional to weight, so each draw counts once
+            counts = np.bincount(labels, minlength=k)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, points[batch])
+            mass += counts
+            seen = counts > 0
+            rate = counts[seen] / mass[seen]
+            centers[seen] = (1 - rate)[:, None] * centers[seen] + rate[:, None] * (sums[seen] / counts[seen, None])
+    d2 = _sq_distances(points, centers)
+    return centers, float((d2.min(axis=1) * weights).sum())
+
+def snap_to_medoids(lat, lon, weights, labels, site_lat, site_lon, max_candidates=100, max_members=5000, seed=0):
+    """Move each site to the member community minimizing weighted haversine distance (k-medoids step)"""
+    rng = np.random.default_rng(seed)
+    site_lat, site_lon = site_lat.copy(), site_lon.copy()
+    for site in range(len(site_lat)):
+        members = np.flatnonzero(labels == site)
+        if len(members) == 0:
+            continue
+        candidates = members if len(members) <= max_candidates else rng.choice(members, max_candidates, replace=False)
+        sample, sample_weights = members, weights[members]
+        if len(members) > max_members:
+            sample = rng.choice(members, max_members, p=sample_weights / sample_weights.sum())
+            sample_weights = np.ones(max_members)
+        cost = (haversine_km(lat[candidates, None], lon[candidates, None], lat[None, sample], lon[None, sample])
+                * sample_weights[None, :]).sum(axis=1)
+        best = candidates[cost.argmin()]
+        site_lat[site], site_lon[site] = lat[best], lon[best]
+    return site_lat, site_lon
+
+def capacitated_assignment(distances, demand, capacity):
+    """Assign each community to its nearest site with spare capacity"""
+    n, k = distances.shape
+    order = np.argsort(distances, axis=1)
+    labels = np.full(n, -1)
+    load = np.zeros(k)
+    for rank in range(k):
+        pending = np.flatnonzero(labels < 0)
+        if len(pending) == 0:
+            break
+        proposal = order[pending, rank]
+        dist = distances[pending, proposal]
+        sort = np.lexsort((dist, proposal))
+        pending, proposal = pending[sort], proposal[sort]
+        running = np.zeros(len(pending))
+        for site in np.unique(proposal):
+            in_site = proposal == site
+            running[in_site] = load[site] + np.cumsum(demand[pending[in_site]])
+        accepted = running <= capacity
+        labels[pending[accepted]] = proposal[accepted]
+        load += np.bincount(proposal[accepted], weights=demand[pending[accepted]], minlength=k)
+    unplaced = labels < 0
+    labels[unplaced] = order[unplaced, 0]
+    return labels
+
+def plan_transfer_points(df, k, capacity_kg=0, medoids=True, n_init=4, seed=0):
+    """Site ``k`` transfer points for the communities, weighted by monthly waste"""
+    mappable = df[valid_coordinates(df)]
+    lat = mappable['Latitude'].to_numpy(dtype='float64')
+    lon = mappable['Longitude'].to_numpy(dtype='float64')
+    kg = mappable['Total Kgs in Jul 2025'].to_numpy(dtype='float64')
+    weights = kg + 1e-3
+    k = max(1, min(k, len(mappable)))
+    points = _to_unit_xyz(lat, lon)
+
+    with ThreadPoolExecutor(max_workers=min(n_init, MAX_WORKERS + 1)) as pool:
+        runs = list(pool.map(lambda s: weighted_minibatch_kmeans(points, weights, k, seed=s),
+                             range(seed, seed + n_init)))
+    centers, _ = min(runs, key=lambda r: r[1])
+    site_lat, site_lon = _to_lat_lon(centers)
+
+    distances = haversine_km(lat[:, None], lon[:, None], site_lat[None, :], site_lon[None, :])
+    labels = distances.argmin(axis=1)
+    if medoids:
+        site_lat, site_lon = snap_to_medoids(lat, lon, weights, labels, site_lat, site_lon, seed=seed)
+        distances = haversine_km(lat[:, None], lon[:, None], site_lat[None, :], site_lon[None, :])
+        labels = distances.argmin(axis=1)
+    if capacity_kg > 0:
+        labels = capacitated_assignment(distances, kg, capacity_kg)
+
+    assignment = mappable[['Community', 'City', 'Latitude', 'Longitude', 'Total Kgs in Jul 2025',
+                           'Total Households', 'Collection_Status']].copy()
+    assignment['Site'] = labels
+    assignment['Distance_km'] = distances[np.arange(len(labels)), labels]
+    sites = pd.DataFrame({
+        'Site': np.arange(k),
+        'Latitude': site_lat,
+        'Longitude': site_lon,
+        'Communities': np.bincount(labels, minlength=k),
+        'Total_Kgs': np.bincount(labels, weights=kg, minlength=k),
+        'Total_Households': np.bincount(labels, weights=assignment['Total Households'].to_numpy(dtype='float64'), minlength=k),
+    })
+    return sites, assignment
+
+def catchment_coverage(assignment, radius_km):
+    """Share of communities and waste within ``radius_km`` of their site"""
+    kg = assignment['Total Kgs in Jul 2025'].to_numpy(dtype='float64')
+    dist = assignment['Distance_km'].to_numpy()
+    within = dist <= radius_km
+    total = kg.sum()
+    return {
+        'Communities within (%)': round(100 * float(within.mean()), 1) if len(dist) else 0.0,
+        'Kg within': round(float(kg[within].sum()), 1),
+        'Kg within (%)': round(100 * float(kg[within].sum() / total), 1) if total > 0 else 0.0,
+        'Weighted mean km': round(float((dist * kg).sum() / total), 2) if total > 0 else 0.0,
+        'Max km': round(float(dist.max()), 2) if len(dist) else 0.0,
+    }
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def cached_transfer_points(version, k, capacity_kg, medoids, _df):
+    return plan_transfer_points(_df, k, capacity_kg, medoids)
+
+def create_transfer_point_layers(sites, assignment):
+    """PyDeck layers: catchment spokes, communities coloured by site and the sites"""
+    if not HAS_PYDECK:
+        return []
+    colors = [SITE_COLORS[i % len(SITE_COLORS)] for i in range(len(sites))]
+    site_pos = sites[['Longitude', 'Latitude']].to_numpy()
+    labels = assignment['Site'].to_numpy()
+
+    spokes = pd.DataFrame({
+        'source': assignment[['Longitude', 'Latitude']].to_numpy().tolist(),
+        'target': site_pos[labels].tolist(),
+        'Color': [colors[s] + [90] for s in labels],
+    })
+    members = pd.DataFrame({
+        'Longitude': assignment['Longitude'], 'Latitude': assignment['Latitude'],
+        'Community': assignment['Community'], 'City': assignment['City'],
+        'Total_Kgs': assignment['Total Kgs in Jul 2025'], 'Total_Households': assignment['Total Households'],
+        'Collection_Status': 'Site ' + assignment['Site'].astype(str) + ', ' + assignment['Distance_km'].round(2).astype(str) + ' km',
+        'Color': [colors[s] + [180] for s in labels],
+    })
+    site_points = pd.DataFrame({
+        'Longitude': sites['Longitude'], 'Latitude': sites['Latitude'],
+        'Community': 'Transfer Point ' + sites['Site'].astype(str), 'City': sites['Communities'].astype(str) + ' communities',
+        'Total_Kgs': sites['Total_Kgs'].round(1), 'Total_Households': sites['Total_Households'].astype(int),
+        'Collection_Status': 'Proposed site', 'Color': [c + [255] for c in colors],
+    })
+    return [
+        pdk.Layer('LineLayer', data=spokes, get_source_position='source', get_target_position='target',
+                  get_color='Color', get_width=1, width_min_pixels=1),
+        pdk.Layer('ScatterplotLayer', data=members, get_position=['Longitude', 'Latitude'], get_fill_color='Color',
+                  get_radius=60, radius_min_pixels=3, pickable=True),
+        pdk.Layer('ScatterplotLayer', data=site_points, get_position=['Longitude', 'Latitude'], get_fill_color='Color',
+                  get_line_color=[0, 0, 0, 255], stroked=True, line_width_min_pixels=2,
+                  get_radius=250, radius_min_pixels=8, pickable=True),
+    ]
+
+def render_transfer_point_panel(df, version):
+    """Transfer point siting with catchments and coverage comparison"""
+    st.markdown("### 🏗️ Transfer Point Planning")
+    n = int(valid_coordinates(df).sum())
+    if n < 2:
+        st.info("📍 At least two mapped communities are needed to plan transfer points")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        k = st.slider("Transfer Points", 1, min(30, n), min(5, n))
+    with col2:
+        radius_km = st.slider("Coverage Radius (km)", 0.5, 25.0, 5.0, 0.5)
+    with col3:
+        capacity_kg = st.number_input("Site Capacity (kg, 0 = unlimited)", min_value=0, value=0, step=100)
+    with col4:
+        medoids = st.checkbox("Snap to communities", value=True, help="k-medoids: place sites at existing communities")
+    
+    with st.spinner("🏗️ Optimising transfer point locations..."):
+        sites, assignment = cached_transfer_points(version, k, capacity_kg, medoids, df)
+    
+    if HAS_PYDECK:
+        center_lat, center_lon = map_center(df)
+        st.pydeck_chart(create_advanced_3d_deck(df, create_transfer_point_layers(sites, assignment), {
+            'longitude': center_lon, 'latitude': center_lat, 'zoom': 9, 'pitch': 0, 'bearing': 0
+        }))
+    
+    st.dataframe(sites.round({'Latitude': 6, 'Longitude': 6, 'Total_Kgs': 1}), hide_index=True, use_container_width=True)
+    
+    comparison = []
+    for option in sorted({max(1, k - 2), k, min(n, k + 2)}):
+        _, option_assignment = cached_transfer_points(version, option, capacity_kg, medoids, df)
+        comparison.append({'Transfer Points': option, **catchment_coverage(option_assignment, radius_km)})
+    st.markdown(f"**Catchment coverage within {radius_km:g} km**")
+    st.dataframe(pd.DataFrame(comparison), hide_index=True, use_container_width=True)
+
+# ===== COLLECTION SCHEDULER =====
+@st.cache_resource(max_entries=8, show_spinner=False)
+def cached_collection_schedule(version, params, _df):
+    return plan_collection_schedule(_df, dict(params))
+
+def render_schedule_panel(df, version):
+    """Weekly truck schedule with per-truck utilization"""
+    st.markdown("### 🚛 Weekly Collection Schedule")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        trucks = st.number_input("Trucks", 1, 500, SCHEDULE_DEFAULTS['trucks'])
+    with col2:
+        capacity_kg = st.number_input("Truck Capacity (kg)", 50, 20_000, int(SCHEDULE_DEFAULTS['capacity_kg']), 50)
+    with col3:
+        shift_hours = st.slider("Shift (hours)", 2.0, 12.0, SCHEDULE_DEFAULTS['shift_hours'], 0.5)
+    with col4:
+        service_minutes = st.slider("Minutes per Stop", 1, 30, int(SCHEDULE_DEFAULTS['service_minutes']))
+    with col5:
+        days = st.select_slider("Working Days", [5, 6, 7], value=SCHEDULE_DEFAULTS['days'])
+    params = tuple(sorted({**SCHEDULE_DEFAULTS, 'trucks': int(trucks), 'capacity_kg': float(capacity_kg),
+                           'shift_hours': float(shift_hours), 'service_minutes': float(service_minutes),
+                           'days': int(days)}.items()))
+    
+    # Same settings on a new dataset version: re-plan incrementally
+    previous = session_object('collection_schedule')
+    if previous is not None and previous[0] != version and previous[1] == params:
+        with st.spinner("🚛 Re-planning changed communities..."):
+            schedule = replan_schedule(previous[2], df, dict(params))
+    elif previous is not None and previous[:2] == (version, params):
+        schedule = previous[2]
+    else:
+        with st.spinner("🚛 Planning collection routes..."):
+            schedule = cached_collection_schedule(version, params, df)
+    set_session_object('collection_schedule', (version, params, schedule))
+    if len(schedule) == 0:
+        st.info("📭 No communities need pickups")
+        return
+    
+    utilization = truck_utilization(schedule, dict(params))
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Pickups per Week", f"{len(schedule):,}")
+    col2.metric("Peak Trucks per Day", int(utilization.groupby('Day')['Truck'].max().max()))
+    col3.metric("Avg Load Use", f"{utilization['Capacity_%'].mean():.0f}%")
+    col4.metric("Avg Shift Use", f"{utilization['Shift_%'].mean():.0f}%")
+    if 'replanned' in schedule.attrs:
+        st.caption(f"♻️ Re-planned {schedule.attrs['replanned']} changed communities; other routes kept")
+    unserved = schedule.attrs.get('unserved')
+    if unserved is not None and len(unserved):
+        st.warning(f"⚠️ {len(unserved):,} pickups ({unserved['Pickup_Kg'].sum():,.0f} kg) do not fit the fleet of "
+                   f"{int(trucks)} trucks and are not scheduled")
+        with st.expander("🚫 Unserved Pickups"):
+            st.dataframe(unserved[UNSERVED_COLUMNS], hide_index=True, use_container_width=True)
+    over = int(schedule['Over_Capacity'].sum())
+    if over:
+        st.warning(f"⚠️ {over} pickups exceed one truck's capacity of {int(capacity_kg):,} kg on their own")
+    
+    fig = px.bar(utilization, x='Day', y='Load_Kg', color='Capacity_%', hover_data=['Truck', 'Stops', 'Route_km', 'Shift_%'],
+                 title="Load per Truck and Day", color_continuous_scale='RdYlGn_r', category_orders={'Day': WEEKDAYS})
+    fig.update_layout(height=350)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    day = st.selectbox("Schedule for", [d for d in WEEKDAYS if d in set(schedule['Day'])])
+    st.dataframe(schedule.loc[schedule['Day'] == day, ['Truck', 'Stop', 'Community', 'City', 'Collection_Status',
+                                                        'Pickups_Per_Week', 'Pickup_Kg', 'Over_Capacity', 'Depot']],
+                 hide_index=True, use_container_width=True)
+    with st.expander("📋 Truck Utilization"):
+        st.dataframe(utilization, hide_index=True, use_container_width=True)
+    st.download_button("⬇️ Download Schedule CSV", schedule.drop(columns=['Key', 'Visit', 'Day_Index']).to_csv(index=False),
+                       file_name=f"collection_schedule_{datetime.now().strftime('%Y%m%d')}.csv", mime="text/csv")
+
+def benchmark_scheduler(n_communities=50_000, changed=50, seed=0):
+    """Seconds for a full weekly plan and for an incremental re-plan after ``changed`` edits"""
+    rng = np.random.default_rng(seed)
+    base = create_real_sample_data()
+    df = base.iloc[rng.integers(0, len(base), n_communities)].reset_index(drop=True)
+    df['Community'] = df['Community'] + ' #' + np.arange(n_communities).astype(str)
+    df['Latitude'] += rng.normal(0, 0.03, n_communities)
+    df['Longitude'] += rng.normal(0, 0.03, n_communities)
+    df = process_data(df, quality_checks=False, geocode=False)
+    params = {**SCHEDULE_DEFAULTS, 'trucks': 200}
+
+    start = time.perf_counter()
+    schedule = plan_collection_schedule(df, params)
+    plan_seconds = time.perf_counter() - start
+    edited = df.copy()
+    picks = rng.choice(n_communities, changed, replace=False)
+    edited.loc[picks, 'Total Kgs in Jul 2025'] *= 2
+    edited = process_data(edited[base.columns], quality_checks=False, geocode=False)
+    start = time.perf_counter()
+    replanned = replan_schedule(schedule, edited, params)
+    replan_seconds = time.perf_counter() - start
+    utilization = truck_utilization(schedule, params)
+    return {
+        'communities': n_communities,
+        'visits': len(schedule),
+        'routes': len(utilization),
+        'plan_seconds': round(plan_seconds, 2),
+        'replan_seconds': round(replan_seconds, 2),
+        'replanned_communities': replanned.attrs.get('replanned'),
+        'mean_capacity_%': round(float(utilization['Capacity_%'].mean()), 1),
+        'mean_shift_%': round(float(utilization['Shift_%'].mean()), 1),
+        'unserved_pickups': len(schedule.attrs['unserved']),
+    }
+
+# ===== DENSITY SURFACE =====
+SURFACE_METHODS = ('IDW', 'Gaussian')
+SURFACE_NEIGHBOURS = 12
+SURFACE_CHUNK_CELLS = 131_072
+SURFACE_BRUTE_FORCE_PAIRS = 4_000_000
+SURFACE_COLOR_RAMP = np.array([[255, 255, 178], [254, 204, 92], [253, 141, 60], [240, 59, 32], [189, 0, 38]], dtype='float64')
+
+class NeighbourIndex:
+    """k-nearest-neighbour queries over projected points"""
+
+    def __init__(self, xy):
+        self.xy = np.ascontiguousarray(xy, dtype='float64')
+        self.tree = cKDTree(self.xy) if HAS_SCIPY else None
+
+    def query(self, targets, k):
+        """(distances, indices) of the ``k`` nearest points, each shaped (len(targets), k)"""
+        k = min(k, len(self.xy))
+        if self.tree is not None:
+            dist, idx = self.tree.query(targets, k=k, workers=-1)
+            return dist.reshape(len(targets), k), idx.reshape(len(targets), k)
+        dist = np.empty((len(targets), k))
+        idx = np.empty((len(targets), k), dtype='int64')
+        norms = np.einsum('ij,ij->i', self.xy, self.xy)
+        step = max(1, SURFACE_BRUTE_FORCE_PAIRS // len(self.xy))
+        for start in range(0, len(targets), step):
+            block = targets[start:start + step]
+            sq = np.einsum('ij,ij->i', block, block)[:, None] - 2 * block @ self.xy.T + norms[None, :]
+            nearest = np.argpartition(sq, k - 1, axis=1)[:, :k]
+            idx[start:start + step] = nearest
+            dist[start:start + step] = np.sqrt(np.maximum(np.take_along_axis(sq, nearest, axis=1), 0))
+        return dist, idx
+
+def interpolate_surface(lat, lon, values, bounds, resolution=400, method='IDW', weights=None, power=2.0,
+                        bandwidth_km=1.0, neighbours=SURFACE_NEIGHBOURS, max_distance_km=np.inf,
+                        chunk_cells=SURFACE_CHUNK_CELLS):
+    """IDW or Gaussian estimate of ``values`` on a ``resolution``² grid over (west, south, east, north)"""
+    west, south, east, north = bounds
+    lat0 = (south + north) / 2
+    index = NeighbourIndex(local_km(lat, lon, lat0))
+    values = np.asarray(values, dtype='float64')
+    denominator = np.ones_like(values) if weights is None else np.asarray(weights, dtype='float64')
+    grid_lon = np.linspace(west, east, resolution)
+    grid_lat = np.linspace(north, south, resolution)
+    grid = np.empty(resolution * resolution)
+    for start in range(0, grid.size, chunk_cells):
+        cells = np.arange(start, min(start + chunk_cells, grid.size))
+        targets = local_km(grid_lat[cells // resolution], grid_lon[cells % resolution], lat0)
+        dist, idx = index.query(targets, neighbours)
+        if method == 'Gaussian':
+            kernel = np.exp(-0.5 * (dist / bandwidth_km) ** 2)
+        else:
+            kernel = np.maximum(dist, 1e-6) ** -power
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimate = (kernel * values[idx]).sum(axis=1) / (kernel * denominator[idx]).sum(axis=1)
+        estimate[(dist[:, 0] > max_distance_km) | ~np.isfinite(estimate)] = np.nan
+        grid[cells] = estimate
+    return grid.reshape(resolution, resolution)
+
+def colorize_surface(grid, vmin, vmax, opacity=180):
+    """RGBA uint8 image of ``grid`` on the yellow-to-red ramp; NaN cells are transparent"""
+    finite = np.isfinite(grid)
+    scaled = np.clip((np.where(finite, grid, vmin) - vmin) / max(vmax - vmin, 1e-12), 0, 1)
+    stops = np.linspace(0, 1, len(SURFACE_COLOR_RAMP))
+    rgba = np.empty(grid.shape + (4,), dtype='uint8')
+    for channel in range(3):
+        rgba[..., channel] = np.interp(scaled, stops, SURFACE_COLOR_RAMP[:, channel]).astype('uint8')
+    rgba[..., 3] = np.where(finite, opacity, 0)
+    return rgba
+
+def _png_chunk(tag, data):
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+def encode_png(rgba):
+    """Encode an (h, w, 4) uint8 array as PNG bytes"""
+    height, width, _ = rgba.shape
+    # Every scanline starts with filter type 0 (none)
+    raw = np.concatenate([np.zeros((height, 1), dtype='uint8'), rgba.reshape(height, width * 4)], axis=1)
+    return (b'\x89PNG\r\n\x1a\n'
+            + _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + _png_chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+            + _png_chunk(b'IEND', b''))
+
+def build_density_surface(df, resolution=400, method='IDW', power=2.0, bandwidth_km=1.0, max_distance_km=3.0):
+    """Waste-per-household surface over the mapped communities as a PNG data URL and its bounds for pydeck"""
+    mappable = df[valid_coordinates(df) & (df['Total Households'].to_numpy(dtype='float64') > 0)]
+    if len(mappable) == 0:
+        return None
+    lat = mappable['Latitude'].to_numpy(dtype='float64')
+    lon = mappable['Longitude'].to_numpy(dtype='float64')
+    pad_lat = max(np.ptp(lat) * 0.05, 0.01)
+    pad_lon = max(np.ptp(lon) * 0.05, 0.01)
+    bounds = (lon.min() - pad_lon, lat.min() - pad_lat, lon.max() + pad_lon, lat.max() + pad_lat)
+
+    start = time.perf_counter()
+    grid = interpolate_surface(lat, lon, mappable['Total Kgs in Jul 2025'].to_numpy(dtype='float64'), bounds,
+                               resolution, method, weights=mappable['Total Households'].to_numpy(dtype='float64'),
+                               power=power, bandwidth_km=bandwidth_km, max_distance_km=max_distance_km)
+    seconds = time.perf_counter() - start
+    finite = grid[np.isfinite(grid)]
+    vmin, vmax = (np.percentile(finite, [2, 98]) if len(finite) else (0.0, 1.0))
+    png = encode_png(colorize_surface(grid, vmin, vmax))
+    return {
+        'bounds': bounds,
+        'vmin': float(vmin),
+        'vmax': float(vmax),
+        'seconds': seconds,
+        'image': 'data:image/png;base64,' + base64.b64encode(png).decode('ascii'),
+    }
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def cached_density_surface(version, resolution, method, power, bandwidth_km, max_distance_km, _df):
+    return build_density_surface(_df, resolution, method, power, bandwidth_km, max_distance_km)
+
+def create_density_surface_layer(surface):
+    """PyDeck BitmapLayer draping the surface raster over the map"""
+    if surface is None or not HAS_PYDECK:
+        return None
+    return pdk.Layer('BitmapLayer', data=None, image=surface['image'], bounds=list(surface['bounds']), opacity=0.8)
+
+def benchmark_density_surface(n_points=50_000, resolution=1000, method='IDW', seed=0):
+    """Seconds to interpolate a ``resolution``² surface from synthetic communities"""
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(18.9, 19.3, n_points)
+    lon = rng.uniform(72.8, 73.1, n_points)
+    households = rng.integers(20, 2_000, n_points).astype('float64')
+    kgs = households * rng.gamma(2.0, 0.5, n_points)
+    start = time.perf_counter()
+    grid = interpolate_surface(lat, lon, kgs, (72.8, 18.9, 73.1, 19.3), resolution, method, weights=households)
+    elapsed = time.perf_counter() - start
+    return {
+        'points': n_points,
+        'cells': grid.size,
+        'method': method,
+        'backend': 'kdtree' if HAS_SCIPY else 'brute-force',
+        'seconds': round(elapsed, 2),
+    }
+
+# ===== VECTOR TILES =====
+FOLIUM_MARKER_LIMIT = 2_000
+@st.cache_resource
+def get_tile_server():
+    return LocalTileServer()
+
+@st.cache_resource
+def get_tileset_builder():
+    return TilesetBuilder(get_session_manager().dataset)
+
+def request_tileset(version):
+    """Start (or join) the version's background tile build; returns (tile URL template or None, state, error)"""
+    builder = get_tileset_builder()
+    path = builder.request(version)
+    state, error = builder.status(version)
+    url = get_tile_server().add_tileset(version, path) if state == 'ready' else None
+    return url, state, error
+
+def create_mvt_layer(tile_url):
+    """PyDeck MVTLayer reading community tiles from the local tile server"""
+    if not HAS_PYDECK:
+        return None
+    color = ' : '.join(f"properties.Collection_Status == '{status}' ? {rgba}" for status, rgba in STATUS_RGBA.items())
+    return pdk.Layer(
+        'MVTLayer',
+        data=tile_url,
+        min_zoom=TILE_MIN_ZOOM,
+        max_zoom=TILE_MAX_ZOOM,
+        get_fill_color=f"{color} : [128, 128, 128, 120]",
+        get_line_color=[255, 255, 255, 100],
+        point_radius_units='pixels',
+        get_point_radius='properties.Count > 1 ? 6 + Math.min(properties.Count, 400) / 20 : 3 + Math.min(properties.Total_Kgs, 400) / 40',
+        line_width_min_pixels=1,
+        stroked=True,
+        pickable=True,
+        auto_highlight=True,
+    )
+
+def benchmark_tile_build(n_communities=200_000, seed=0):
+    """Seconds to cut synthetic communities into a tile pyramid, with tile counts and sizes"""
+    rng = np.random.default_rng(seed)
+    base = create_real_sample_data()
+    df = base.iloc[rng.integers(0, len(base), n_communities)].reset_index(drop=True)
+    df['Latitude'] += rng.normal(0, 0.05, n_communities)
+    df['Longitude'] += rng.normal(0, 0.05, n_communities)
+    df = process_data(df, quality_checks=False, geocode=False)
+    path = os.path.join(TILE_CACHE_DIR, f"benchmark_{n_communities}.mbtiles")
+    start = time.perf_counter()
+    build_tileset(df, path)
+    elapsed = time.perf_counter() - start
+    with sqlite3.connect(path) as db:
+        tiles, total, largest = db.execute('SELECT COUNT(*), SUM(LENGTH(tile_data)), MAX(LENGTH(tile_data)) FROM tiles').fetchone()
+    return {
+        'communities': n_communities,
+        'seconds': round(elapsed, 2),
+        'tiles': tiles,
+        'mbtiles_mb': round(os.path.getsize(path) / 1e6, 1),
+        'largest_tile_kb': round(largest / 1e3, 1),
+        'mean_tile_kb': round(total / max(tiles, 1) / 1e3, 2),
+    }
+
+# ===== DATA EXPORT =====
+EXPORT_CHUNK_ROWS = 100_000
+EXPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'waste_dashboard_exports')
+EXPORT_CACHE_MAX_MB = 1024
+EXPORT_FILTER_COLUMNS = ['City', 'Collection_Status', 'Community_Type']
+EXPORT_SKIP_COLUMNS = ('Color',)  # per-row RGBA lists for the 3D layers
+EXPORT_SERVER_HOST = os.environ.get('WASTE_DASHBOARD_EXPORT_HOST', '127.0.0.1')
+EXPORT_SERVER_PORT = int(os.environ.get('WASTE_DASHBOARD_EXPORT_PORT', '8767'))
+EXPORT_PUBLIC_URL = os.environ.get('WASTE_DASHBOARD_EXPORT_URL')  # base URL as seen by browsers, if proxied
+
+def available_export_formats():
+    """Export formats supported by the installed libraries: label -> (extension, mime)"""
+    formats = {'CSV (gzip)': ('csv.gz', 'application/gzip')}
+    if HAS_ZSTD:
+        formats['CSV (zstd)'] = ('csv.zst', 'application/zstd')
+    if HAS_PYARROW:
+        formats['Parquet'] = ('parquet', 'application/vnd.apache.parquet')
+    formats['GeoJSON'] = ('geojson', 'application/geo+json')
+    formats['CSV'] = ('csv', 'text/csv')
+    return formats
+
+def apply_filters(df, filters):
+    """Keep rows whose column values are in the selected lists; empty lists mean no filter"""
+    if not filters:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in filters.items():
+        if values and col in df.columns:
+            mask &= df[col].isin(values).to_numpy()
+    return df[mask]
+
+def iter_export_chunks(df, columns, filters, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Filtered column selection one chunk at a time; always yields at least one (possibly empty) chunk"""
+    columns = list(columns)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield apply_filters(df.iloc[start:start + chunk_rows], filters)[columns]
+
+def _open_text_stream(path, fmt):
+    if fmt == 'csv.gz':
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    if fmt == 'csv.zst':
+        raw = open(path, 'wb')
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=6).stream_writer(raw), encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+def _write_csv(chunks, path, fmt):
+    with _open_text_stream(path, fmt) as fh:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(fh, header=(i == 0), index=False)
+
+def _write_parquet(chunks, path):
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def _write_geojson(chunks, path):
+    with open(path, 'w', encoding='utf-8') as fh:
+        fh.write('{"type":"FeatureCollection","features":[')
+        first = True
+        for chunk in chunks:
+            lon = chunk['Longitude'].to_numpy(dtype='float64')
+            lat = chunk['Latitude'].to_numpy(dtype='float64')
+            valid = ~(np.isnan(lon) | np.isnan(lat))
+            props = chunk.drop(columns=['Latitude', 'Longitude'], errors='ignore')
+            props = props.astype(object).where(props.notna(), None).to_dict('records')
+            for x, y, ok, prop in zip(lon, lat, valid, props):
+                geometry = {'type': 'Point', 'coordinates': [float(x), float(y)]} if ok else None
+                fh.write(('' if first else ',') + json.dumps(
+                    {'type': 'Feature', 'geometry': geometry, 'properties': prop},
+                    default=_json_default, separators=(',', ':')
+                ))
+                first = False
+        fh.write(']}')
+
+def write_export(df, path, fmt, columns=None, filters=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Filter and serialize ``df`` to ``path`` chunk by chunk so peak memory stays at one chunk"""
+    chunks = iter_export_chunks(df, df.columns if columns is None else columns, filters, chunk_rows)
+    tmp_path = path + '.part'
+    try:
+        if fmt in ('csv', 'csv.gz', 'csv.zst'):
+            _write_csv(chunks, tmp_path, fmt)
+        elif fmt == 'parquet':
+            _write_parquet(chunks, tmp_path)
+        elif fmt == 'geojson':
+            _write_geojson(chunks, tmp_path)
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+class ExportManager:
+    """Runs exports on a background thread and reuses finished files"""
+
+    def __init__(self, load_dataset, cache_dir=EXPORT_CACHE_DIR, max_workers=2, max_mb=EXPORT_CACHE_MAX_MB):
+        self.load_dataset = load_dataset
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1e6)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def export_path(self, version, fmt, columns, filters):
+        key = json.dumps([version, fmt, list(columns), filters], sort_keys=True, default=str)
+        digest = hashlib.blake2b(key.encode(), digest_size=10).hexdigest()
+        return os.path.join(self.cache_dir, f"{version}_{digest}.{fmt}")
+
+    def request(self, version, fmt, columns, filters):
+        """Start (or join) the export job and return its output path"""
+        path = self.export_path(version, fmt, columns, filters)
+        with self._lock:
+            if os.path.exists(path) or path in self._jobs:
+                return path
+            self._jobs[path] = self._executor.submit(self._export, version, path, fmt, list(columns), filters)
+        return path
+
+    def _export(self, version, path, fmt, columns, filters):
+        df = self.load_dataset(version)
+        if df is None:
+            raise ValueError("the dataset is no longer loaded")
+        write_export(df, path, fmt, columns, filters)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """Delete least recently used exports until the cache fits in ``max_bytes``"""
+        with self._lock:
+            busy = {path for path, job in self._jobs.items() if not job.done()}
+            files = []
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if path != keep and path not in busy and not name.endswith('.part'):
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files) + (os.path.getsize(keep) if keep else 0)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                self._jobs.pop(path, None)
+                total -= size
+
+    def status(self, path):
+        """One of 'ready', 'running', 'failed' or 'missing', plus the error if any"""
+        with self._lock:
+            job = self._jobs.get(path)
+        if job is None:
+            if not os.path.exists(path):
+                return 'missing', None
+            os.utime(path)
+            return 'ready', None
+        if not job.done():
+            return 'running', None
+        if job.exception() is not None:
+            with self._lock:
+                self._jobs.pop(path, None)
+            return 'failed', job.exception()
+        return 'ready', None
+
+    def serve(self, path, query):
+        """Stream a finished export from disk as an attachment"""
+        name = path.strip('/').split('/', 1)[-1]
+        file_path = os.path.join(self.cache_dir, name)
+        if name != os.path.basename(name) or name.endswith('.part') or not os.path.isfile(file_path):
+            return 404, {}, b'unknown export'
+        os.utime(file_path)
+        fmt = name.split('.', 1)[1]
+        mime = {ext: mime for ext, mime in available_export_formats().values()}.get(fmt, 'application/octet-stream')
+        stamp = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime('%Y%m%d_%H%M%S')
+        headers = {'Content-Type': mime, 'Cache-Control': 'no-store',
+                   'Content-Disposition': f'attachment; filename="waste_management_data_{stamp}.{fmt}"'}
+        return 200, headers, open(file_path, 'rb')
+
+    def invalidate(self, version):
+        """Delete the finished exports of a dataset version"""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.startswith(f"{version}_") and not name.endswith('.part'):
+                    os.remove(path)
+                    self._jobs.pop(path, None)
+
+@st.cache_resource
+def get_export_manager():
+    manager = ExportManager(get_session_manager().dataset)
+    get_export_server().register('exports', manager.serve)
+    return manager
+
+@st.cache_resource
+def get_export_server():
+    return LocalHTTPServer(EXPORT_SERVER_HOST, EXPORT_SERVER_PORT, name='export-server', public_url=EXPORT_PUBLIC_URL)
+
+def render_export_panel(df, version):
+    """Export controls: format, columns and filters, with a background job per selection"""
+    formats = available_export_formats()
+    col1, col2 = st.columns(2)
+    with col1:
+        fmt_label = st.selectbox("Export Format", list(formats))
+    with col2:
+        exportable = [col for col in df.columns if col not in EXPORT_SKIP_COLUMNS]
+        columns = st.multiselect("Columns", exportable, default=exportable)
+    
+    filter_cols = st.columns(len(EXPORT_FILTER_COLUMNS))
+    filters = {}
+    for col, name in zip(filter_cols, EXPORT_FILTER_COLUMNS):
+        with col:
+            filters[name] = st.multiselect(f"Filter {name}", sorted(df[name].dropna().unique()))
+    
+    if not columns:
+        st.warning("⚠️ Select at least one column to export")
+        return
+    if fmt_label == 'GeoJSON':
+        columns = list(dict.fromkeys(columns + ['Latitude', 'Longitude']))
+    
+    fmt = formats[fmt_label][0]
+    manager = get_export_manager()
+    path = manager.export_path(version, fmt, columns, filters)
+    state, error = manager.status(path)
+    
+    if state == 'missing':
+        if st.button("📊 Prepare Export"):
+            manager.request(version, fmt, columns, filters)
+            state, error = manager.status(path)
+    
+    if state == 'running':
+        st.info("⏳ Export is being generated in the background...")
+        st.button("🔄 Check Export Status")
+    elif state == 'failed':
+        st.error(f"❌ Export failed: {error}")
+    elif state == 'ready':
+        # Served from disk by the export server, so the file never passes through the app's memory
+        st.link_button(
+            f"⬇️ Download {fmt_label} ({os.path.getsize(path) / 1e6:.1f} MB)",
+            f"{get_export_server().base_url}/exports/{os.path.basename(path)}"
+        )
+
 # ===== SIDEBAR =====
 def create_sidebar():
     """Create enhanced sidebar"""
     st.sidebar.markdown("""
     <div class="sidebar-header">
         <h2>🏙️ Smart Waste Analytics</h2>
-        <p style="margin: 0; opacity: 0.9;">Next-Generation Dashboard</p>
+        <p>Next-Generation Dashboard</p>
     </div>
     """, unsafe_allow_html=True)
     
@@ -727,7 +3425,7 @@ def create_sidebar():
     for feature, available in features:
         status = "✅" if available else "❌"
         st.sidebar.markdown(f"""
-        <span class="feature-badge" style="background: {'linear-gradient(135deg, #28a745, #20c997)' if available else 'linear-gradient(135deg, #dc3545, #c82333)'};">
+        <span class="feature-badge{'' if available else ' unavailable'}">
             {status} {feature}
         </span>
         """, unsafe_allow_html=True)
@@ -747,8 +3445,8 @@ def create_sidebar():
             st.rerun()
     
     # Data info
-    if st.session_state.data_loaded and st.session_state.df is not None:
-        df = st.session_state.df
+    df = current_dataset()
+    if df is not None:
         st.sidebar.markdown("### 📊 Current Dataset")
         st.sidebar.success("✅ Data loaded successfully")
         st.sidebar.info(f"""
@@ -758,6 +3456,479 @@ def create_sidebar():
         🏠 **{df['Total Households'].sum():,}** households
         """)
 
+# ===== DASHBOARD TABS =====
+TAB_TIMING_HISTORY = 20
+
+def record_tab_latency(name, seconds):
+    timings = st.session_state.setdefault('tab_timings', {})
+    history = timings.setdefault(name, [])
+    history.append(seconds)
+    del history[:-TAB_TIMING_HISTORY]
+
+def render_tab_latency():
+    """Sidebar table of per-tab render latency, drawn after the tabs so it includes this run"""
+    timings = st.session_state.get('tab_timings')
+    if timings:
+        with st.sidebar.expander("⏱️ Tab Render Latency"):
+            st.caption("Lazy tabs" if LAZY_TABS else "Eager tabs (all bodies every rerun)")
+            st.dataframe(pd.DataFrame([
+                {'Tab': name, 'Renders': len(h), 'Last (ms)': round(h[-1] * 1000, 1),
+                 'Median (ms)': round(float(np.median(h)) * 1000, 1)}
+                for name, h in timings.items()
+            ]), hide_index=True, use_container_width=True)
+
+def timed_tab(name):
+    """Record how long each render of a tab body takes"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_tab_latency(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_group_summary(version, _df, by, spec):
+    """Grouped summary table, computed once per dataset version"""
+    return _df.groupby(by).agg({col: list(funcs) for col, funcs in spec}).round(2)
+
+def build_folium_map(df, tile_url=None):
+    """Create enhanced folium map with one marker per community, or a vector tile layer when given a tile URL"""
+    center_lat, center_lon = map_center(df)
+    df = df[valid_coordinates(df)]
+    
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=10, tiles='CartoDB Positron')
+    
+    color_map = {
+        'Critical': 'red', 'High': 'orange', 'Medium': 'blue',
+        'Low': 'green', 'None': 'gray'
+    }
+
+    if tile_url:
+        # Styled in JS; the browser fetches only the visible tiles
+        colors = json.dumps(color_map)
+        options = f"""{{
+            vectorTileLayerStyles: {{
+                {TILE_LAYER}: function(p) {{
+                    var color = {colors}[p.Collection_Status] || 'gray';
+                    var radius = p.Count > 1 ? 6 + Math.min(p.Count, 400) / 20 : Math.max(5, Math.min(25, p.Total_Kgs / 20));
+                    return {{radius: radius, color: color, fill: true, fillColor: color, fillOpacity: 0.7, weight: 2}};
+                }}
+            }},
+            interactive: true,
+            maxNativeZoom: {TILE_MAX_ZOOM},
+            minNativeZoom: {TILE_MIN_ZOOM}
+        }}"""
+        VectorGridProtobuf(tile_url, name='Communities', options=options).add_to(m)
+        return m
+    
+    # Add markers
+    for _, row in df.iterrows():
+        popup_html = f"""
+        <div style="font-family: Arial; width: 200px;">
+            <h4 style="margin: 0; color: #333;">{row['Community']}</h4>
+            <hr style="margin: 5px 0;">
+            <b>City:</b> {row['City']}<br>
+            <b>Waste:</b> {row['Total Kgs in Jul 2025']:.1f} kg<br>
+            <b>Households:</b> {row['Total Households']}<br>
+            <b>Status:</b> <span style="color: {color_map.get(row['Collection_Status'], 'gray')};">{row['Collection_Status']}</span><br>
+            <b>Efficiency:</b> {row['Efficiency_Score']:.1f}%
+        </div>
+        """
+        
+        marker_size = max(5, min(25, row['Total Kgs in Jul 2025'] / 20)) if row['Total Kgs in Jul 2025'] > 0 else 5
+        
+        folium.CircleMarker(
+            location=[row['Latitude'], row['Longitude']],
+            radius=marker_size,
+            popup=popup_html,
+            color=color_map.get(row['Collection_Status'], 'gray'),
+            fillOpacity=0.7,
+            weight=2
+        ).add_to(m)
+    
+    return m
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_folium_map(version, tile_url, _df):
+    if tile_url:
+        return build_folium_map(_df, tile_url=tile_url)
+    if HAS_VECTORGRID and len(_df) > FOLIUM_MARKER_LIMIT:
+        # Tiles are still being cut: show the heaviest communities as markers meanwhile
+        return build_folium_map(_df.nlargest(FOLIUM_MARKER_LIMIT, 'Total Kgs in Jul 2025'))
+    return build_folium_map(_df)
+
+@fragment
+@timed_tab("Overview")
+def render_overview_tab(df, version):
+    """Overview tab: metrics cards, status/city charts and summary table"""
+    st.markdown("## 📊 Dashboard Overview")
+    create_metrics_cards(df, get_dataset_stats(version, df))
+    render_quality_report(df)
+    render_entity_panel(df, version)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig1 = get_cached_figure('status_pie', version, create_status_pie_chart, df)
+        st.plotly_chart(fig1, use_container_width=True)
+
+    with col2:
+        fig2 = get_cached_figure('city_bar', version, create_city_bar_chart, df)
+        st.plotly_chart(fig2, use_container_width=True)
+
+    # Summary table
+    st.markdown("### 📋 Community Summary")
+    summary_df = cached_group_summary(version, df, 'City', (
+        ('Total Kgs in Jul 2025', ('sum', 'mean', 'max')),
+        ('Total Households', ('sum',)),
+        ('Efficiency_Score', ('mean',))
+    ))
+    st.dataframe(summary_df, use_container_width=True)
+
+@fragment
+@timed_tab("3D Visualizations")
+def render_3d_tab(df, version):
+    """3D visualization tab"""
+    st.markdown("## 🎮 Advanced 3D Visualizations")
+
+    if HAS_PYDECK:
+        # Visualization type selector
+        viz_type = st.selectbox(
+            "Choose 3D Visualization Type",
+            ["🔳 Rectangular 3D Bars", "🔶 Hexagon Aggregation", "🏛️ Cylindrical Columns", "⚪ Scatter Bubbles",
+             "🌡️ Interpolated Surface", "🧱 Vector Tiles"]
+        )
+
+        # Visualization parameters
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            elevation_scale = st.slider("Elevation Scale", 5, 50, 20)
+        with col2:
+            if viz_type == "🔳 Rectangular 3D Bars":
+                bar_width = st.slider("Bar Width (meters)", 20, 100, 50)
+            elif viz_type == "🔶 Hexagon Aggregation":
+                radius = st.slider("Hexagon Radius", 50, 200, 100)
+            elif viz_type == "🌡️ Interpolated Surface":
+                resolution = st.slider("Grid Resolution", 100, 1000, 400, 100)
+            else:
+                radius = st.slider("Radius", 20, 100, 50)
+        with col3:
+            pitch = st.slider("View Pitch", 0, 90, 50)
+
+        if viz_type == "🌡️ Interpolated Surface":
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                method = st.selectbox("Interpolation", SURFACE_METHODS)
+            with col2:
+                if method == 'Gaussian':
+                    power, bandwidth_km = 2.0, st.slider("Bandwidth (km)", 0.2, 5.0, 1.0, 0.1)
+                else:
+                    power, bandwidth_km = st.slider("IDW Power", 1.0, 4.0, 2.0, 0.5), 1.0
+            with col3:
+                max_distance_km = st.slider("Mask Beyond (km)", 0.5, 20.0, 3.0, 0.5)
+
+        # Create appropriate layer (rows without coordinates cannot be placed)
+        map_df = df[valid_coordinates(df)]
+        if viz_type == "🔳 Rectangular 3D Bars":
+            layer = create_rectangular_bars_layer(map_df, elevation_scale, bar_width, version=version)
+            st.markdown("### 🔳 Rectangular 3D Bars - Next-Generation Visualization")
+        elif viz_type == "🔶 Hexagon Aggregation":
+            layer = create_advanced_3d_hexagon_view(map_df, radius, elevation_scale)
+            st.markdown("### 🔶 Hexagon Aggregation View")
+        elif viz_type == "🏛️ Cylindrical Columns":
+            layer = create_advanced_column_layer(map_df, elevation_scale, radius)
+            st.markdown("### 🏛️ Cylindrical Columns View")
+        elif viz_type == "🌡️ Interpolated Surface":
+            with st.spinner("🌡️ Interpolating waste surface..."):
+                surface = cached_density_surface(version, resolution, method, power, bandwidth_km, max_distance_km, df)
+            layer = create_density_surface_layer(surface)
+            st.markdown("### 🌡️ Estimated Waste per Household")
+            if surface is not None:
+                st.caption(f"{resolution}×{resolution} {method} grid in {surface['seconds']:.2f}s · "
+                           f"{surface['vmin']:.2f} (yellow) to {surface['vmax']:.2f} (red) kg per household")
+        elif viz_type == "🧱 Vector Tiles":
+            tile_url, state, error = request_tileset(version)
+            st.markdown("### 🧱 Community Vector Tiles")
+            if state == 'failed':
+                st.error(f"❌ Vector tiles failed: {error}")
+                return
+            if tile_url is None:
+                st.info("⏳ Vector tiles are being cut in the background...")
+                st.button("🔄 Check Tile Status")
+                return
+            layer = create_mvt_layer(tile_url)
+            st.caption(f"Zoom {TILE_MIN_ZOOM}-{TILE_MAX_ZOOM} tiles served locally; dense tiles are aggregated "
+                       f"above {TILE_MAX_FEATURES:,} points")
+        else:
+            layer = create_scatter_layer(map_df, radius)
+            st.markdown("### ⚪ Scatter Bubbles View")
+
+        if layer:
+            center_lat, center_lon = map_center(df)
+            view_state = {
+                'longitude': center_lon,
+                'latitude': center_lat,
+                'zoom': 11,
+                'pitch': pitch,
+                'bearing': 0
+            }
+
+            deck = create_advanced_3d_deck(df, [layer], view_state)
+            st.pydeck_chart(deck)
+
+            st.info(f"🎯 Showing {len(df[df['Total Kgs in Jul 2025'] > 0])} communities with waste data in 3D visualization")
+        else:
+            st.warning("⚠️ No data available for 3D visualization")
+    else:
+        st.error("❌ 3D visualizations require PyDeck. Install with: `pip install pydeck`")
+        st.info("📊 Install PyDeck to unlock advanced 3D visualization features!")
+
+@fragment
+@timed_tab("Geographic Analysis")
+def render_geographic_tab(df, version):
+    """Geographic analysis tab: Folium map, statistics and boundaries"""
+    st.markdown("## 🗺️ Geographic Intelligence")
+
+    if HAS_FOLIUM:
+        tile_url = None
+        if HAS_VECTORGRID and len(df) > FOLIUM_MARKER_LIMIT:
+            tile_url, state, error = request_tileset(version)
+            if state == 'failed':
+                st.error(f"❌ Vector tiles failed: {error}")
+            elif tile_url is None:
+                st.info(f"⏳ Cutting vector tiles in the background; showing the {FOLIUM_MARKER_LIMIT:,} heaviest "
+                        "communities meanwhile")
+                st.button("🔄 Check Tile Status")
+        m = get_folium_map(version, tile_url, df)
+        st_folium(m, width=700, height=500)
+
+        # Geographic statistics
+        st.markdown("### 📍 Geographic Statistics")
+        geo_stats = cached_group_summary(version, df, 'City', (
+            ('Total Kgs in Jul 2025', ('sum', 'mean')),
+            ('Total Households', ('sum',)),
+            ('Efficiency_Score', ('mean',))
+        ))
+        st.dataframe(geo_stats, use_container_width=True)
+
+        render_boundary_panel(df, version)
+        render_transfer_point_panel(df, version)
+        render_schedule_panel(df, version)
+    else:
+        # Fallback scatter plot
+        fig = px.scatter(
+            df, x='Longitude', y='Latitude', 
+            size='Total Kgs in Jul 2025', 
+            color='Collection_Status',
+            hover_data=['Community', 'City', 'Total Households'],
+            title="Geographic Distribution of Waste"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+@fragment
+@timed_tab("AI Insights")
+def render_ai_tab(df, version):
+    """AI insights tab: model training and predictions"""
+    st.markdown("## 🤖 AI-Powered Insights")
+
+    if HAS_SKLEARN:
+        # Train ML model once per dataset version, shared across sessions
+        params = st.session_state.ml_model_params
+        if st.session_state.ml_model_version != (version, params):
+            with st.spinner("🤖 Training AI model..."):
+                ml_model = train_shared_model(version, params)
+                st.session_state.ml_model_version = (version, params)
+                if ml_model is not None:
+                    st.success("✅ AI model trained successfully!")
+                else:
+                    st.warning("⚠️ Unable to train AI model with current data")
+        else:
+            ml_model = train_shared_model(version, params)
+
+        if ml_model and ml_model.is_trained:
+            # Predictions with per-tree intervals, cached per dataset version
+            predictions, lower, upper = cached_prediction_intervals(version, params, df) or (np.array([]),) * 3
+
+            if len(predictions) > 0:
+                fig = go.Figure()
+
+                fig.add_trace(go.Scatter(
+                    x=df['Total Kgs in Jul 2025'],
+                    y=predictions,
+                    mode='markers',
+                    name='Predictions',
+                    marker=dict(color='#667eea', size=8, opacity=0.7),
+                    error_y=dict(type='data', symmetric=False, array=np.maximum(upper - predictions, 0),
+                                 arrayminus=np.maximum(predictions - lower, 0), thickness=1, color='rgba(102,126,234,0.4)'),
+                    text=df['Community'],
+                    customdata=np.column_stack([lower, upper]),
+                    hovertemplate='<b>%{text}</b><br>Actual: %{x:.1f} kg<br>Predicted: %{y:.1f} kg'
+                                  '<br>Interval: %{customdata[0]:.1f} – %{customdata[1]:.1f} kg<extra></extra>'
+                ))
+
+                # Perfect prediction line
+                min_val = min(df['Total Kgs in Jul 2025'].min(), predictions.min())
+                max_val = max(df['Total Kgs in Jul 2025'].max(), predictions.max())
+
+                fig.add_trace(go.Scatter(
+                    x=[min_val, max_val],
+                    y=[min_val, max_val],
+                    mode='lines',
+                    name='Perfect Prediction',
+                    line=dict(color='red', dash='dash')
+                ))
+
+                fig.update_layout(
+                    title="🎯 AI Predictions vs Actual Waste",
+                    xaxis_title="Actual Waste (kg)",
+                    yaxis_title="Predicted Waste (kg)",
+                    height=500
+                )
+
+                st.plotly_chart(fig, use_container_width=True)
+                low_pct, high_pct = (int(q * 100) for q in PREDICTION_INTERVAL)
+                st.caption(f"Error bars span the P{low_pct}–P{high_pct} of the forest's per-tree predictions")
+
+                # Feature importance (computed once when the model is trained)
+                importance = ml_model.importance
+                if importance is not None:
+                    st.markdown("### 🧭 What Drives the Predictions")
+                    fig = px.bar(importance, x='Importance', y='Feature', error_x='Std', orientation='h',
+                                 title="Permutation Importance (drop in R² when shuffled)")
+                    fig.update_layout(height=300, yaxis={'categoryorder': 'total ascending'})
+                    st.plotly_chart(fig, use_container_width=True)
+
+                # Zero-waste predictions
+                zero_mask = (df['Total Kgs in Jul 2025'] == 0).to_numpy()
+                if zero_mask.any():
+                    st.markdown("### 🔮 Predictions for Zero-Waste Communities")
+                    zero_results = df.loc[zero_mask, ['Community', 'City', 'Total Households']].copy()
+                    zero_results['Predicted_Waste'] = predictions[zero_mask].round(1)
+                    zero_results[f'P{low_pct}'] = lower[zero_mask].round(1)
+                    zero_results[f'P{high_pct}'] = upper[zero_mask].round(1)
+                    st.dataframe(zero_results, use_container_width=True)
+
+            render_model_selection_panel(df, version)
+    else:
+        st.warning("🤖 AI features require scikit-learn. Install with: `pip install scikit-learn`")
+
+@fragment
+@timed_tab("Trends & Analytics")
+def render_trends_tab(df, version):
+    """Trends and analytics tab: trends, correlations and exports"""
+    st.markdown("## 📈 Trends & Advanced Analytics")
+
+    # Trend chart; the window ends at the dataset's reference date, so the version keys it
+    col1, col2 = st.columns(2)
+    with col1:
+        horizon_days = st.slider("Trend Horizon (days)", 7, 365, 30)
+    with col2:
+        breakdown = st.selectbox("Break down by", ['None', *TREND_BREAKDOWNS])
+    breakdown = None if breakdown == 'None' else breakdown
+    trend_fig = get_cached_figure(
+        'trend', version, create_trend_chart, df, horizon_days, breakdown,
+        filter_state={'horizon': horizon_days, 'breakdown': breakdown}
+    )
+    st.plotly_chart(trend_fig, use_container_width=True)
+
+    # Correlation analysis
+    st.markdown("### 🔗 Correlation Matrix")
+    stats = get_dataset_stats(version, df)
+    fig = get_cached_figure('correlation', version, create_correlation_heatmap, df, stats)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    with st.expander("📐 Percentile-Based Status Thresholds"):
+        thresholds = percentile_status_thresholds(stats)
+        st.dataframe(pd.DataFrame({
+            'Status': list(thresholds),
+            'Fixed Threshold (kg)': [STATUS_THRESHOLDS[s] for s in thresholds],
+            'Percentile Threshold (kg)': [round(v, 1) for v in thresholds.values()],
+        }), hide_index=True, use_container_width=True)
+        st.caption("Percentile thresholds are the P50/P75/P90 of non-zero monthly waste, from a mergeable KLL sketch")
+
+    # Community analysis
+    st.markdown("### 🏘️ Community Type Analysis")
+    type_analysis = cached_group_summary(version, df, 'Community_Type', (
+        ('Total Kgs in Jul 2025', ('count', 'mean', 'sum')),
+        ('Efficiency_Score', ('mean',)),
+        ('Collection_Cost', ('sum',))
+    ))
+    st.dataframe(type_analysis, use_container_width=True)
+
+    # Cost and CO2 scenarios
+    st.markdown("### 🎲 Cost & CO2 Scenarios")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        growth = st.slider("Tonnage Growth (%)", -30, 50, 0, 5)
+    with col2:
+        participation = st.slider("Participation (%)", 10, 100, int(SCENARIO_DEFAULTS['baseline_participation'] * 100), 5)
+    with col3:
+        rate_sd = st.slider("Rate Uncertainty (%)", 0, 50, int(SCENARIO_DEFAULTS['rate_sd'] * 100), 5)
+    with col4:
+        n_draws = st.select_slider("Draws", [500, 1_000, 2_000, 5_000, 10_000], value=2_000)
+    params = {**SCENARIO_DEFAULTS, 'growth': growth / 100, 'participation': participation / 100,
+              'rate_sd': rate_sd / 100}
+    with st.spinner("🎲 Simulating scenarios..."):
+        scenarios = cached_cost_scenarios(version, n_draws, tuple(sorted(params.items())), 0, df)
+    col1, col2 = st.columns(2)
+    with col1:
+        metric = st.radio("Metric", ['Total Cost (₹)', 'CO2 (kg)'], horizontal=True)
+    with col2:
+        group_by = st.radio("Group By", list(SCENARIO_GROUPS), horizontal=True,
+                            format_func=lambda c: c.replace('_', ' '))
+    st.plotly_chart(create_scenario_chart(scenarios, metric, group_by), use_container_width=True)
+    overall = scenarios[(scenarios['Metric'] == metric) & (scenarios['Group By'] == 'All')].iloc[0]
+    st.caption(f"All communities: P5 {overall['P5']:,.0f} · P50 {overall['P50']:,.0f} · "
+               f"P95 {overall['P95']:,.0f} (point estimate {overall['Baseline']:,.0f}) over {n_draws:,} draws")
+    with st.expander("📋 Scenario Percentiles"):
+        st.dataframe(scenarios.round(1), hide_index=True, use_container_width=True)
+
+    # Export data
+    st.markdown("### 📥 Export Data")
+    render_export_panel(df, version)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("📋 Export Summary Report"):
+            summary = df.groupby('City').agg({
+                'Total Kgs in Jul 2025': ['sum', 'mean'],
+                'Total Households': 'sum',
+                'Efficiency_Score': 'mean',
+                'Collection_Cost': 'sum'
+            }).round(2)
+            csv = summary.to_csv()
+            st.download_button(
+                label="⬇️ Download Summary CSV",
+                data=csv,
+                file_name=f"waste_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                mime="text/csv"
+            )
+
+DASHBOARD_TABS = [
+    ("📊 Overview", render_overview_tab),
+    ("🎮 3D Visualizations", render_3d_tab),
+    ("🗺️ Geographic Analysis", render_geographic_tab),
+    ("🤖 AI Insights", render_ai_tab),
+    ("📈 Trends & Analytics", render_trends_tab),
+]
+
+def render_dashboard_tabs(df, version):
+    """Render only the selected tab; st.tabs would build all five bodies on every rerun"""
+    labels = [label for label, _ in DASHBOARD_TABS]
+    if not LAZY_TABS:
+        for tab, (_, render) in zip(st.tabs(labels), DASHBOARD_TABS):
+            with tab:
+                render(df, version)
+        return
+    
+    active = st.radio("Dashboard Section", labels, horizontal=True, key='active_tab',
+                      label_visibility='collapsed')
+    dict(DASHBOARD_TABS)[active](df, version)
+
 # ===== MAIN APPLICATION =====
 def main():
     """Main application function"""
@@ -766,22 +3937,7 @@ def main():
     create_sidebar()
     
     # Header
-    st.markdown("""
-    <div class="glass-card" style="text-align: center; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;">
-        <h1 style="margin: 0; font-size: 3rem; font-weight: 700;">
-            🏙️ Enhanced Smart Waste Management Dashboard
-        </h1>
-        <p style="margin: 1rem 0 0 0; font-size: 1.3rem; opacity: 0.9;">
-            🆕 Next-Generation Analytics with Rectangular 3D Bars
-        </p>
-        <div style="margin-top: 1rem;">
-            <span class="feature-badge">🎮 3D Visualizations</span>
-            <span class="feature-badge">🤖 AI Predictions</span>
-            <span class="feature-badge">📊 Real-time Analytics</span>
-            <span class="feature-badge">🗺️ Interactive Maps</span>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
     
     # Data loading section
     st.markdown("## 📁 Data Configuration")
@@ -800,8 +3956,8 @@ def main():
                 df = create_real_sample_data()
                 df = process_data(df)
                 if df is not None:
-                    st.session_state.df = df
-                    st.session_state.data_loaded = True
+                    df = activate_dataset(df)
+                if df is not None:
                     st.success(f"✅ Loaded {len(df)} real community records!")
                     st.rerun()
     
@@ -811,293 +3967,22 @@ def main():
             st.rerun()
     
     # Use stored data
-    if st.session_state.data_loaded and st.session_state.df is not None:
-        df = st.session_state.df
+    if st.session_state.data_loaded:
+        df = current_dataset()
     
     # Main dashboard
     if df is not None and len(df) > 0:
+        version = st.session_state.dataset_version
         
         # Main tabs
-        tab1, tab2, tab3, tab4, tab5 = st.tabs([
-            "📊 Overview", "🎮 3D Visualizations", "🗺️ Geographic Analysis", 
-            "🤖 AI Insights", "📈 Trends & Analytics"
-        ])
-        
-        with tab1:
-            st.markdown("## 📊 Dashboard Overview")
-            create_metrics_cards(df)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                fig1 = create_status_pie_chart(df)
-                st.plotly_chart(fig1, use_container_width=True)
-            
-            with col2:
-                fig2 = create_city_bar_chart(df)
-                st.plotly_chart(fig2, use_container_width=True)
-            
-            # Summary table
-            st.markdown("### 📋 Community Summary")
-            summary_df = df.groupby('City').agg({
-                'Total Kgs in Jul 2025': ['sum', 'mean', 'max'],
-                'Total Households': 'sum',
-                'Efficiency_Score': 'mean'
-            }).round(2)
-            st.dataframe(summary_df, use_container_width=True)
-        
-        with tab2:
-            st.markdown("## 🎮 Advanced 3D Visualizations")
-            
-            if HAS_PYDECK:
-                # Visualization type selector
-                viz_type = st.selectbox(
-                    "Choose 3D Visualization Type",
-                    ["🔳 Rectangular 3D Bars", "🔶 Hexagon Aggregation", "🏛️ Cylindrical Columns", "⚪ Scatter Bubbles"]
-                )
-                
-                # Visualization parameters
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    elevation_scale = st.slider("Elevation Scale", 5, 50, 20)
-                with col2:
-                    if viz_type == "🔳 Rectangular 3D Bars":
-                        bar_width = st.slider("Bar Width (meters)", 20, 100, 50)
-                    elif viz_type == "🔶 Hexagon Aggregation":
-                        radius = st.slider("Hexagon Radius", 50, 200, 100)
-                    else:
-                        radius = st.slider("Radius", 20, 100, 50)
-                with col3:
-                    pitch = st.slider("View Pitch", 0, 90, 50)
-                
-                # Create appropriate layer
-                if viz_type == "🔳 Rectangular 3D Bars":
-                    layer = create_rectangular_bars_layer(df, elevation_scale, bar_width)
-                    st.markdown("### 🔳 Rectangular 3D Bars - Next-Generation Visualization")
-                elif viz_type == "🔶 Hexagon Aggregation":
-                    layer = create_advanced_3d_hexagon_view(df, radius, elevation_scale)
-                    st.markdown("### 🔶 Hexagon Aggregation View")
-                elif viz_type == "🏛️ Cylindrical Columns":
-                    layer = create_advanced_column_layer(df, elevation_scale, radius)
-                    st.markdown("### 🏛️ Cylindrical Columns View")
-                else:
-                    layer = create_scatter_layer(df, radius)
-                    st.markdown("### ⚪ Scatter Bubbles View")
-                
-                if layer:
-                    view_state = {
-                        'longitude': df['Longitude'].mean(),
-                        'latitude': df['Latitude'].mean(),
-                        'zoom': 11,
-                        'pitch': pitch,
-                        'bearing': 0
-                    }
-                    
-                    deck = create_advanced_3d_deck(df, [layer], view_state)
-                    st.pydeck_chart(deck)
-                    
-                    st.info(f"🎯 Showing {len(df[df['Total Kgs in Jul 2025'] > 0])} communities with waste data in 3D visualization")
-                else:
-                    st.warning("⚠️ No data available for 3D visualization")
-            else:
-                st.error("❌ 3D visualizations require PyDeck. Install with: `pip install pydeck`")
-                st.info("📊 Install PyDeck to unlock advanced 3D visualization features!")
-        
-        with tab3:
-            st.markdown("## 🗺️ Geographic Intelligence")
-            
-            if HAS_FOLIUM:
-                # Create enhanced folium map
-                center_lat = df['Latitude'].mean()
-                center_lon = df['Longitude'].mean()
-                
-                m = folium.Map(location=[center_lat, center_lon], zoom_start=10, tiles='CartoDB Positron')
-                
-                # Add markers
-                for _, row in df.iterrows():
-                    color_map = {
-                        'Critical': 'red', 'High': 'orange', 'Medium': 'blue',
-                        'Low': 'green', 'None': 'gray'
-                    }
-                    
-                    popup_html = f"""
-                    <div style="font-family: Arial; width: 200px;">
-                        <h4 style="margin: 0; color: #333;">{row['Community']}</h4>
-                        <hr style="margin: 5px 0;">
-                        <b>City:</b> {row['City']}<br>
-                        <b>Waste:</b> {row['Total Kgs in Jul 2025']:.1f} kg<br>
-                        <b>Households:</b> {row['Total Households']}<br>
-                        <b>Status:</b> <span style="color: {color_map.get(row['Collection_Status'], 'gray')};">{row['Collection_Status']}</span><br>
-                        <b>Efficiency:</b> {row['Efficiency_Score']:.1f}%
-                    </div>
-                    """
-                    
-                    marker_size = max(5, min(25, row['Total Kgs in Jul 2025'] / 20)) if row['Total Kgs in Jul 2025'] > 0 else 5
-                    
-                    folium.CircleMarker(
-                        location=[row['Latitude'], row['Longitude']],
-                        radius=marker_size,
-                        popup=popup_html,
-                        color=color_map.get(row['Collection_Status'], 'gray'),
-                        fillOpacity=0.7,
-                        weight=2
-                    ).add_to(m)
-                
-                st_folium(m, width=700, height=500)
-                
-                # Geographic statistics
-                st.markdown("### 📍 Geographic Statistics")
-                geo_stats = df.groupby('City').agg({
-                    'Total Kgs in Jul 2025': ['sum', 'mean'],
-                    'Total Households': 'sum',
-                    'Efficiency_Score': 'mean'
-                }).round(2)
-                st.dataframe(geo_stats, use_container_width=True)
-            else:
-                # Fallback scatter plot
-                fig = px.scatter(
-                    df, x='Longitude', y='Latitude', 
-                    size='Total Kgs in Jul 2025', 
-                    color='Collection_Status',
-                    hover_data=['Community', 'City', 'Total Households'],
-                    title="Geographic Distribution of Waste"
-                )
-                st.plotly_chart(fig, use_container_width=True)
-        
-        with tab4:
-            st.markdown("## 🤖 AI-Powered Insights")
-            
-            if HAS_SKLEARN:
-                # Train ML model
-                if st.session_state.ml_model is None:
-                    with st.spinner("🤖 Training AI model..."):
-                        ml_model = WastePredictionModel()
-                        if ml_model.train(df):
-                            st.session_state.ml_model = ml_model
-                            st.success("✅ AI model trained successfully!")
-                        else:
-                            st.warning("⚠️ Unable to train AI model with current data")
-                
-                if st.session_state.ml_model and st.session_state.ml_model.is_trained:
-                    # Predictions
-                    predictions = st.session_state.ml_model.predict(df)
-                    
-                    if len(predictions) > 0:
-                        fig = go.Figure()
-                        
-                        fig.add_trace(go.Scatter(
-                            x=df['Total Kgs in Jul 2025'],
-                            y=predictions,
-                            mode='markers',
-                            name='Predictions',
-                            marker=dict(color='#667eea', size=8, opacity=0.7),
-                            text=df['Community'],
-                            hovertemplate='<b>%{text}</b><br>Actual: %{x:.1f} kg<br>Predicted: %{y:.1f} kg<extra></extra>'
-                        ))
-                        
-                        # Perfect prediction line
-                        min_val = min(df['Total Kgs in Jul 2025'].min(), predictions.min())
-                        max_val = max(df['Total Kgs in Jul 2025'].max(), predictions.max())
-                        
-                        fig.add_trace(go.Scatter(
-                            x=[min_val, max_val],
-                            y=[min_val, max_val],
-                            mode='lines',
-                            name='Perfect Prediction',
-                            line=dict(color='red', dash='dash')
-                        ))
-                        
-                        fig.update_layout(
-                            title="🎯 AI Predictions vs Actual Waste",
-                            xaxis_title="Actual Waste (kg)",
-                            yaxis_title="Predicted Waste (kg)",
-                            height=500
-                        )
-                        
-                        st.plotly_chart(fig, use_container_width=True)
-                        
-                        # Zero-waste predictions
-                        zero_waste = df[df['Total Kgs in Jul 2025'] == 0]
-                        if len(zero_waste) > 0:
-                            st.markdown("### 🔮 Predictions for Zero-Waste Communities")
-                            zero_predictions = st.session_state.ml_model.predict(zero_waste)
-                            zero_results = zero_waste[['Community', 'City', 'Total Households']].copy()
-                            zero_results['Predicted_Waste'] = zero_predictions.round(1)
-                            st.dataframe(zero_results, use_container_width=True)
-            else:
-                st.warning("🤖 AI features require scikit-learn. Install with: `pip install scikit-learn`")
-        
-        with tab5:
-            st.markdown("## 📈 Trends & Advanced Analytics")
-            
-            # Trend chart
-            trend_fig = create_trend_chart(df)
-            st.plotly_chart(trend_fig, use_container_width=True)
-            
-            # Correlation analysis
-            st.markdown("### 🔗 Correlation Matrix")
-            numeric_cols = ['Total Households', 'Total Kgs in Jul 2025', 'Waste_Per_Household', 'Efficiency_Score']
-            corr_matrix = df[numeric_cols].corr()
-            
-            fig = px.imshow(
-                corr_matrix,
-                text_auto=True,
-                aspect="auto",
-                title="Correlation Matrix of Key Metrics",
-                color_continuous_scale="RdBu"
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Community analysis
-            st.markdown("### 🏘️ Community Type Analysis")
-            type_analysis = df.groupby('Community_Type').agg({
-                'Total Kgs in Jul 2025': ['count', 'mean', 'sum'],
-                'Efficiency_Score': 'mean',
-                'Collection_Cost': 'sum'
-            }).round(2)
-            st.dataframe(type_analysis, use_container_width=True)
-            
-            # Export data
-            st.markdown("### 📥 Export Data")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if st.button("📊 Export Current Dataset"):
-                    csv = df.to_csv(index=False)
-                    st.download_button(
-                        label="⬇️ Download Complete CSV",
-                        data=csv,
-                        file_name=f"waste_management_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-            
-            with col2:
-                if st.button("📋 Export Summary Report"):
-                    summary = df.groupby('City').agg({
-                        'Total Kgs in Jul 2025': ['sum', 'mean'],
-                        'Total Households': 'sum',
-                        'Efficiency_Score': 'mean',
-                        'Collection_Cost': 'sum'
-                    }).round(2)
-                    csv = summary.to_csv()
-                    st.download_button(
-                        label="⬇️ Download Summary CSV",
-                        data=csv,
-                        file_name=f"waste_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
+        render_dashboard_tabs(df, version)
+        render_tab_latency()
         
         # Footer
         st.markdown("---")
-        st.markdown(f"""
-        <div style='text-align: center; padding: 2rem; background: linear-gradient(135deg, rgba(102, 126, 234, 0.1) 0%, rgba(118, 75, 162, 0.1) 100%); border-radius: 16px; margin-top: 2rem;'>
-            <h4 style='margin: 0 0 1rem 0; color: #333;'>🏙️ Enhanced Smart Waste Management Dashboard</h4>
-            <p style='margin: 0; color: #666; font-size: 14px;'>
-                🚀 Next-Generation Analytics • 🎮 3D Visualizations • 🤖 AI Predictions • 🗺️ Interactive Maps<br>
-                Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M')} | Records: {len(df):,} | PyDeck: {'✅' if HAS_PYDECK else '❌'} | AI: {'✅' if HAS_SKLEARN else '❌'}
-            </p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(FOOTER_TEMPLATE.format(updated=datetime.now().strftime('%Y-%m-%d %H:%M'), records=len(df),
+                                           pydeck='✅' if HAS_PYDECK else '❌', ai='✅' if HAS_SKLEARN else '❌'),
+                    unsafe_allow_html=True)
         
     else:
         # Welcome screen
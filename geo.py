@@ -0,0 +1,46 @@
+# Coordinate and community-name helpers shared by the dashboard and its subsystems
+
+import numpy as np
+import pandas as pd
+
+SERVICE_REGION = {'lat': (17.5, 19.8), 'lon': (72.5, 74.0)}
+EARTH_RADIUS_KM = 6371.0088
+
+def valid_coordinates(df):
+    """Boolean mask of rows that can be placed on a map"""
+    return (np.isfinite(df['Latitude'].to_numpy(dtype='float64')) &
+            np.isfinite(df['Longitude'].to_numpy(dtype='float64')))
+
+def map_center(df):
+    """(latitude, longitude) centre of mappable rows, or of the service region"""
+    mappable = df[valid_coordinates(df)]
+    if len(mappable) == 0:
+        return sum(SERVICE_REGION['lat']) / 2, sum(SERVICE_REGION['lon']) / 2
+    return float(mappable['Latitude'].mean()), float(mappable['Longitude'].mean())
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; inputs broadcast like NumPy arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def local_km(lat, lon, lat0):
+    """Equirectangular projection to km around ``lat0``; accurate at city scale"""
+    return np.column_stack([np.asarray(lon) * 111.320 * np.cos(np.radians(lat0)), np.asarray(lat) * 110.574])
+
+def normalize_names(names):
+    """Lower-case names with punctuation and repeated whitespace removed"""
+    return (names.astype(str).str.lower()
+            .str.replace(r'[^a-z0-9 ]+', ' ', regex=True)
+            .str.replace(r'\s+', ' ', regex=True)
+            .str.strip())
+
+def _normalized_hashes(values):
+    """Per-row uint64 hash of the normalized text, normalizing each distinct value once"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    normalized = normalize_names(pd.Series(uniques, dtype=object))
+    return pd.util.hash_array(normalized.to_numpy(dtype=object))[codes]
+
+def community_keys(cities, communities):
+    """uint64 key of the normalized (city, community) pair"""
+    return _normalized_hashes(cities) * np.uint64(0x9E3779B97F4A7C15) ^ _normalized_hashes(communities)
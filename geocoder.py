@@ -0,0 +1,129 @@
+# Offline geocoder: fills or repairs community coordinates from local tables
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from geo import SERVICE_REGION, community_keys, valid_coordinates
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# The bundled table holds the mean coordinate of the sample communities per pincode; point this at a
+# fuller pincode centroid table (Pincode, Latitude, Longitude columns) to cover other areas
+PINCODE_CENTROIDS_FILE = os.environ.get('WASTE_DASHBOARD_PINCODE_CENTROIDS',
+                                        os.path.join(DATA_DIR, 'pincode_centroids.csv'))
+GEOCODE_CONFIDENCE = {'original': 1.0, 'community': 0.8, 'pincode': 0.4, 'unresolved': 0.0}
+GEOCODE_SOURCES = list(GEOCODE_CONFIDENCE)
+ORIGINAL, COMMUNITY, PINCODE, UNRESOLVED = range(len(GEOCODE_SOURCES))
+
+class SortedKeyIndex:
+    """Read-only integer-key map stored as sorted NumPy arrays"""
+
+    def __init__(self, keys, values):
+        keys = np.asarray(keys)
+        values = np.asarray(values)
+        order = np.argsort(keys, kind='stable')
+        keys, values = keys[order], values[order]
+        # Keep the first value for repeated keys
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        self.keys = keys[first]
+        self.values = values[first]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, keys):
+        """(values, found) for each key; values are undefined where not found"""
+        keys = np.asarray(keys, dtype=self.keys.dtype)
+        if len(self.keys) == 0:
+            return np.zeros((len(keys),) + self.values.shape[1:], dtype=self.values.dtype), np.zeros(len(keys), dtype=bool)
+        pos = np.clip(np.searchsorted(self.keys, keys), 0, len(self.keys) - 1)
+        return self.values[pos], self.keys[pos] == keys
+
+def _pincode_keys(pincodes):
+    return pd.to_numeric(pincodes, errors='coerce').fillna(-1).to_numpy().astype(np.int64)
+
+class OfflineGeocoder:
+    """Fills or repairs coordinates from local tables only; no network calls"""
+
+    def __init__(self, pincode_table, community_table):
+        self.pincodes = SortedKeyIndex(
+            _pincode_keys(pincode_table['Pincode']),
+            pincode_table[['Latitude', 'Longitude']].to_numpy(dtype='float64')
+        )
+        community_table = community_table[valid_coordinates(community_table)]
+        self.communities = SortedKeyIndex(
+            community_keys(community_table['City'], community_table['Community']),
+            community_table[['Latitude', 'Longitude']].to_numpy(dtype='float64')
+        )
+
+    @classmethod
+    def from_bundled(cls, community_table, path=PINCODE_CENTROIDS_FILE):
+        """Geocoder over the bundled pincode centroids and the given community coordinates"""
+        if os.path.exists(path):
+            pincode_table = pd.read_csv(path)
+        else:
+            pincode_table = pd.DataFrame(columns=['Pincode', 'Latitude', 'Longitude'])
+        return cls(pincode_table, community_table)
+
+    def geocode(self, df, rows=None, local=None):
+        """Coordinates and GEOCODE_SOURCES code for ``rows`` of ``df``; ``local`` communities are tried first"""
+        subset = df if rows is None else df.iloc[rows]
+        pincodes = subset['Pincode'] if 'Pincode' in subset.columns else None
+        return self._resolve(community_keys(subset['City'], subset['Community']), pincodes, local)
+
+    def _resolve(self, keys, pincodes=None, local=None):
+        n = len(keys)
+        coords = np.full((n, 2), np.nan)
+        source = np.full(n, UNRESOLVED, dtype=np.int8)
+        if n == 0:
+            return coords, source
+
+        found = np.zeros(n, dtype=bool)
+        for index in (local, self.communities):
+            if index is None:
+                continue
+            found_coords, hit = index.lookup(keys)
+            hit &= ~found
+            coords[hit] = found_coords[hit]
+            found |= hit
+        source[found] = COMMUNITY
+
+        if pincodes is not None:
+            pending = ~found
+            pin_coords, pin_found = self.pincodes.lookup(_pincode_keys(pincodes))
+            use = pending & pin_found
+            coords[use] = pin_coords[use]
+            source[use] = PINCODE
+        return coords, source
+
+    def repair(self, df, reference=True):
+        """Fill NaN or out-of-region coordinates of ``df`` in place, keeping the originals as ``*_Raw``"""
+        lat = df['Latitude'].to_numpy(dtype='float64', copy=True)
+        lon = df['Longitude'].to_numpy(dtype='float64', copy=True)
+        df['Latitude_Raw'] = lat.copy()
+        df['Longitude_Raw'] = lon.copy()
+        usable = (np.isfinite(lat) & np.isfinite(lon) &
+                  (lat >= SERVICE_REGION['lat'][0]) & (lat <= SERVICE_REGION['lat'][1]) &
+                  (lon >= SERVICE_REGION['lon'][0]) & (lon <= SERVICE_REGION['lon'][1]))
+        source = np.where(usable, ORIGINAL, UNRESOLVED).astype(np.int8)
+        broken = np.flatnonzero(~usable)
+
+        if len(broken):
+            keys = community_keys(df['City'], df['Community'])
+            local = None
+            if reference and usable.any():
+                local = SortedKeyIndex(keys[usable], np.column_stack([lat[usable], lon[usable]]))
+            pincodes = df['Pincode'].iloc[broken] if 'Pincode' in df.columns else None
+            coords, found_source = self._resolve(keys[broken], pincodes, local)
+            resolved = found_source != UNRESOLVED
+            lat[broken[resolved]] = coords[resolved, 0]
+            lon[broken[resolved]] = coords[resolved, 1]
+            source[broken] = found_source
+            df['Latitude'] = lat
+            df['Longitude'] = lon
+
+        df['Geocode_Source'] = pd.Categorical.from_codes(source, categories=GEOCODE_SOURCES)
+        df['Geocode_Confidence'] = np.array(list(GEOCODE_CONFIDENCE.values()))[source]
+        return df
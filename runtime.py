@@ -0,0 +1,81 @@
+# Worker process pool and local HTTP servers shared by the dashboard and its subsystems
+
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pickle import PicklingError
+
+import streamlit as st
+
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+@st.cache_resource
+def get_worker_pool():
+    return ProcessPoolExecutor(max_workers=MAX_WORKERS)
+
+def reset_worker_pool():
+    """Shut down a broken pool's workers and drop it so the next call starts a fresh one"""
+    get_worker_pool().shutdown(wait=False, cancel_futures=True)
+    get_worker_pool.clear()
+
+def run_heavy_task(fn, *args, **kwargs):
+    """Run a CPU-heavy job on the worker pool, falling back to in-process"""
+    try:
+        return get_worker_pool().submit(fn, *args, **kwargs).result()
+    except (BrokenProcessPool, PicklingError, OSError):
+        reset_worker_pool()
+        return fn(*args, **kwargs)
+
+def run_heavy_tasks(fn, jobs, pool=None):
+    """Run one CPU-heavy job per argument tuple on the worker pool, falling back to in-process"""
+    try:
+        # Background threads pass the pool in: they have no script context to reach the cache with
+        pool = pool or get_worker_pool()
+        return [future.result() for future in [pool.submit(fn, *job) for job in jobs]]
+    except (BrokenProcessPool, PicklingError, OSError):
+        reset_worker_pool()
+        return [fn(*job) for job in jobs]
+
+class LocalHTTPServer:
+    """Threaded HTTP server with handlers per first path segment returning (status, headers, bytes or open file)"""
+
+    def __init__(self, host, port, name='local-server', public_url=None):
+        self.routes = {}
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                handler = owner.routes.get(path.strip('/').split('/', 1)[0])
+                status, headers, body = handler(path, query) if handler else (404, {}, b'not found')
+                self.send_response(status)
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                if isinstance(body, bytes):
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                with body:
+                    self.send_header('Content-Length', str(os.fstat(body.fileno()).st_size))
+                    self.end_headers()
+                    shutil.copyfileobj(body, self.wfile)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self.httpd = ThreadingHTTPServer((host, port), Handler)
+        except OSError:
+            # Port taken (e.g. a second app instance): fall back to any free port
+            self.httpd = ThreadingHTTPServer((host, 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.base_url = (public_url or f"http://{host}:{self.port}").rstrip('/')
+        threading.Thread(target=self.httpd.serve_forever, name=name, daemon=True).start()
+
+    def register(self, prefix, handler):
+        self.routes[prefix] = handler
@@ -0,0 +1,397 @@
+# Weekly collection scheduling: pickup days, truck routes and incremental re-planning
+
+import numpy as np
+import pandas as pd
+
+from geo import local_km, map_center, valid_coordinates
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+PICKUP_FREQUENCY = {'Critical': 6, 'High': 3, 'Medium': 2, 'Low': 1, 'None': 0}  # pickups per week
+WEEKS_PER_MONTH = 30.44 / 7
+ROAD_FACTOR = 1.3  # road distance over straight-line distance
+SCHEDULE_DEFAULTS = {
+    'trucks': 10,
+    'capacity_kg': 1_000.0,
+    'shift_hours': 8.0,
+    'service_minutes': 6.0,
+    'speed_kmh': 20.0,
+    'days': 6,
+}
+SCHEDULE_LOCAL_SEARCH_PASSES = 3
+REPLAN_MAX_CHANGED = 0.2
+UNSERVED_COLUMNS = ['Day', 'Community', 'City', 'Collection_Status', 'Pickup_Kg']
+
+def hilbert_index(x, y, order=16):
+    """Position of each (x, y) on a Hilbert curve over their bounding box; nearby points get nearby indices"""
+    side = 2 ** order
+    span_x, span_y = max(np.ptp(x), 1e-12), max(np.ptp(y), 1e-12)
+    xi = ((x - x.min()) / span_x * (side - 1)).astype('int64')
+    yi = ((y - y.min()) / span_y * (side - 1)).astype('int64')
+    d = np.zeros(len(x), dtype='int64')
+    s = side // 2
+    while s > 0:
+        rx = (xi & s) > 0
+        ry = (yi & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry
+        swap_x = np.where(flip & rx, side - 1 - xi, xi)
+        swap_y = np.where(flip & rx, side - 1 - yi, yi)
+        xi, yi = np.where(flip, swap_y, xi), np.where(flip, swap_x, yi)
+        s //= 2
+    return d
+
+def pickup_days(frequency, offset, days):
+    """(visit_row, visit_day) for evenly spaced pickups starting on ``offset``"""
+    rows = np.repeat(np.arange(len(frequency)), frequency)
+    nth = np.arange(len(rows)) - np.repeat(np.cumsum(frequency) - frequency, frequency)
+    day = (offset[rows] + np.floor(nth * days / frequency[rows]).astype('int64')) % days
+    return rows, day
+
+def assign_day_offsets(curve, frequency, demand, days):
+    """Start day per community, balancing weekly load while keeping neighbours on the same days"""
+    offset = np.zeros(len(frequency), dtype='int64')
+    for f in np.unique(frequency[frequency > 0]):
+        members = np.flatnonzero(frequency == f)
+        members = members[np.argsort(curve[members], kind='stable')]
+        weight = demand[members] + 1e-9
+        before = np.cumsum(weight) - weight
+        offset[members] = np.minimum(before / weight.sum() * days, days - 1).astype('int64')
+    return offset
+
+def _route_order(x, y, labels, depot_xy):
+    """Visit order within each route: sweep by angle around the depot"""
+    angle = np.arctan2(y - depot_xy[1], x - depot_xy[0])
+    return np.lexsort((angle, labels))
+
+def route_metrics(x, y, kg, service_h, labels, depot_xy, speed_kmh):
+    """Per-route (stops, load, km, hours) plus each visit's stop number, routes visited in sweep order"""
+    n_routes = int(labels.max()) + 1 if len(labels) else 0
+    order = _route_order(x, y, labels, depot_xy)
+    ox, oy, ol = x[order], y[order], labels[order]
+    first = np.r_[True, ol[1:] != ol[:-1]]
+    last = np.r_[ol[1:] != ol[:-1], True]
+    depot_leg = np.hypot(ox - depot_xy[0], oy - depot_xy[1])
+    step = np.r_[0.0, np.hypot(np.diff(ox), np.diff(oy))]
+    step[first] = depot_leg[first]
+    km = (np.bincount(ol, weights=step, minlength=n_routes)
+          + np.bincount(ol[last], weights=depot_leg[last], minlength=n_routes)) * ROAD_FACTOR
+    stops = np.bincount(labels, minlength=n_routes)
+    hours = np.bincount(labels, weights=service_h, minlength=n_routes) + km / speed_kmh
+    stop_number = np.empty(len(labels), dtype='int64')
+    starts = np.flatnonzero(first)
+    stop_number[order] = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)])) + 1
+    return stops, np.bincount(labels, weights=kg, minlength=n_routes), km, hours, stop_number
+
+def sweep_pack(x, y, kg, service_h, depot_xy, capacity_kg, shift_hours, speed_kmh):
+    """Cut one day's visits into routes along a depot sweep without breaking capacity or shift length"""
+    n = len(x)
+    if n == 0:
+        return np.zeros(0, dtype='int64')
+    order = np.lexsort((np.hypot(x - depot_xy[0], y - depot_xy[1]), np.arctan2(y - depot_xy[1], x - depot_xy[0])))
+    ox, oy = x[order], y[order]
+    leg = np.hypot(ox - depot_xy[0], oy - depot_xy[1]) * ROAD_FACTOR
+    path = np.r_[0.0, np.cumsum(np.hypot(np.diff(ox), np.diff(oy)) * ROAD_FACTOR)]
+    load = np.r_[0.0, np.cumsum(kg[order])]
+    service = np.r_[0.0, np.cumsum(service_h[order])]
+
+    # Route cost in km: depot legs, sweep path and service time
+    limit = shift_hours * speed_kmh
+    effort = path + service[1:] * speed_kmh
+    labels = np.empty(n, dtype='int64')
+    start, route = 0, 0
+    while start < n:
+        by_load = np.searchsorted(load, load[start] + capacity_kg, side='right') - 1
+        # Without the return leg the bound is monotone; exact costs below
+        base = effort[start] - service[start + 1] * speed_kmh + service[start] * speed_kmh
+        by_time = np.searchsorted(effort[start:], base + limit - leg[start], side='right') + start
+        last = np.arange(start, max(start + 1, min(by_load, by_time, n)))
+        cost = leg[start] + path[last] - path[start] + leg[last] + (service[last + 1] - service[start]) * speed_kmh
+        feasible = np.flatnonzero(cost <= limit)
+        end = last[feasible[-1]] + 1 if len(feasible) else start + 1
+        labels[order[start:end]] = route
+        start, route = end, route + 1
+    return labels
+
+def relocate_pass(x, y, kg, service_h, labels, depot_xy, capacity_kg, shift_hours, speed_kmh):
+    """Local search: move visits to a closer route centroid when the target has room"""
+    n_routes = int(labels.max()) + 1
+    if n_routes < 2:
+        return labels
+    mass = np.bincount(labels, minlength=n_routes).astype('float64')
+    cx = np.bincount(labels, weights=x, minlength=n_routes) / np.maximum(mass, 1)
+    cy = np.bincount(labels, weights=y, minlength=n_routes) / np.maximum(mass, 1)
+    dist = np.hypot(x[:, None] - cx[None, :], y[:, None] - cy[None, :])
+    target = dist.argmin(axis=1)
+    gain = dist[np.arange(len(x)), labels] - dist[np.arange(len(x)), target]
+    movers = np.flatnonzero((target != labels) & (gain > 1e-9) & (mass[labels] > 1))
+    if len(movers) == 0:
+        return labels
+    movers = movers[np.lexsort((-gain[movers], target[movers]))]
+    load = np.bincount(labels, weights=kg, minlength=n_routes) - np.bincount(labels[movers], weights=kg[movers], minlength=n_routes)
+    dest = target[movers]
+    running = np.zeros(len(movers))
+    for route in np.unique(dest):
+        in_route = dest == route
+        running[in_route] = load[route] + np.cumsum(kg[movers[in_route]])
+    proposed = labels.copy()
+    accepted = movers[running <= capacity_kg]
+    proposed[accepted] = target[accepted]
+    while True:
+        # Undo moves into routes past the shift until none are left
+        hours = route_metrics(x, y, kg, service_h, proposed, depot_xy, speed_kmh)[3]
+        undo = np.isin(proposed, np.flatnonzero(hours > shift_hours + 1e-9)) & (proposed != labels)
+        if not undo.any():
+            break
+        proposed[undo] = labels[undo]
+    # Keep route numbering dense if a route emptied out
+    return np.unique(proposed, return_inverse=True)[1].astype('int64')
+
+def improve_routes(x, y, kg, service_h, labels, depot_xy, capacity_kg, shift_hours, speed_kmh,
+                   passes=SCHEDULE_LOCAL_SEARCH_PASSES):
+    """Repeat relocation passes while total route distance keeps falling"""
+    best_km = route_metrics(x, y, kg, service_h, labels, depot_xy, speed_kmh)[2].sum()
+    for _ in range(passes):
+        candidate = relocate_pass(x, y, kg, service_h, labels, depot_xy, capacity_kg, shift_hours, speed_kmh)
+        if candidate is labels:
+            break
+        km = route_metrics(x, y, kg, service_h, candidate, depot_xy, speed_kmh)[2].sum()
+        if km >= best_km - 1e-9:
+            break
+        labels, best_km = candidate, km
+    return labels
+
+def _schedule_inputs(df, params):
+    """Per-community frequency, per-pickup kg and service hours for mappable communities"""
+    mappable = df[valid_coordinates(df)]
+    status = mappable['Collection_Status'].astype(str)
+    frequency = status.map(PICKUP_FREQUENCY).fillna(0).astype('int64').to_numpy()
+    frequency = np.minimum(frequency, params['days'])
+    monthly = mappable['Total Kgs in Jul 2025'].to_numpy(dtype='float64')
+    demand = np.where(frequency > 0, monthly / WEEKS_PER_MONTH / np.maximum(frequency, 1), 0.0)
+    return mappable, frequency, demand
+
+def default_depots(df):
+    """One depot per city at its waste-weighted centre, as (lat, lon) pairs"""
+    mappable = df[valid_coordinates(df)]
+    weights = mappable['Total Kgs in Jul 2025'].to_numpy(dtype='float64') + 1e-3
+    depots = []
+    for _, idx in mappable.groupby('City', sort=True).indices.items():
+        w = weights[idx]
+        depots.append((float(np.average(mappable['Latitude'].to_numpy()[idx], weights=w)),
+                       float(np.average(mappable['Longitude'].to_numpy()[idx], weights=w))))
+    return depots or [map_center(df)]
+
+def _project(lat, lon, depots, lat0):
+    """Local km coordinates of communities and depots, plus each community's nearest depot"""
+    xy = local_km(lat, lon, lat0)
+    depot_xy = local_km([d[0] for d in depots], [d[1] for d in depots], lat0)
+    nearest = np.hypot(xy[:, None, 0] - depot_xy[None, :, 0], xy[:, None, 1] - depot_xy[None, :, 1]).argmin(axis=1)
+    return xy, depot_xy, nearest
+
+def _plan_days(x, y, kg, service_h, day, depot, depot_xy, params):
+    """Sweep-pack and improve routes for every (day, depot); route ids are unique within a day"""
+    route = np.zeros(len(day), dtype='int64')
+    for d in range(params['days']):
+        next_route = 0
+        for m in range(len(depot_xy)):
+            group = np.flatnonzero((day == d) & (depot == m))
+            if len(group) == 0:
+                continue
+            args = (x[group], y[group], kg[group], service_h[group])
+            labels = sweep_pack(*args, depot_xy[m], params['capacity_kg'], params['shift_hours'], params['speed_kmh'])
+            labels = improve_routes(*args, labels, depot_xy[m], params['capacity_kg'], params['shift_hours'],
+                                    params['speed_kmh'])
+            route[group] = labels + next_route
+            next_route += int(labels.max()) + 1
+    return route
+
+def _route_groups(day, depot):
+    """Row indices per (day, depot) pair"""
+    return pd.DataFrame({'day': day, 'depot': depot}).groupby(['day', 'depot'], sort=True).indices.items()
+
+def _schedule_frame(mappable, rows, day, route, depot, demand, frequency, xy, depots, lat0, params):
+    """Visit table with truck numbers and stop order, sorted by day, truck and stop"""
+    depot_xy = local_km([d[0] for d in depots], [d[1] for d in depots], lat0)
+    kg = demand[rows]
+    service_h = np.full(len(rows), params['service_minutes'] / 60)
+    x, y = xy[rows, 0], xy[rows, 1]
+    stop = np.zeros(len(rows), dtype='int64')
+    for (_, m), idx in _route_groups(day, depot):
+        labels = np.unique(route[idx], return_inverse=True)[1]
+        stop[idx] = route_metrics(x[idx], y[idx], kg[idx], service_h[idx], labels, depot_xy[m], params['speed_kmh'])[4]
+    schedule = pd.DataFrame({
+        'Day_Index': day,
+        'Day': np.array(WEEKDAYS)[day],
+        'Truck': route + 1,
+        'Depot': depot + 1,
+        'Stop': stop,
+        'Community': mappable['Community'].to_numpy()[rows],
+        'City': mappable['City'].to_numpy()[rows],
+        'Collection_Status': mappable['Collection_Status'].astype(str).to_numpy()[rows],
+        'Pickups_Per_Week': frequency[rows],
+        'Pickup_Kg': kg.round(2),
+        'Latitude': mappable['Latitude'].to_numpy()[rows],
+        'Longitude': mappable['Longitude'].to_numpy()[rows],
+        'Monthly_Kg': mappable['Total Kgs in Jul 2025'].to_numpy(dtype='float64')[rows],
+        'Key': _community_keys(mappable).to_numpy()[rows],
+    })
+    # Pickup number within each community's week, in day order
+    schedule['Visit'] = schedule.sort_values('Day_Index', kind='stable').groupby('Key').cumcount()
+    schedule['Over_Capacity'] = schedule['Pickup_Kg'] > params['capacity_kg']
+    schedule, unserved = _enforce_fleet(schedule, params['trucks'])
+    schedule = schedule.sort_values(['Day_Index', 'Truck', 'Stop'], ignore_index=True)
+    schedule.attrs.update(depots=[tuple(d) for d in depots], lat0=lat0, unserved=unserved)
+    return schedule
+
+def _enforce_fleet(schedule, trucks):
+    """Keep each day's ``trucks`` heaviest routes; returns (schedule, unserved visits on the dropped routes)"""
+    routes = schedule.groupby(['Day_Index', 'Truck'], as_index=False)['Pickup_Kg'].sum()
+    routes['Rank'] = routes.groupby('Day_Index')['Pickup_Kg'].rank(method='first', ascending=False)
+    kept = routes[routes['Rank'] <= trucks].copy()
+    # Renumber the kept trucks 1..n per day in their original order
+    kept['New_Truck'] = kept.groupby('Day_Index')['Truck'].rank(method='first').astype('int64')
+    merged = schedule.merge(kept[['Day_Index', 'Truck', 'New_Truck']], on=['Day_Index', 'Truck'], how='left')
+    served = merged['New_Truck'].notna().to_numpy()
+    # Identity and inputs are kept so a re-plan can tell whether the community changed
+    unserved = schedule.loc[~served, UNSERVED_COLUMNS + ['Monthly_Kg', 'Latitude', 'Longitude', 'Key']].reset_index(drop=True)
+    schedule = schedule[served].copy()
+    schedule['Truck'] = merged.loc[served, 'New_Truck'].to_numpy(dtype='int64')
+    return schedule, unserved
+
+def plan_collection_schedule(df, params=None, depots=None):
+    """Weekly pickups per day and truck; pickups beyond the fleet go to ``attrs['unserved']``"""
+    params = {**SCHEDULE_DEFAULTS, **(params or {})}
+    mappable, frequency, demand = _schedule_inputs(df, params)
+    depots = depots or default_depots(df)
+    lat = mappable['Latitude'].to_numpy(dtype='float64')
+    lon = mappable['Longitude'].to_numpy(dtype='float64')
+    lat0 = float(lat.mean()) if len(lat) else depots[0][0]
+    xy, depot_xy, nearest = _project(lat, lon, depots, lat0)
+
+    offset = assign_day_offsets(hilbert_index(xy[:, 0], xy[:, 1]) if len(xy) else np.zeros(0, dtype='int64'),
+                                frequency, demand * frequency, params['days'])
+    rows, day = pickup_days(frequency, offset, params['days'])
+    service_h = np.full(len(rows), params['service_minutes'] / 60)
+    route = _plan_days(xy[rows, 0], xy[rows, 1], demand[rows], service_h, day, nearest[rows], depot_xy, params)
+    return _schedule_frame(mappable, rows, day, route, nearest[rows], demand, frequency, xy, depots, lat0, params)
+
+def truck_utilization(schedule, params=None):
+    """Per day and truck: stops, load, distance and shift use; routes loaded past capacity are flagged"""
+    params = {**SCHEDULE_DEFAULTS, **(params or {})}
+    if len(schedule) == 0:
+        return pd.DataFrame(columns=['Day', 'Truck', 'Depot', 'Stops', 'Load_Kg', 'Capacity_%', 'Route_km',
+                                     'Shift_h', 'Shift_%', 'Over_Capacity'])
+    depots, lat0 = schedule.attrs['depots'], schedule.attrs['lat0']
+    depot_xy = local_km([d[0] for d in depots], [d[1] for d in depots], lat0)
+    xy = local_km(schedule['Latitude'].to_numpy(), schedule['Longitude'].to_numpy(), lat0)
+    kg = schedule['Pickup_Kg'].to_numpy(dtype='float64')
+    service_h = np.full(len(schedule), params['service_minutes'] / 60)
+    trucks = schedule['Truck'].to_numpy()
+    frames = []
+    for (d, m), idx in _route_groups(schedule['Day_Index'].to_numpy(), schedule['Depot'].to_numpy() - 1):
+        numbers, labels = np.unique(trucks[idx], return_inverse=True)
+        stops, load, km, hours, _ = route_metrics(xy[idx, 0], xy[idx, 1], kg[idx], service_h[idx], labels,
+                                                  depot_xy[m], params['speed_kmh'])
+        frames.append(pd.DataFrame({
+            'Day_Index': d, 'Day': WEEKDAYS[d], 'Truck': numbers, 'Depot': m + 1, 'Stops': stops,
+            'Load_Kg': load.round(1), 'Capacity_%': (100 * load / params['capacity_kg']).round(1),
+            'Route_km': km.round(1), 'Shift_h': hours.round(2),
+            'Shift_%': (100 * hours / params['shift_hours']).round(1),
+            'Over_Capacity': load > params['capacity_kg'] + 1e-9,
+        }))
+    return (pd.concat(frames).sort_values(['Day_Index', 'Truck'], ignore_index=True).drop(columns='Day_Index'))
+
+def _community_keys(frame):
+    """Community|City|n identity; n numbers repeated names so duplicates stay distinct"""
+    base = frame['Community'].astype(str).str.cat(frame['City'].astype(str), sep='|')
+    return base.str.cat(base.groupby(base).cumcount().astype(str), sep='|')
+
+def replan_schedule(schedule, df, params=None):
+    """Update a schedule for a changed dataset, re-inserting only the communities that changed"""
+    params = {**SCHEDULE_DEFAULTS, **(params or {})}
+    depots, lat0 = schedule.attrs.get('depots'), schedule.attrs.get('lat0')
+    mappable, frequency, demand = _schedule_inputs(df, params)
+    if depots is None or len(schedule) == 0 or len(mappable) == 0:
+        return plan_collection_schedule(df, params)
+
+    keys = _community_keys(mappable).to_numpy()
+    unserved = schedule.attrs.get('unserved')
+    # One row per community in the old plan, served or not
+    previous = (schedule if unserved is None else pd.concat([schedule, unserved])).drop_duplicates('Key')
+    previous_sig = pd.Series(list(zip(previous['Collection_Status'], previous['Monthly_Kg'], previous['Latitude'],
+                                      previous['Longitude'])), index=previous['Key'].to_numpy())
+    current_sig = pd.Series(list(zip(mappable['Collection_Status'].astype(str),
+                                     mappable['Total Kgs in Jul 2025'].to_numpy(dtype='float64'),
+                                     mappable['Latitude'].to_numpy(), mappable['Longitude'].to_numpy())), index=keys)
+    unchanged = (current_sig.index.isin(previous_sig.index)
+                 & (current_sig.to_numpy() == previous_sig.reindex(current_sig.index).to_numpy()))
+    # Only communities with pickups appear in a schedule
+    changed = ~unchanged & (frequency > 0)
+    if changed.sum() > REPLAN_MAX_CHANGED * max((frequency > 0).sum(), 1):
+        return plan_collection_schedule(df, params, depots)
+
+    kept = schedule[schedule['Key'].isin(keys[unchanged])]
+    rows = pd.Index(keys).get_indexer(kept['Key'])
+    day, route = kept['Day_Index'].to_numpy(), kept['Truck'].to_numpy() - 1
+    depot = kept['Depot'].to_numpy() - 1
+    xy, depot_xy, nearest = _project(mappable['Latitude'].to_numpy(dtype='float64'),
+                                     mappable['Longitude'].to_numpy(dtype='float64'), depots, lat0)
+    service_h = params['service_minutes'] / 60
+
+    # Per-(day, route) state; spare columns are slots for new trucks
+    shape = (params['days'], (route.max() + 1 if len(route) else 0) + int(frequency.sum()) + 1)
+    load, count, sum_x, sum_y, hours = (np.zeros(shape) for _ in range(5))
+    route_depot = np.full(shape, -1)
+    np.add.at(load, (day, route), demand[rows])
+    np.add.at(count, (day, route), 1)
+    np.add.at(sum_x, (day, route), xy[rows, 0])
+    np.add.at(sum_y, (day, route), xy[rows, 1])
+    route_depot[day, route] = depot
+    for (d, m), idx in _route_groups(day, depot):
+        numbers, labels = np.unique(route[idx], return_inverse=True)
+        hours[d, numbers] = route_metrics(xy[rows[idx], 0], xy[rows[idx], 1], demand[rows[idx]],
+                                          np.full(len(idx), service_h), labels, depot_xy[m], params['speed_kmh'])[3]
+    day_load = load.sum(axis=1)
+
+    new_rows, new_days, new_routes = [], [], []
+    for i in np.flatnonzero(changed):
+        f, m = frequency[i], nearest[i]
+        candidates = [(o + np.floor(np.arange(f) * params['days'] / f).astype('int64')) % params['days']
+                      for o in range(params['days'])]
+        for d in min(candidates, key=lambda c: day_load[c].max()):
+            used = np.flatnonzero(route_depot[d] == m)
+            gap = np.hypot(sum_x[d, used] / count[d, used] - xy[i, 0], sum_y[d, used] / count[d, used] - xy[i, 1])
+            # Insertion cost: the stop plus a detour from the route centre
+            added = service_h + 2 * gap * ROAD_FACTOR / params['speed_kmh']
+            fits = (load[d, used] + demand[i] <= params['capacity_kg']) & (hours[d, used] + added <= params['shift_hours'])
+            if fits.any():
+                r = used[fits][gap[fits].argmin()]
+                hours[d, r] += added[fits][gap[fits].argmin()]
+            else:
+                r = int(np.flatnonzero(route_depot[d] < 0)[0])
+                route_depot[d, r] = m
+                hours[d, r] = service_h + 2 * np.hypot(*(xy[i] - depot_xy[m])) * ROAD_FACTOR / params['speed_kmh']
+            load[d, r] += demand[i]
+            count[d, r] += 1
+            sum_x[d, r] += xy[i, 0]
+            sum_y[d, r] += xy[i, 1]
+            day_load[d] += demand[i]
+            new_rows.append(i)
+            new_days.append(d)
+            new_routes.append(r)
+
+    rows = np.r_[rows, new_rows].astype('int64')
+    day = np.r_[day, new_days].astype('int64')
+    route = np.r_[route, new_routes].astype('int64')
+    # Renumber trucks densely per day
+    for d in np.unique(day):
+        on_day = day == d
+        route[on_day] = np.unique(route[on_day], return_inverse=True)[1]
+    replanned = _schedule_frame(mappable, rows, day, route, nearest[rows], demand, frequency, xy, depots, lat0, params)
+    # Unchanged communities keep their old unserved pickups; the fleet still has no room for them
+    if unserved is not None:
+        carried = unserved[unserved['Key'].isin(keys[unchanged])]
+        replanned.attrs['unserved'] = pd.concat([carried, replanned.attrs['unserved']], ignore_index=True)
+    replanned.attrs['replanned'] = int(changed.sum())
+    return replanned
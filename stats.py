@@ -0,0 +1,184 @@
+# Mergeable streaming statistics and quantile sketches for uploaded datasets
+
+import numpy as np
+import pandas as pd
+
+STATS_COLUMNS = ['Total Households', 'Total Kgs in Jul 2025', 'Waste_Per_Household', 'Efficiency_Score',
+                 'CO2_Impact', 'Collection_Cost', 'Processing_Cost']
+CORRELATION_COLUMNS = ['Total Households', 'Total Kgs in Jul 2025', 'Waste_Per_Household', 'Efficiency_Score']
+STATUS_THRESHOLDS = {'Medium': 25, 'High': 100, 'Critical': 300}
+STATUS_PERCENTILES = {'Medium': 0.5, 'High': 0.75, 'Critical': 0.9}
+NONZERO_KGS_SKETCH = 'Nonzero Kgs'
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch with O(k log n) memory"""
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels)
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (depth - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                leftover = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(leftover):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate quantile(s) for ``q`` in [0, 1]"""
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2.0 ** h) for h, l in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cum = np.cumsum(weights[order])
+        pos = np.searchsorted(cum, np.asarray(q) * cum[-1], side='left')
+        return items[order][np.clip(pos, 0, len(items) - 1)]
+
+class StreamingStats:
+    """Mergeable summary of a dataset fed chunk by chunk"""
+
+    def __init__(self, columns=None, sketch_k=200):
+        self.columns = list(columns or STATS_COLUMNS)
+        d = len(self.columns)
+        self.rows = 0
+        self.counts = np.zeros(d)
+        self.sums = np.zeros(d)
+        self.mins = np.full(d, np.inf)
+        self.maxs = np.full(d, -np.inf)
+        self.n = 0
+        self.means = np.zeros(d)
+        self.comoments = np.zeros((d, d))
+        self.status_counts = {}
+        self.sketches = {col: KLLSketch(sketch_k) for col in self.columns + [NONZERO_KGS_SKETCH]}
+
+    def update(self, chunk):
+        if chunk is None or len(chunk) == 0:
+            return self
+        values = np.column_stack([
+            pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype='float64') if col in chunk.columns
+            else np.full(len(chunk), np.nan)
+            for col in self.columns
+        ])
+        finite = np.isfinite(values)
+        self.rows += len(chunk)
+        self.counts += finite.sum(axis=0)
+        self.sums += np.where(finite, values, 0).sum(axis=0)
+        self.mins = np.minimum(self.mins, np.where(finite, values, np.inf).min(axis=0))
+        self.maxs = np.maximum(self.maxs, np.where(finite, values, -np.inf).max(axis=0))
+
+        complete = values[finite.all(axis=1)]
+        if len(complete):
+            mean_b = complete.mean(axis=0)
+            centered = complete - mean_b
+            self._combine(len(complete), mean_b, centered.T @ centered)
+
+        if 'Collection_Status' in chunk.columns:
+            for status, count in chunk['Collection_Status'].value_counts().items():
+                self.status_counts[status] = self.status_counts.get(status, 0) + int(count)
+
+        for i, col in enumerate(self.columns):
+            self.sketches[col].update(values[:, i])
+        if 'Total Kgs in Jul 2025' in self.columns:
+            kg = values[:, self.columns.index('Total Kgs in Jul 2025')]
+            self.sketches[NONZERO_KGS_SKETCH].update(kg[kg > 0])
+        return self
+
+    def _combine(self, n_b, mean_b, comoment_b):
+        n_a = self.n
+        n = n_a + n_b
+        delta = mean_b - self.means
+        self.means = self.means + delta * (n_b / n)
+        self.comoments = self.comoments + comoment_b + np.outer(delta, delta) * (n_a * n_b / n)
+        self.n = n
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge statistics over different columns")
+        self.rows += other.rows
+        self.counts += other.counts
+        self.sums += other.sums
+        self.mins = np.minimum(self.mins, other.mins)
+        self.maxs = np.maximum(self.maxs, other.maxs)
+        if other.n:
+            self._combine(other.n, other.means, other.comoments)
+        for status, count in other.status_counts.items():
+            self.status_counts[status] = self.status_counts.get(status, 0) + count
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+        return self
+
+    def sum(self, col):
+        return float(self.sums[self.columns.index(col)])
+
+    def mean(self, col):
+        i = self.columns.index(col)
+        return float(self.sums[i] / self.counts[i]) if self.counts[i] else float('nan')
+
+    def variance(self, col):
+        i = self.columns.index(col)
+        return float(self.comoments[i, i] / (self.n - 1)) if self.n > 1 else float('nan')
+
+    def corr(self, columns=None):
+        columns = list(columns or self.columns)
+        idx = [self.columns.index(c) for c in columns]
+        cov = self.comoments[np.ix_(idx, idx)]
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = cov / np.outer(std, std)
+        return pd.DataFrame(corr, index=columns, columns=columns)
+
+    def quantile(self, col, q):
+        return self.sketches[col].quantile(q)
+
+    @classmethod
+    def from_frame(cls, df, chunk_rows=250_000, columns=None):
+        stats = cls(columns)
+        for start in range(0, len(df), chunk_rows):
+            stats.update(df.iloc[start:start + chunk_rows])
+        return stats
+
+def percentile_status_thresholds(stats):
+    """Status cut-offs at fixed percentiles of non-zero monthly waste"""
+    values = stats.quantile(NONZERO_KGS_SKETCH, list(STATUS_PERCENTILES.values()))
+    return {status: float(v) for status, v in zip(STATUS_PERCENTILES, np.atleast_1d(values))}
+
+def collection_status(kgs, thresholds=STATUS_THRESHOLDS):
+    """Status label per monthly total: above a threshold takes that status, any other waste is 'Low'"""
+    kgs = np.asarray(kgs, dtype='float64')
+    ordered = sorted(thresholds.items(), key=lambda item: item[1], reverse=True)
+    conditions = [kgs > cut for _, cut in ordered] + [kgs > 0]
+    return np.select(conditions, [status for status, _ in ordered] + ['Low'], default='None').astype(object)
@@ -0,0 +1,16 @@
+from dash import minify_css
+
+def test_minify_css_strips_comments_and_whitespace():
+    css = """
+    /* header */
+    .app-header  h1 ,
+    .app-header > p {
+        color : #fff ;
+        margin: 0 auto;
+    }
+    """
+    assert minify_css(css) == '.app-header h1,.app-header>p{color:#fff;margin:0 auto}'
+
+def test_minify_css_handles_media_queries_and_multi_line_comments():
+    css = "@media (max-width: 600px) {\n  /* narrow\n     screens */\n  .metric-card { padding: 8px; }\n}\n"
+    assert minify_css(css) == '@media (max-width:600px){.metric-card{padding:8px}}'
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dash
+from dash import BoundaryLayer, assign_boundaries
+
+def _square(x0, y0, size, **properties):
+    ring = [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+    return {'type': 'Feature', 'properties': properties, 'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+
+def _wards():
+    return BoundaryLayer('wards', [
+        _square(72.80, 19.00, 0.1, ward='P-East', pincode=400097),
+        _square(72.90, 19.00, 0.1, ward='P-North', pincode=400064),
+    ])
+
+def _communities():
+    return pd.DataFrame({
+        'Community': ['a', 'b', 'c', 'd', 'e'],
+        'Longitude': [72.85, 72.95, 73.50, np.nan, 72.86],
+        'Latitude': [19.05, 19.05, 19.05, 19.05, 19.02],
+        'Pincode': [400097, 400097, 400001, 400097, None],
+    })
+
+def test_communities_get_their_polygon_and_pincode_mismatches_are_flagged():
+    result = assign_boundaries(_communities(), {'wards': _wards()})
+    assert result['wards_Index'].tolist() == [0, 1, -1, -1, 0]
+    assert result['wards'].isna().tolist() == [False, False, True, True, False]
+    assert result['wards'].dropna().tolist() == ['P-East', 'P-North', 'P-East']
+    # Outside every polygon or no declared pincode: unknown, not a mismatch
+    assert result['Pincode_Mismatch'].tolist() == [False, True, False, False, False]
+
+@pytest.mark.parametrize('backend', ['grid', 'shapely'])
+def test_backends_agree_on_random_points(backend):
+    if backend == 'shapely' and not dash.HAS_SHAPELY:
+        pytest.skip('shapely not installed')
+    rng = np.random.default_rng(0)
+    lon, lat = rng.uniform(72.75, 73.05, 500), rng.uniform(18.95, 19.15, 500)
+    expected = np.where((lat >= 19.0) & (lat <= 19.1) & (lon >= 72.8) & (lon <= 73.0),
+                        (lon > 72.9).astype(int), -1)
+    # Points on the shared edge may go to either polygon
+    edge = np.isclose(lon, 72.9)
+    assert (_wards().locate(lon, lat, backend=backend)[~edge] == expected[~edge]).all()
+
+def test_missing_dataset_is_not_cached(monkeypatch):
+    frames = {'v1': None}
+
+    class Manager:
+        def dataset(self, version):
+            return frames[version]
+
+    monkeypatch.setattr(dash, 'get_session_manager', lambda: Manager())
+    monkeypatch.setattr(dash, 'load_boundary_layers', lambda mtimes=None: {'wards': _wards()})
+    dash.compute_boundary_assignment.clear()
+    assert dash.compute_boundary_assignment('v1', ('sig',)) is None
+    frames['v1'] = _communities()
+    assert dash.compute_boundary_assignment('v1', ('sig',))['wards'].tolist()[0] == 'P-East'
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dash import (COLLECTION_COST_PER_KG, PROCESSING_COST_PER_KG, SCENARIO_DEFAULTS, scenario_factor_tables,
+                  simulate_cost_scenarios)
+
+def _communities(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'City': rng.choice(['Malad', 'Mangaon', 'Goregaon'], n),
+        'Community_Type': rng.choice(['Large Residential', 'Small Residential'], n),
+        'Total Kgs in Jul 2025': rng.uniform(0, 400, n),
+    })
+
+def _cost(results, group='All Communities'):
+    return results[(results['Metric'] == 'Total Cost (₹)') & (results['Group'] == group)].iloc[0]
+
+def test_lookup_tables_preserve_the_mean():
+    growth, participation = scenario_factor_tables({**SCENARIO_DEFAULTS, 'growth': 0.1, 'participation_sd': 0.0})
+    assert growth.dtype == np.float32 and len(growth) == 2 ** 16
+    assert growth.mean() == pytest.approx(1.1, rel=1e-3)
+    np.testing.assert_allclose(participation, 1.0, rtol=1e-6)
+
+def test_without_uncertainty_every_draw_is_the_point_estimate():
+    df = _communities()
+    params = {'growth_sd': 0.0, 'participation_sd': 0.0, 'rate_sd': 0.0}
+    results = simulate_cost_scenarios(df, n_draws=50, params=params)
+    baseline = df['Total Kgs in Jul 2025'].sum() * (COLLECTION_COST_PER_KG + PROCESSING_COST_PER_KG)
+    row = _cost(results)
+    assert row['Baseline'] == pytest.approx(baseline)
+    for column in ('Mean', 'P5', 'P50', 'P95'):
+        assert row[column] == pytest.approx(baseline, rel=1e-5)
+
+def test_draws_are_seeded_and_groups_add_up():
+    df = _communities()
+    first = simulate_cost_scenarios(df, n_draws=400, seed=3, block_rows=100)
+    pd.testing.assert_frame_equal(first, simulate_cost_scenarios(df, n_draws=400, seed=3, block_rows=100))
+    cities = first[(first['Metric'] == 'Total Cost (₹)') & (first['Group By'] == 'City')]
+    assert cities['Mean'].sum() == pytest.approx(_cost(first)['Mean'])
+    row = _cost(first)
+    assert row['P5'] < row['P50'] < row['P95']
+    # Mean-preserving draws stay centred on the point estimate
+    assert row['Mean'] == pytest.approx(row['Baseline'], rel=0.05)
@@ -0,0 +1,29 @@
+import struct
+import zlib
+
+import numpy as np
+
+from dash import encode_png
+
+def read_chunks(png):
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    pos, chunks = 8, []
+    while pos < len(png):
+        length, tag = struct.unpack('>I4s', png[pos:pos + 8])
+        data = png[pos + 8:pos + 8 + length]
+        crc, = struct.unpack('>I', png[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(tag + data) & 0xFFFFFFFF
+        chunks.append((tag, data))
+        pos += 12 + length
+    return chunks
+
+def test_png_round_trip():
+    rgba = np.random.default_rng(0).integers(0, 256, (7, 5, 4), dtype='uint8')
+    chunks = read_chunks(encode_png(rgba))
+    assert [tag for tag, _ in chunks] == [b'IHDR', b'IDAT', b'IEND']
+
+    width, height, depth, color, _, _, _ = struct.unpack('>IIBBBBB', chunks[0][1])
+    assert (width, height, depth, color) == (5, 7, 8, 6)
+    raw = np.frombuffer(zlib.decompress(chunks[1][1]), dtype='uint8').reshape(7, 1 + 5 * 4)
+    assert (raw[:, 0] == 0).all()
+    np.testing.assert_array_equal(raw[:, 1:].reshape(7, 5, 4), rgba)
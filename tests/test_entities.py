@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from dash import _connected_components, canonical_names, resolve_entities
+
+def _trigram_dice(a, b):
+    grams = [{f' {n} '[i:i + 3] for i in range(len(n))} for n in (a, b)]
+    return 2 * len(grams[0] & grams[1]) / (len(grams[0]) + len(grams[1]))
+
+def test_canonical_names_drop_generic_words():
+    names = pd.Series(['Mantri Park C.H.S. Ltd', 'The Society', 'Vikas  Apartments'])
+    # A name made only of generic words is kept whole
+    assert canonical_names(names).tolist() == ['mantri park c h s', 'the society', 'vikas']
+
+def test_spelling_variants_merge_within_a_block_only():
+    df = pd.DataFrame({
+        'City': ['Malad', 'Malad', 'Malad', 'Malad', 'Mangaon'],
+        'Pincode': [400097, 400097, 400097, 400064, 400097],
+        'Community': ['Vinay Sankalp', 'Vinay Sankalp CHS', 'Vinay Sankalpp', 'Vinay Sankalp', 'Vinay Sankalp'],
+    })
+    labels, pairs = resolve_entities(df)
+    assert labels[0] == labels[1] == labels[2]
+    # Same name, different pincode or city: different blocks, never compared
+    assert len({labels[0], labels[3], labels[4]}) == 3
+    assert set(pairs['Pincode'].astype(str)) == {'400097'}
+
+def test_similarity_is_the_trigram_dice_coefficient():
+    df = pd.DataFrame({'City': ['X', 'X'], 'Community': ['vinay sankalp', 'vinay sankalpp']})
+    _, pairs = resolve_entities(df, threshold=0.0)
+    assert pairs['Similarity'].iloc[0] == round(_trigram_dice('vinay sankalp', 'vinay sankalpp'), 3)
+    labels, pairs = resolve_entities(df, threshold=0.99)
+    assert len(pairs) == 0 and labels[0] != labels[1]
+
+def test_union_find_fallback_matches_the_graph_components():
+    a, b = np.array([0, 2, 5, 6]), np.array([1, 3, 6, 4])
+    labels = _connected_components(8, a, b)
+    groups = {tuple(np.flatnonzero(labels == label)) for label in np.unique(labels)}
+    assert groups == {(0, 1), (2, 3), (4, 5, 6), (7,)}
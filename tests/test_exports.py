@@ -0,0 +1,62 @@
+import os
+import time
+import urllib.request
+
+import pandas as pd
+
+from dash import ExportManager, apply_filters, write_export
+from runtime import LocalHTTPServer
+
+def _frame(rows=250):
+    return pd.DataFrame({
+        'City': ['A', 'B', 'C'] * (rows // 3) + ['A'] * (rows % 3),
+        'Community': [f'C{i}' for i in range(rows)],
+        'Latitude': [19.0 + i / 1e4 for i in range(rows)],
+        'Longitude': [72.8 + i / 1e4 for i in range(rows)],
+    })
+
+def _wait(manager, path):
+    while True:
+        state = manager.status(path)
+        if state[0] != 'running':
+            return state
+        time.sleep(0.01)
+
+def test_chunked_filtering_matches_filtering_the_whole_frame(tmp_path):
+    df = _frame()
+    filters = {'City': ['A', 'C'], 'Missing': ['x']}
+    path = str(tmp_path / 'out.csv')
+    write_export(df, path, 'csv', ['Community', 'City'], filters, chunk_rows=40)
+    expected = apply_filters(df, filters)[['Community', 'City']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(pd.read_csv(path), expected)
+
+def test_empty_selection_still_writes_a_header(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    write_export(_frame(), path, 'csv', ['Community'], {'City': ['Z']})
+    assert pd.read_csv(path).columns.tolist() == ['Community']
+
+def test_background_job_loads_the_dataset_by_version(tmp_path):
+    df = _frame()
+    loaded = []
+    manager = ExportManager(lambda version: loaded.append(version) or df, cache_dir=str(tmp_path))
+    path = manager.request('v1', 'csv', ['Community'], {'City': ['B']})
+    assert _wait(manager, path) == ('ready', None)
+    assert loaded == ['v1']
+    assert len(pd.read_csv(path)) == (df['City'] == 'B').sum()
+
+    gone = ExportManager(lambda version: None, cache_dir=str(tmp_path / 'gone'))
+    state, error = _wait(gone, gone.request('v2', 'csv', ['Community'], {}))
+    assert state == 'failed' and isinstance(error, ValueError)
+
+def test_finished_exports_are_streamed_from_disk(tmp_path):
+    manager = ExportManager(lambda version: _frame(), cache_dir=str(tmp_path))
+    path = manager.request('v1', 'csv', ['Community'], {})
+    _wait(manager, path)
+    server = LocalHTTPServer('127.0.0.1', 0, name='export-test')
+    server.register('exports', manager.serve)
+    with urllib.request.urlopen(f"{server.base_url}/exports/{os.path.basename(path)}") as response:
+        assert response.headers['Content-Disposition'].startswith('attachment;')
+        assert response.read() == open(path, 'rb').read()
+    for name in ('../etc/passwd', 'missing.csv'):
+        assert manager.serve(f'/exports/{name}', '')[0] == 404
+    server.httpd.shutdown()
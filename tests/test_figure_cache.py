@@ -0,0 +1,38 @@
+import plotly.graph_objects as go
+
+from dash import FigureCache, get_cached_figure, get_figure_cache
+
+def _counting_builder(calls):
+    def build(n):
+        calls.append(n)
+        return go.Figure(go.Scatter(x=list(range(n)), y=list(range(n))))
+    return build
+
+def test_hit_returns_the_cached_figure_without_building():
+    get_figure_cache.clear()
+    calls = []
+    build = _counting_builder(calls)
+    first = get_cached_figure('scatter', 'v1', build, 300)
+    second = get_cached_figure('scatter', 'v1', build, 300)
+    assert calls == [300]
+    assert second is first
+    assert get_figure_cache().hits == 1
+
+def test_filter_state_and_version_are_part_of_the_key():
+    get_figure_cache.clear()
+    calls = []
+    build = _counting_builder(calls)
+    get_cached_figure('scatter', 'v1', build, 10, filter_state={'horizon': 30})
+    get_cached_figure('scatter', 'v1', build, 10, filter_state={'horizon': 60})
+    get_cached_figure('scatter', 'v2', build, 10, filter_state={'horizon': 30})
+    assert len(calls) == 3
+
+def test_eviction_and_invalidation_keep_the_size_bound():
+    cache = FigureCache(max_bytes=100)
+    cache.put(('a', 'v1', 'null'), go.Figure(), 60)
+    cache.put(('b', 'v1', 'null'), go.Figure(), 60)
+    assert cache.get(('a', 'v1', 'null')) is None
+    assert cache.get(('b', 'v1', 'null')) is not None
+    cache.invalidate('v1')
+    assert cache.get(('b', 'v1', 'null')) is None
+    assert cache._bytes == 0
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from geocoder import OfflineGeocoder, SortedKeyIndex
+
+def _geocoder():
+    pincodes = pd.DataFrame({'Pincode': [400097, 400064], 'Latitude': [19.17, 19.19], 'Longitude': [72.88, 72.84]})
+    communities = pd.DataFrame({'City': ['Malad', 'Malad'], 'Community': ['Viraj', 'Urja'],
+                                'Latitude': [19.1769, 19.1778], 'Longitude': [72.8721, 72.8791]})
+    return OfflineGeocoder(pincodes, communities)
+
+def test_index_keeps_the_first_value_per_key():
+    index = SortedKeyIndex([5, 3, 5], [[1.0], [2.0], [3.0]])
+    values, found = index.lookup([5, 3, 4])
+    assert found.tolist() == [True, True, False]
+    assert values[found, 0].tolist() == [1.0, 2.0]
+    assert not SortedKeyIndex([], np.empty((0, 2))).lookup([1])[1].any()
+
+def test_repair_prefers_the_upload_then_bundled_communities_then_pincodes():
+    upload = pd.DataFrame({
+        'City': ['Malad', 'Malad', 'Malad', 'Malad', 'Malad', 'Malad'],
+        'Community': ['Viraj', 'VIRAJ ', 'Urja', 'Nowhere', 'Elsewhere', 'Girnar'],
+        'Latitude': [19.18, np.nan, 0.0, np.nan, np.nan, 19.1728],
+        'Longitude': [72.87, np.nan, 0.0, np.nan, np.nan, 72.8801],
+        'Pincode': [400097, 400097, 400097, 400064, 110001, 400066],
+    })
+    repaired = _geocoder().repair(upload.copy())
+    assert repaired['Geocode_Source'].astype(str).tolist() == [
+        'original', 'community', 'community', 'pincode', 'unresolved', 'original']
+    # The upload's own well-placed 'Viraj' wins over the bundled one
+    assert repaired.loc[1, ['Latitude', 'Longitude']].tolist() == [19.18, 72.87]
+    assert repaired.loc[2, ['Latitude', 'Longitude']].tolist() == [19.1778, 72.8791]
+    assert repaired.loc[3, ['Latitude', 'Longitude']].tolist() == [19.19, 72.84]
+    assert np.isnan(repaired.loc[4, 'Latitude'])
+    assert repaired.loc[2, ['Latitude_Raw', 'Longitude_Raw']].tolist() == [0.0, 0.0]
+    assert repaired['Geocode_Confidence'].tolist() == [1.0, 0.8, 0.8, 0.4, 0.0, 1.0]
+
+def test_repair_without_reference_uses_bundled_tables_only():
+    upload = pd.DataFrame({'City': ['Malad', 'Malad'], 'Community': ['Viraj', 'Viraj'],
+                           'Latitude': [19.18, np.nan], 'Longitude': [72.87, np.nan]})
+    repaired = _geocoder().repair(upload, reference=False)
+    assert repaired.loc[1, ['Latitude', 'Longitude']].tolist() == [19.1769, 72.8721]
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+import dash
+from dash import SharedDatasetStore, WastePredictionModel, compute_permutation_importance
+
+def _communities(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    households = rng.integers(10, 300, n)
+    return pd.DataFrame({
+        'Total Households': households,
+        'Latitude': rng.uniform(19.0, 19.3, n),
+        'Longitude': rng.uniform(72.8, 73.0, n),
+        'Total Kgs in Jul 2025': households * 2.0 + rng.normal(0, 5, n),
+    })
+
+def test_holdout_rows_are_kept_out_of_the_fit():
+    df = _communities()
+    model = WastePredictionModel({'n_estimators': 10})
+    assert model.train(df)
+    assert len(model.holdout_rows) == 80
+    assert model.scaler.n_samples_seen_ == len(df) - 80
+
+def test_importance_runs_one_job_per_feature_on_held_out_rows(monkeypatch):
+    df = _communities()
+    model = WastePredictionModel({'n_estimators': 10})
+    model.train(df)
+    store = SharedDatasetStore()
+    version, _ = store.put(df)
+    spec = store.export_shared(version)
+    calls = []
+
+    def run_in_process(fn, jobs):
+        calls.append(jobs)
+        return [fn(*job) for job in jobs]
+
+    monkeypatch.setattr(dash, 'run_heavy_tasks', run_in_process)
+    importance = compute_permutation_importance(spec, model)
+    store.release(version)
+    assert [job[3] for job in calls[0]] == [0, 1, 2]
+    assert all(job[2] is model.holdout_rows for job in calls[0])
+    # Only households drive the target
+    assert importance['Feature'].iloc[0] == 'Total Households'
+    assert importance['Importance'].iloc[0] > 0.5
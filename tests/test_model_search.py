@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dash
+from dash import leaderboard_params, search_grid_configs, successive_halving_search
+
+GRID = {'n_estimators': [5, 10, 20], 'max_depth': [None, 4, 2], 'min_samples_leaf': [1]}
+
+def _communities(n=900, seed=0):
+    rng = np.random.default_rng(seed)
+    households = rng.integers(10, 300, n)
+    return pd.DataFrame({
+        'City': rng.choice(['Malad', 'Mangaon', 'Goregaon', 'Borivali'], n),
+        'Total Households': households,
+        'Latitude': rng.uniform(19.0, 19.3, n),
+        'Longitude': rng.uniform(72.8, 73.0, n),
+        'Total Kgs in Jul 2025': households * 2.0 + rng.normal(0, 5, n),
+    })
+
+@pytest.fixture
+def search(monkeypatch):
+    df = _communities()
+    store = dash.SharedDatasetStore()
+    version, _ = store.put(df)
+    calls = []
+
+    def run_in_process(fn, jobs):
+        results = [fn(*job) for job in jobs]
+        calls.append((jobs, results))
+        return results
+
+    monkeypatch.setattr(dash, 'run_heavy_tasks', run_in_process)
+    board = successive_halving_search(df, store.export_shared(version), grid=GRID, min_rows=100)
+    store.release(version)
+    return df, board, calls
+
+def test_grid_expands_to_every_combination():
+    configs = search_grid_configs(GRID)
+    assert len(configs) == 9
+    assert {(c['n_estimators'], c['max_depth']) for c in configs} == {
+        (n, d) for n in GRID['n_estimators'] for d in GRID['max_depth']}
+
+def test_each_rung_keeps_the_best_third_on_more_rows(search):
+    df, board, calls = search
+    assert [len(jobs) for jobs, _ in calls] == [9, 3, 1]
+    rows = [len(jobs[0][1]) for jobs, _ in calls]
+    assert rows[0] < rows[1] < rows[2] == len(df)
+    for (earlier, scored), (later, _) in zip(calls, calls[1:]):
+        scores = {tuple(sorted(job[3].items())): score['R2'] for job, score in zip(earlier, scored)}
+        survivors = {tuple(sorted(job[3].items())) for job in later}
+        assert min(scores[s] for s in survivors) >= max(v for k, v in scores.items() if k not in survivors)
+    # The finalist leads the board with full-data scores
+    assert board['Rung'].iloc[0] == board['Rung'].max() and board['Rows'].iloc[0] == len(df)
+
+def test_folds_are_grouped_and_params_round_trip(search):
+    _, board, _ = search
+    assert board['Blocked'].all()
+    assert board['Folds'].max() == 4
+    params = dict(leaderboard_params(board.iloc[0]))
+    assert params['n_estimators'] in GRID['n_estimators'] and params['max_depth'] in GRID['max_depth']
+
+def test_missing_group_column_is_rejected():
+    with pytest.raises(ValueError):
+        successive_halving_search(_communities().drop(columns='City'), None, grid=GRID)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from dash import QUALITY_FLAGS, run_quality_checks
+
+def _upload(lat, lon, **columns):
+    n = len(lat)
+    return pd.DataFrame({
+        'City': columns.get('City', ['Malad'] * n),
+        'Community': columns.get('Community', [f'C{i}' for i in range(n)]),
+        'Latitude': lat,
+        'Longitude': lon,
+        'Total Households': columns.get('Total Households', [50] * n),
+        'Total Kgs in Jul 2025': columns.get('Total Kgs in Jul 2025', [100] * n),
+    })
+
+def _has(flags, name):
+    return (flags & QUALITY_FLAGS[name]) > 0
+
+def test_close_pairs_are_found_across_cell_edges():
+    # Rows 0/1 are 0.2 m apart but round to different 4-decimal cells; rows 2/3 are ~30 m apart
+    lat = [19.170049, 19.170051, 19.18, 19.18027]
+    lon = [72.88, 72.88, 72.88, 72.88]
+    flags = run_quality_checks(_upload(lat, lon))
+    assert _has(flags, 'colliding_coordinates').tolist() == [True, True, False, False]
+    assert not _has(flags, 'duplicate_coordinates').any()
+
+def test_exact_duplicates_are_not_reported_as_collisions():
+    flags = run_quality_checks(_upload([19.17, 19.17, 19.2], [72.88, 72.88, 72.9]))
+    assert _has(flags, 'duplicate_coordinates').tolist() == [True, True, False]
+    assert not _has(flags, 'colliding_coordinates').any()
+
+def test_coordinate_and_value_checks():
+    df = _upload([19.1, np.nan, 25.0, 19.3], [72.9, 72.9, 72.9, 72.95],
+                 Community=['Girnar', 'Urja', 'Samta', 'girnar!'],
+                 **{'Total Households': [50, 40, 0, 45], 'Total Kgs in Jul 2025': [100, 80, 30, 90]})
+    flags = run_quality_checks(df)
+    assert _has(flags, 'missing_coordinates').tolist() == [False, True, False, False]
+    assert _has(flags, 'out_of_region').tolist() == [False, False, True, False]
+    assert _has(flags, 'waste_without_households').tolist() == [False, False, True, False]
+    assert _has(flags, 'duplicate_name').tolist() == [True, False, False, True]
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from scheduler import (PICKUP_FREQUENCY, _community_keys, hilbert_index, plan_collection_schedule, replan_schedule,
+                       truck_utilization)
+
+def test_hilbert_index_first_order():
+    x = np.array([0.0, 0.0, 1.0, 1.0])
+    y = np.array([0.0, 1.0, 1.0, 0.0])
+    assert hilbert_index(x, y, order=1).tolist() == [0, 1, 2, 3]
+
+def test_hilbert_index_visits_neighbours():
+    xs, ys = np.meshgrid(np.arange(16.0), np.arange(16.0))
+    x, y = xs.ravel(), ys.ravel()
+    d = hilbert_index(x, y, order=4)
+    assert sorted(d.tolist()) == list(range(256))
+    order = np.argsort(d)
+    steps = np.abs(np.diff(x[order])) + np.abs(np.diff(y[order]))
+    assert (steps == 1).all()
+
+def test_schedule_respects_fleet_and_flags_heavy_pickups():
+    rng = np.random.default_rng(0)
+    n = 400
+    df = pd.DataFrame({
+        'Community': [f"Community {i}" for i in range(n)],
+        'City': rng.choice(['Malad', 'Tala'], n),
+        'Latitude': rng.uniform(19.0, 19.2, n),
+        'Longitude': rng.uniform(72.8, 73.0, n),
+        'Collection_Status': rng.choice(['Low', 'Medium', 'High', 'Critical'], n),
+        'Total Kgs in Jul 2025': rng.gamma(2, 100, n),
+    })
+    params = {'trucks': 3, 'capacity_kg': 40.0}
+
+    schedule = plan_collection_schedule(df, params)
+    unserved = schedule.attrs['unserved']
+    assert schedule.groupby('Day')['Truck'].max().max() <= 3
+    assert len(unserved) > 0
+    assert (schedule['Over_Capacity'] == (schedule['Pickup_Kg'] > 40.0)).all()
+    assert schedule['Over_Capacity'].any()
+
+    utilization = truck_utilization(schedule, params)
+    assert utilization.groupby('Day')['Truck'].nunique().max() <= 3
+    assert utilization['Over_Capacity'].sum() >= 1
+
+def test_replan_with_a_full_fleet_keeps_the_limit_and_unserved_pickups():
+    rng = np.random.default_rng(1)
+    n = 300
+    df = pd.DataFrame({
+        'Community': [f"Community {i}" for i in range(n)],
+        'City': 'Malad',
+        'Latitude': rng.uniform(19.0, 19.2, n),
+        'Longitude': rng.uniform(72.8, 73.0, n),
+        'Collection_Status': rng.choice(['Medium', 'High', 'Critical'], n),
+        'Total Kgs in Jul 2025': rng.gamma(2, 150, n),
+    })
+    params = {'trucks': 2, 'capacity_kg': 300.0}
+    schedule = plan_collection_schedule(df, params)
+    unserved = schedule.attrs['unserved']
+    # Communities that kept some pickups but lost others to the fleet limit
+    partial = set(unserved['Key']) & set(schedule['Key'])
+    assert partial
+
+    changed = df.copy()
+    changed.loc[:9, 'Total Kgs in Jul 2025'] *= 3
+    replanned = replan_schedule(schedule, changed, params)
+    assert replanned.attrs['replanned'] == 10
+    assert replanned.groupby('Day')['Truck'].max().max() <= 2
+    # Every pickup of every community is either scheduled or reported unserved
+    frequency = changed['Collection_Status'].map(PICKUP_FREQUENCY).sum()
+    assert len(replanned) + len(replanned.attrs['unserved']) == frequency
+    untouched = partial - set(_community_keys(changed.loc[:9]))
+    assert untouched <= set(replanned.attrs['unserved']['Key'])
@@ -0,0 +1,99 @@
+import gc
+import os
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import dash
+from dash import SessionResourceManager, SharedDatasetStore
+
+def _frame(rows=1_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'City': rng.choice(['Malad', 'Mangaon'], rows),
+        'Community': [f'C{i}' for i in range(rows)],
+        'Latitude': rng.uniform(19.0, 19.3, rows),
+        'Longitude': rng.uniform(72.8, 73.0, rows),
+        'Total Households': rng.integers(1, 200, rows).astype('float64'),
+        'Total Kgs in Jul 2025': rng.uniform(0, 400, rows),
+    })
+
+def _manager(tmp_path, budget_mb=100):
+    return SessionResourceManager(SharedDatasetStore(), ttl=10, budget_mb=budget_mb, spill_dir=str(tmp_path))
+
+def _segment_exists(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+        return True
+    except FileNotFoundError:
+        return False
+
+def test_idle_release_frees_memory_and_segments_then_restores(tmp_path):
+    manager = _manager(tmp_path)
+    released = []
+    manager.on_release(released.append)
+    df = _frame()
+    expected = df.copy()
+    manager.activate('s1', df, 'v1')
+    spec = manager.store.export_shared('v1')
+    alive = weakref.ref(df)
+    del df
+
+    assert manager.sweep(now=manager._sessions['s1']['last_seen'] + 3600) == 1
+    gc.collect()
+    assert released == ['v1']
+    assert alive() is None and manager.store.nbytes() == 0
+    assert not _segment_exists(spec['name'])
+    assert os.listdir(tmp_path) == ['v1.pkl']
+
+    restored = manager.dataset('v1')
+    pd.testing.assert_frame_equal(restored, expected)
+    assert manager.store.get('v1') is restored and os.listdir(tmp_path) == []
+
+def test_segments_are_unlinked_while_views_are_still_mapped(tmp_path):
+    manager = _manager(tmp_path)
+    manager.activate('s1', _frame(), 'v1')
+    spec = manager.store.export_shared('v1')
+    segment, _ = manager.store._segments[('v1', tuple(dash.SHARED_NUMERIC_COLUMNS))]
+    view = np.ndarray((spec['rows'],), dtype='float64', buffer=segment.buf)
+    manager.sweep(now=1e12)
+    assert not _segment_exists(spec['name'])
+    del view
+
+def test_sessions_in_use_keep_their_dataset(tmp_path):
+    manager = _manager(tmp_path)
+    manager.activate('s1', _frame(), 'v1')
+    manager.activate('s2', _frame(seed=1), 'v2')
+    manager.touch('s2')
+    manager._sessions['s1']['last_seen'] = 0
+    assert manager.sweep(now=manager._sessions['s2']['last_seen'] + 5) == 1
+    assert manager.store.versions() == ['v2'] and os.listdir(tmp_path) == ['v1.pkl']
+    manager.cleanup()
+    assert manager.store.versions() == [] and os.listdir(tmp_path) == []
+
+def test_budget_refuses_datasets_and_drops_old_objects(tmp_path):
+    df = _frame()
+    nbytes = dash.object_nbytes(df)
+    manager = _manager(tmp_path, budget_mb=1.5 * nbytes / 1e6)
+    assert manager.activate('s1', _frame(rows=3_000), 'big') is None
+    assert manager.activate('s1', df, 'v1') is not None
+    small = np.zeros(nbytes // 4 // 8)
+    manager.put('s1', 'a', small)
+    manager.put('s1', 'b', small.copy())
+    manager.put('s1', 'c', small.copy())
+    assert manager.get('s1', 'a') is None and manager.get('s1', 'c') is not None
+
+def test_release_clears_the_version_caches():
+    df = _frame()
+    dash.get_dataset_stats.clear()
+    first = dash.get_dataset_stats('v1', df)
+    assert dash.get_dataset_stats('v1', df) is first
+    figure_cache = dash.FigureCache()
+    figure_cache.put(('chart', 'v1', '{}'), object(), 10)
+    figure_cache.put(('chart', 'v2', '{}'), object(), 10)
+
+    dash.release_version_caches('v1', figure_cache)
+    assert dash.get_dataset_stats('v1', df) is not first
+    assert figure_cache.get(('chart', 'v1', '{}')) is None and figure_cache.get(('chart', 'v2', '{}')) is not None
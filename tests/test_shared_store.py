@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from multiprocessing import shared_memory
+
+from dash import SharedDatasetStore, attach_shared_frame
+
+def _frame(seed=0, rows=20):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Community': [f'C{i}' for i in range(rows)],
+        'Latitude': rng.uniform(12.8, 13.2, rows),
+        'Longitude': rng.uniform(77.4, 77.8, rows),
+    })
+
+def test_equal_content_is_stored_once():
+    store = SharedDatasetStore()
+    version, first = store.put(_frame())
+    same_version, second = store.put(_frame())
+    assert same_version == version
+    assert second is first
+    assert store.versions() == [version]
+    assert store.put(_frame(seed=1))[0] != version
+
+def test_shared_columns_round_trip_and_release_unlinks():
+    store = SharedDatasetStore()
+    df = _frame()
+    version, _ = store.put(df)
+    spec = store.export_shared(version, ['Latitude', 'Longitude'])
+    assert store.export_shared(version, ['Latitude', 'Longitude']) is spec
+
+    view, segment = attach_shared_frame(spec)
+    np.testing.assert_array_equal(view['Latitude'].to_numpy(), df['Latitude'].to_numpy())
+    np.testing.assert_array_equal(view['Longitude'].to_numpy(), df['Longitude'].to_numpy())
+    del view
+    segment.close()
+
+    store.release(version)
+    assert store.get(version) is None
+    assert store.nbytes() == 0
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=spec['name'])
+
+def test_export_of_unknown_version_is_none():
+    assert SharedDatasetStore().export_shared('missing') is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats import KLLSketch, StreamingStats, collection_status
+
+def test_sketch_quantiles_are_close():
+    values = np.random.default_rng(0).lognormal(3, 1, 200_000)
+    sketch = KLLSketch(k=200).update(values)
+    q = [0.1, 0.5, 0.9, 0.99]
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / len(values)
+    np.testing.assert_allclose(ranks, q, atol=0.02)
+    assert sketch.n == len(values)
+    assert sum(len(level) for level in sketch.levels) < 2_000
+
+def test_sketch_merge_matches_single_pass():
+    rng = np.random.default_rng(1)
+    parts = [rng.normal(i, 1, 50_000) for i in range(4)]
+    merged = KLLSketch(seed=1)
+    for part in parts:
+        merged.merge(KLLSketch(seed=2).update(part))
+    values = np.concatenate(parts)
+    assert merged.n == len(values)
+    ranks = np.searchsorted(np.sort(values), merged.quantile([0.25, 0.5, 0.75])) / len(values)
+    np.testing.assert_allclose(ranks, [0.25, 0.5, 0.75], atol=0.02)
+
+def test_sketch_ignores_non_finite_and_handles_empty():
+    sketch = KLLSketch()
+    assert np.isnan(sketch.quantile(0.5))
+    sketch.update([np.nan, np.inf, 3.0])
+    assert sketch.n == 1
+    assert sketch.quantile(0.5) == 3.0
+
+def test_streaming_stats_merge_matches_whole_frame():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        'Total Households': rng.integers(1, 300, 10_000).astype(float),
+        'Total Kgs in Jul 2025': rng.gamma(2, 50, 10_000),
+        'Collection_Status': rng.choice(['Low', 'High'], 10_000),
+    })
+    df.loc[::7, 'Total Kgs in Jul 2025'] = np.nan
+    columns = ['Total Households', 'Total Kgs in Jul 2025']
+
+    merged = StreamingStats(columns)
+    for part in (df.iloc[start:start + 2_000] for start in range(0, len(df), 2_000)):
+        merged.merge(StreamingStats.from_frame(part, chunk_rows=999, columns=columns))
+
+    assert merged.rows == len(df)
+    assert merged.status_counts == df['Collection_Status'].value_counts().to_dict()
+    for col in columns:
+        assert merged.sum(col) == pytest.approx(df[col].sum())
+        assert merged.mean(col) == pytest.approx(df[col].mean())
+    complete = df[columns].dropna()
+    assert merged.variance('Total Kgs in Jul 2025') == pytest.approx(complete['Total Kgs in Jul 2025'].var())
+    np.testing.assert_allclose(merged.corr().to_numpy(), complete.corr().to_numpy())
+
+def test_streaming_stats_rejects_different_columns():
+    with pytest.raises(ValueError):
+        StreamingStats(['Total Households']).merge(StreamingStats(['Total Kgs in Jul 2025']))
+
+def test_collection_status_uses_the_threshold_table():
+    kgs = [0, 10, 25, 26, 100, 101, 300, 301]
+    assert collection_status(kgs).tolist() == ['None', 'Low', 'Low', 'Medium', 'Medium', 'High', 'High', 'Critical']
+    custom = {'Medium': 5, 'High': 50, 'Critical': 200}
+    assert collection_status(kgs, custom).tolist() == ['None', 'Medium', 'Medium', 'Medium', 'High', 'High',
+                                                       'Critical', 'Critical']
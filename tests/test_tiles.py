@@ -0,0 +1,131 @@
+import gzip
+import sqlite3
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import tiles
+
+mapbox_vector_tile = pytest.importorskip('mapbox_vector_tile')
+
+def decode(data):
+    return mapbox_vector_tile.decode(data, default_options={'y_coord_down': True})
+
+def communities(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Community': [f"Community {i}" for i in range(n)],
+        'City': rng.choice(['Malad', 'Mangaon', 'Tala'], n),
+        'Latitude': rng.uniform(18.9, 19.3, n),
+        'Longitude': rng.uniform(72.8, 73.1, n),
+        'Collection_Status': rng.choice(tiles.STATUS_ORDER, n),
+        'Total Kgs in Jul 2025': rng.uniform(0, 500, n),
+        'Total Households': rng.integers(1, 200, n),
+    })
+
+def test_point_layer_round_trip():
+    properties = {
+        'Community': np.array(['Vrindavan', 'Gokul', 'Vrindavan']),
+        'Count': np.array([1, 12, 1]),
+        'Total_Kgs': np.array([12.5, -3.0, 12.5]),
+    }
+    data = tiles.encode_point_layer('communities', np.array([0, 2048, 4095]), np.array([4095, 17, 0]), properties)
+
+    layer = decode(data)['communities']
+    assert layer['version'] == 2
+    assert layer['extent'] == tiles.TILE_EXTENT
+    assert [f['geometry']['coordinates'] for f in layer['features']] == [[0, 4095], [2048, 17], [4095, 0]]
+    assert [f['properties'] for f in layer['features']] == [
+        {'Community': 'Vrindavan', 'Count': 1, 'Total_Kgs': 12.5},
+        {'Community': 'Gokul', 'Count': 12, 'Total_Kgs': -3.0},
+        {'Community': 'Vrindavan', 'Count': 1, 'Total_Kgs': 12.5},
+    ]
+
+def test_point_layer_deduplicates_values():
+    data = tiles.encode_point_layer('l', np.zeros(3, dtype='int64'), np.zeros(3, dtype='int64'),
+                                    {'City': np.array(['Tala', 'Tala', 'Tala'])})
+    assert data.count(b'Tala') == 1
+
+def test_lonlat_to_world_corners():
+    x, y = tiles.lonlat_to_world(np.array([-180.0, 0.0]), np.array([85.05112878, 0.0]))
+    np.testing.assert_allclose(x, [0.0, 0.5])
+    np.testing.assert_allclose(y, [0.0, 0.5], atol=1e-9)
+
+def test_tileset_pyramid(tmp_path):
+    df = communities(300)
+    path = tiles.build_tileset(df, str(tmp_path / 'communities.mbtiles'), min_zoom=4, max_zoom=8)
+
+    with sqlite3.connect(path) as db:
+        rows = db.execute('SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles').fetchall()
+        metadata = dict(db.execute('SELECT name, value FROM metadata'))
+    assert metadata['minzoom'] == '4' and metadata['maxzoom'] == '8'
+    assert sorted({z for z, _, _, _ in rows}) == [4, 5, 6, 7, 8]
+
+    wx, wy = tiles.lonlat_to_world(df['Longitude'].to_numpy(), df['Latitude'].to_numpy())
+    for zoom in range(4, 9):
+        level = [r for r in rows if r[0] == zoom]
+        features = [f for _, _, _, data in level for f in decode(gzip.decompress(data))[tiles.TILE_LAYER]['features']]
+        # Every community lands in exactly one tile per zoom level
+        assert len(features) == len(df)
+        # Rows are stored TMS-style, counted from the south
+        expected = {(int(x * 2 ** zoom), 2 ** zoom - 1 - int(y * 2 ** zoom)) for x, y in zip(wx, wy)}
+        assert {(x, y) for _, x, y, _ in level} == expected
+
+def test_dense_tiles_are_aggregated(monkeypatch):
+    df = communities(500, seed=1)
+    monkeypatch.setattr(tiles, 'TILE_MAX_FEATURES', 50)
+    wx, wy = tiles.lonlat_to_world(df['Longitude'].to_numpy(), df['Latitude'].to_numpy())
+    attrs = {
+        'Community': df['Community'].to_numpy(),
+        'City': df['City'].to_numpy(),
+        'City_Code': pd.factorize(df['City'])[0],
+        'City_Names': np.asarray(pd.factorize(df['City'])[1], dtype=object),
+        'Status': df['Collection_Status'].map({s: i for i, s in enumerate(tiles.STATUS_ORDER)}).to_numpy(),
+        'Kgs': df['Total Kgs in Jul 2025'].to_numpy(),
+        'Households': df['Total Households'].to_numpy(),
+    }
+
+    (zoom, _, _, data), = tiles._build_zoom_job(4, wx, wy, attrs)
+    features = decode(gzip.decompress(data))[tiles.TILE_LAYER]['features']
+    assert len(features) < len(df)
+    assert sum(f['properties']['Count'] for f in features) == len(df)
+    assert sum(f['properties']['Total_Kgs'] for f in features) == pytest.approx(attrs['Kgs'].sum(), abs=0.1 * len(features))
+
+def test_tile_server_checks_ranges_and_serves_from_any_thread(tmp_path):
+    df = communities(50)
+    path = tiles.build_tileset(df, str(tmp_path / 'communities.mbtiles'), min_zoom=4, max_zoom=6)
+    with sqlite3.connect(path) as db:
+        z, x, row = db.execute('SELECT zoom_level, tile_column, tile_row FROM tiles LIMIT 1').fetchone()
+    server = tiles.LocalTileServer(port=0)
+    url = server.add_tileset('v1', path)
+    y = 2 ** z - 1 - row
+
+    with urllib.request.urlopen(url.format(z=z, x=x, y=y)) as response:
+        assert response.status == 200
+        assert decode(gzip.decompress(response.read()))[tiles.TILE_LAYER]['features']
+    # Requests are served on different threads; each opens its own connection
+    with ThreadPoolExecutor(4) as pool:
+        statuses = list(pool.map(lambda _: server._serve_tile(f'/tiles/v1/{z}/{x}/{y}.pbf', '')[0], range(8)))
+    assert statuses == [200] * 8
+    for bad in (f'{tiles.TILE_MAX_ZOOM + 1}/0/0', f'{z}/{2 ** z}/0', f'{z}/0/-1', f'{tiles.TILE_MIN_ZOOM - 1}/0/0'):
+        assert server._serve_tile(f'/tiles/v1/{bad}.pbf', '')[0] == 400
+    assert server._serve_tile('/tiles/v2/4/0/0.pbf', '')[0] == 404
+    server.httpd.shutdown()
+
+def test_tileset_builder_runs_in_the_background(tmp_path):
+    frames = {'v1': communities(50), 'gone': None}
+    builder = tiles.TilesetBuilder(frames.get, cache_dir=str(tmp_path))
+    assert builder.status('v1') == ('missing', None)
+    path = builder.request('v1')
+    assert builder.request('v1') == path
+    builder._jobs['v1'].result(timeout=60)
+    assert builder.status('v1') == ('ready', None)
+    assert sqlite3.connect(path).execute('SELECT COUNT(*) FROM tiles').fetchone()[0] > 0
+
+    builder.request('gone')
+    builder._jobs['gone'].exception(timeout=60)
+    state, error = builder.status('gone')
+    assert state == 'failed' and isinstance(error, ValueError)
@@ -0,0 +1,26 @@
+import numpy as np
+
+from dash import capacitated_assignment
+
+def test_unlimited_capacity_picks_nearest_site():
+    distances = np.random.default_rng(0).uniform(0, 10, (50, 4))
+    labels = capacitated_assignment(distances, np.ones(50), capacity=np.inf)
+    assert (labels == distances.argmin(axis=1)).all()
+
+def test_capacity_is_respected_when_feasible():
+    rng = np.random.default_rng(1)
+    distances = rng.uniform(0, 10, (60, 3))
+    distances[:, 0] -= 20  # every community prefers site 0
+    demand = rng.uniform(1, 2, 60)
+    capacity = demand.sum() / 3 * 1.2
+    labels = capacitated_assignment(distances, demand, capacity)
+    load = np.bincount(labels, weights=demand, minlength=3)
+    assert (load <= capacity + 1e-9).all()
+    # The closest communities keep the contested site
+    kept = labels == 0
+    assert distances[kept, 0].max() <= distances[~kept, 0].min()
+
+def test_overflow_goes_to_nearest_site():
+    distances = np.array([[1.0, 2.0], [1.5, 2.5], [1.2, 3.0]])
+    labels = capacitated_assignment(distances, np.array([5.0, 5.0, 5.0]), capacity=6.0)
+    assert labels.tolist() == [0, 1, 0]
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from dash import build_trend_frame, dataset_reference_date
+
+def _frame():
+    return pd.DataFrame({
+        'City': ['A', 'A', 'B'],
+        'Community': ['North', 'South', 'North'],
+        'Total Kgs in Jul 2025': [100.0, 50.0, 20.0],
+    })
+
+def test_reference_date_comes_from_the_dataset():
+    assert dataset_reference_date(_frame()) == pd.Timestamp('2025-07-31')
+    dated = _frame().assign(Date=['2024-03-01', '2024-03-09', None])
+    assert dataset_reference_date(dated) == pd.Timestamp('2024-03-09')
+    assert dataset_reference_date(pd.DataFrame({'x': [1]})) is None
+
+def test_community_series_are_deterministic_and_keyed_by_city():
+    end = dataset_reference_date(_frame())
+    first = build_trend_frame(_frame(), horizon_days=14, breakdown='Community', end=end)
+    second = build_trend_frame(_frame(), horizon_days=14, breakdown='Community', end=end)
+    pd.testing.assert_frame_equal(first, second)
+    assert sorted(first['Series'].unique()) == ['North (A)', 'North (B)', 'South (A)']
+    assert first['Date'].max() == end
+    assert len(first) == 3 * 14
+
+def test_breakdowns_scale_with_their_totals():
+    end = dataset_reference_date(_frame())
+    by_city = build_trend_frame(_frame(), horizon_days=7, breakdown='City', end=end)
+    overall = build_trend_frame(_frame(), horizon_days=7, end=end)
+    assert set(by_city['Series']) == {'A', 'B'}
+    assert overall['Series'].unique().tolist() == ['All']
+    medians = by_city.groupby('Series')['Total_Waste'].mean()
+    assert medians['A'] > medians['B']
+    assert (by_city['Lower'] <= by_city['Total_Waste']).all()
+    assert (by_city['Total_Waste'] <= by_city['Upper']).all()
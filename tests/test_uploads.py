@@ -0,0 +1,45 @@
+import numpy as np
+
+import dash
+from dash import StreamingStats, _parse_upload_job, create_real_sample_data, merge_uploads, process_data
+
+def _csv(df):
+    return df.to_csv(index=False).encode()
+
+def test_valid_file_is_processed_with_its_stats():
+    df = create_real_sample_data()
+    result = _parse_upload_job('a.csv', _csv(df))
+    assert result['issues'] == [] and result['rows'] == len(df)
+    assert (result['frame']['Source_File'] == 'a.csv').all()
+    assert 'Collection_Status' in result['frame'] and result['stats'].rows == len(df)
+
+def test_bad_files_are_reported_not_raised(monkeypatch):
+    df = create_real_sample_data()
+    missing = _parse_upload_job('missing.csv', _csv(df.drop(columns='Latitude')))
+    assert missing['frame'] is None and missing['issues'] == ['missing columns: Latitude']
+    assert _parse_upload_job('garbage.bin', 12345)['issues'][0].startswith('TypeError')
+
+    text = df.astype({'Total Households': object})
+    text.loc[0, 'Total Households'] = 'many'
+    partial = _parse_upload_job('text.csv', _csv(text))
+    assert partial['frame'] is not None and partial['issues'] == ['1 non-numeric Total Households']
+
+    def boom(*args, **kwargs):
+        raise RuntimeError('processing failed')
+
+    monkeypatch.setattr(dash, 'process_data', boom)
+    failed = _parse_upload_job('a.csv', _csv(df))
+    assert failed['frame'] is None and failed['stats'] is None
+    assert failed['issues'] == ['RuntimeError: processing failed']
+
+def test_merged_stats_match_the_whole_dataset():
+    df = create_real_sample_data()
+    results = [_parse_upload_job('a.csv', _csv(df.iloc[:40])), _parse_upload_job('b.csv', _csv(df.iloc[40:])),
+               _parse_upload_job('c.csv', b'garbage\n1')]
+    merged, stats, report = merge_uploads(results)
+    assert report['Status'].tolist() == ['✅ Loaded', '✅ Loaded', '❌ Rejected']
+    assert len(merged) == len(df) and list(merged['Source_File'].cat.categories) == ['a.csv', 'b.csv']
+    whole = StreamingStats.from_frame(process_data(df.copy()))
+    assert stats.rows == whole.rows and stats.status_counts == whole.status_counts
+    np.testing.assert_allclose(stats.sums, whole.sums)
+    np.testing.assert_allclose(stats.comoments, whole.comoments)
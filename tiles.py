@@ -0,0 +1,266 @@
+# Mapbox vector tile encoding, MBTiles pyramids and the local tile server
+
+import gzip
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from geo import map_center, valid_coordinates
+from runtime import LocalHTTPServer, get_worker_pool, run_heavy_tasks
+
+TILE_EXTENT = 4096
+TILE_MIN_ZOOM = 4
+TILE_MAX_ZOOM = 14
+TILE_MAX_FEATURES = 2_000  # denser tiles are aggregated onto a grid
+TILE_CLUSTER_GRID = 64
+TILE_LAYER = 'communities'
+TILE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'waste_dashboard_tiles')
+TILE_SERVER_HOST = os.environ.get('WASTE_DASHBOARD_TILE_HOST', '127.0.0.1')
+TILE_SERVER_PORT = int(os.environ.get('WASTE_DASHBOARD_TILE_PORT', '8765'))
+TILE_PUBLIC_URL = os.environ.get('WASTE_DASHBOARD_TILE_URL')  # base URL as seen by browsers, if proxied
+TILE_CORS = {'Access-Control-Allow-Origin': '*'}  # map libraries fetch tiles cross-origin
+STATUS_ORDER = ['None', 'Low', 'Medium', 'High', 'Critical']
+
+def lonlat_to_world(lon, lat):
+    """Web Mercator position in [0, 1) with y growing southwards"""
+    lat = np.clip(lat, -85.05112878, 85.05112878)
+    x = (np.asarray(lon) + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) / (2 * np.pi)
+    return np.clip(x, 0, 1 - 1e-12), np.clip(y, 0, 1 - 1e-12)
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+def _message(field, payload):
+    """Length-delimited protobuf field"""
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+def _encode_value(value):
+    """MVT Value message: string, double or unsigned int"""
+    if isinstance(value, str):
+        return _message(1, value.encode('utf-8'))
+    if isinstance(value, (int, np.integer)) and value >= 0:
+        return _varint(5 << 3) + _varint(int(value))
+    return _varint(3 << 3 | 1) + struct.pack('<d', float(value))
+
+def encode_point_layer(name, px, py, properties, extent=TILE_EXTENT):
+    """Encode one MVT v2 layer of point features"""
+    keys = list(properties)
+    columns = [properties[k].tolist() if hasattr(properties[k], 'tolist') else list(properties[k]) for k in keys]
+    value_index = {}
+    values = []
+    features = []
+    for i, (x, y) in enumerate(zip(px.tolist(), py.tolist())):
+        tags = bytearray()
+        for k, column in enumerate(columns):
+            value = column[i]
+            slot = value_index.get((type(value), value))
+            if slot is None:
+                slot = value_index[(type(value), value)] = len(values)
+                values.append(_encode_value(value))
+            tags += _varint(k) + _varint(slot)
+        # Feature: id, tags, POINT type and a MoveTo(1) geometry
+        geometry = b'\x09' + _varint(_zigzag(x)) + _varint(_zigzag(y))
+        features.append(_message(2, b'\x08' + _varint(i + 1) + _message(2, bytes(tags)) + b'\x18\x01'
+                                 + _message(4, geometry)))
+    return _message(3, b''.join([
+        b'\x78\x02',  # version = 2
+        _message(1, name.encode('utf-8')),
+        *features,
+        *(_message(3, k.encode('utf-8')) for k in keys),
+        *(_message(4, v) for v in values),
+        b'\x28' + _varint(extent),
+    ]))
+
+def _feature_properties(idx, attrs):
+    return {
+        'Community': attrs['Community'][idx],
+        'City': attrs['City'][idx],
+        'Collection_Status': np.array(STATUS_ORDER)[attrs['Status'][idx]],
+        'Total_Kgs': np.round(attrs['Kgs'][idx], 1),
+        'Total_Households': attrs['Households'][idx],
+        'Count': np.ones(len(idx), dtype='int64'),
+    }
+
+def _cluster_properties(idx, cell, attrs, px, py):
+    """Aggregate a dense tile's points onto grid cells: sums, weighted centre and worst status"""
+    _, inverse, counts = np.unique(cell, return_inverse=True, return_counts=True)
+    n = len(counts)
+    kg = attrs['Kgs'][idx]
+    weight = kg + 1e-3
+    total_w = np.bincount(inverse, weights=weight, minlength=n)
+    cx = np.rint(np.bincount(inverse, weights=px * weight, minlength=n) / total_w).astype('int64')
+    cy = np.rint(np.bincount(inverse, weights=py * weight, minlength=n) / total_w).astype('int64')
+    status = np.zeros(n, dtype='int64')
+    np.maximum.at(status, inverse, attrs['Status'][idx])
+    city_code = attrs['City_Code'][idx]
+    lo, hi = np.full(n, np.iinfo('int64').max), np.full(n, -1)
+    np.minimum.at(lo, inverse, city_code)
+    np.maximum.at(hi, inverse, city_code)
+    cities = np.where(lo == hi, attrs['City_Names'][np.maximum(lo, 0)], 'Multiple cities')
+    return cx, cy, {
+        'Community': np.char.add(counts.astype(str), ' communities'),
+        'City': cities,
+        'Collection_Status': np.array(STATUS_ORDER)[status],
+        'Total_Kgs': np.round(np.bincount(inverse, weights=kg, minlength=n), 1),
+        'Total_Households': np.bincount(inverse, weights=attrs['Households'][idx], minlength=n).astype('int64'),
+        'Count': counts.astype('int64'),
+    }
+
+def _build_zoom_job(zoom, wx, wy, attrs):
+    """All tiles of one zoom level as (z, x, y, gzipped MVT bytes)"""
+    scale = 2 ** zoom
+    fx, fy = wx * scale, wy * scale
+    tx, ty = fx.astype('int64'), fy.astype('int64')
+    order = np.lexsort((ty, tx))
+    key = tx[order] * scale + ty[order]
+    bounds = np.flatnonzero(np.r_[True, key[1:] != key[:-1], True])
+    tiles = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        idx = order[start:end]
+        x, y = int(tx[idx[0]]), int(ty[idx[0]])
+        px = np.minimum(((fx[idx] - x) * TILE_EXTENT).astype('int64'), TILE_EXTENT - 1)
+        py = np.minimum(((fy[idx] - y) * TILE_EXTENT).astype('int64'), TILE_EXTENT - 1)
+        if len(idx) > TILE_MAX_FEATURES:
+            size = TILE_EXTENT // TILE_CLUSTER_GRID
+            px, py, properties = _cluster_properties(idx, (px // size) * TILE_CLUSTER_GRID + py // size, attrs, px, py)
+        else:
+            properties = _feature_properties(idx, attrs)
+        tiles.append((zoom, x, y, gzip.compress(encode_point_layer(TILE_LAYER, px, py, properties), 6)))
+    return tiles
+
+def build_tileset(df, path, min_zoom=TILE_MIN_ZOOM, max_zoom=TILE_MAX_ZOOM, pool=None):
+    """Cut mapped communities into an MBTiles pyramid of gzipped vector tiles; zoom levels run on the worker pool"""
+    mappable = df[valid_coordinates(df)]
+    lon = mappable['Longitude'].to_numpy(dtype='float64')
+    lat = mappable['Latitude'].to_numpy(dtype='float64')
+    wx, wy = lonlat_to_world(lon, lat)
+    city_code, city_names = pd.factorize(mappable['City'].astype(str))
+    status = mappable['Collection_Status'].astype(str).map({s: i for i, s in enumerate(STATUS_ORDER)})
+    attrs = {
+        'Community': mappable['Community'].astype(str).to_numpy(),
+        'City': mappable['City'].astype(str).to_numpy(),
+        'City_Code': city_code,
+        'City_Names': np.asarray(city_names, dtype=object),
+        'Status': status.fillna(0).astype('int64').to_numpy(),
+        'Kgs': mappable['Total Kgs in Jul 2025'].to_numpy(dtype='float64'),
+        'Households': mappable['Total Households'].to_numpy(dtype='float64').astype('int64'),
+    }
+    levels = run_heavy_tasks(_build_zoom_job, [(z, wx, wy, attrs) for z in range(min_zoom, max_zoom + 1)], pool)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.tmp'
+    if os.path.exists(partial):
+        os.remove(partial)
+    with sqlite3.connect(partial) as db:
+        db.execute('CREATE TABLE metadata (name TEXT, value TEXT)')
+        db.execute('CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)')
+        db.execute('CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)')
+        # MBTiles rows count from the south (TMS)
+        db.executemany('INSERT INTO tiles VALUES (?, ?, ?, ?)',
+                       ((z, x, (2 ** z - 1) - y, data) for level in levels for z, x, y, data in level))
+        center_lat, center_lon = map_center(df)
+        fields = {'Community': 'String', 'City': 'String', 'Collection_Status': 'String',
+                  'Total_Kgs': 'Number', 'Total_Households': 'Number', 'Count': 'Number'}
+        metadata = {
+            'name': 'communities', 'format': 'pbf', 'type': 'overlay',
+            'minzoom': str(min_zoom), 'maxzoom': str(max_zoom),
+            'bounds': ','.join(str(v) for v in ((lon.min(), lat.min(), lon.max(), lat.max()) if len(lon) else (-180, -85, 180, 85))),
+            'center': f"{center_lon},{center_lat},{min(max_zoom, 10)}",
+            'json': json.dumps({'vector_layers': [{'id': TILE_LAYER, 'fields': fields,
+                                                   'minzoom': min_zoom, 'maxzoom': max_zoom}]}),
+        }
+        db.executemany('INSERT INTO metadata VALUES (?, ?)', metadata.items())
+    os.replace(partial, path)
+    return path
+
+class TilesetBuilder:
+    """Builds MBTiles files on a background thread, one job per dataset version"""
+
+    def __init__(self, load_dataset, cache_dir=TILE_CACHE_DIR, max_workers=1):
+        self.load_dataset = load_dataset
+        self.cache_dir = cache_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tiles')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def tileset_path(self, version):
+        return os.path.join(self.cache_dir, f"{version}.mbtiles")
+
+    def request(self, version):
+        """Start (or join) the version's build and return its output path"""
+        path = self.tileset_path(version)
+        with self._lock:
+            if os.path.exists(path) or version in self._jobs:
+                return path
+            # The pool is looked up here, on the script thread, and handed to the build thread
+            self._jobs[version] = self._executor.submit(self._build, version, path, get_worker_pool())
+        return path
+
+    def _build(self, version, path, pool):
+        df = self.load_dataset(version)
+        if df is None:
+            raise ValueError("the dataset is no longer loaded")
+        return build_tileset(df, path, pool=pool)
+
+    def status(self, version):
+        """One of 'ready', 'running', 'failed' or 'missing', plus the error if any"""
+        with self._lock:
+            job = self._jobs.get(version)
+        if job is None:
+            return ('ready' if os.path.exists(self.tileset_path(version)) else 'missing'), None
+        if not job.done():
+            return 'running', None
+        with self._lock:
+            self._jobs.pop(version, None)
+        if job.exception() is not None:
+            return 'failed', job.exception()
+        return 'ready', None
+
+class LocalTileServer(LocalHTTPServer):
+    """Local HTTP server for MBTiles tilesets registered by dataset version"""
+
+    def __init__(self, host=TILE_SERVER_HOST, port=TILE_SERVER_PORT):
+        super().__init__(host, port, name='tile-server', public_url=TILE_PUBLIC_URL)
+        self.tilesets = {}
+        self.register('tiles', self._serve_tile)
+
+    def add_tileset(self, version, path):
+        self.tilesets[version] = path
+        return f"{self.base_url}/tiles/{version}/{{z}}/{{x}}/{{y}}.pbf"
+
+    def _serve_tile(self, path, query):
+        try:
+            _, version, z, x, y = path.strip('/').split('/')
+            z, x, y = int(z), int(x), int(y.split('.')[0])
+        except ValueError:
+            return 400, TILE_CORS, b'bad tile path'
+        if not (TILE_MIN_ZOOM <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return 400, TILE_CORS, b'tile out of range'
+        tileset = self.tilesets.get(version)
+        if tileset is None:
+            return 404, TILE_CORS, b'unknown tileset'
+        # Requests arrive on short-lived server threads, so each opens its own read-only connection
+        with closing(sqlite3.connect(f"file:{tileset}?mode=ro", uri=True)) as db:
+            row = db.execute('SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?',
+                             (z, x, (2 ** z - 1) - y)).fetchone()
+        if row is None:
+            return 204, TILE_CORS, b''
+        return 200, {**TILE_CORS, 'Content-Type': 'application/vnd.mapbox-vector-tile', 'Content-Encoding': 'gzip',
+                     'Cache-Control': 'public, max-age=86400'}, row[0]